@@ -8,8 +8,8 @@ from typing import Any, Dict, List, Optional
 
 from backend.agents.base import BaseAgent, AgentRequest, AgentResponse
 from backend.core.generator import (
-    create_answer_generator,
     generate_answer,
+    get_answer_generator,
     process_query
 )
 from backend.core.llm_client import get_chat_model
@@ -57,14 +57,15 @@ class GeneratorAgent(BaseAgent):
         self._initialize_generator()
         
     def _initialize_generator(self):
-        """Initialize the answer generator chain."""
+        """Build (or fetch) the chain for the default parameters."""
+        self.generator = self._get_generator(self.model_name, self.temperature, self.max_tokens)
+        print(f"Initialized generator with model {self.model_name}")
+
+    @staticmethod
+    def _get_generator(model_name: str, temperature: float, max_tokens: int):
+        """Shared chain for these parameters from the process-wide registry."""
         try:
-            self.generator = create_answer_generator(
-                model_name=self.model_name,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            print(f"Initialized generator with model {self.model_name}")
+            return get_answer_generator(model_name=model_name, temperature=temperature, max_tokens=max_tokens)
         except Exception as e:
             raise RuntimeError(f"Failed to initialize generator: {e}")
     
@@ -82,24 +83,21 @@ class GeneratorAgent(BaseAgent):
         query = request.query
         context = request.parameters.get("context", request.context) if request.parameters else request.context
         
-        # Update generator if model parameters changed
+        # Per-request model parameters pick a shared chain; the agent's defaults stay unchanged
         model_name = request.parameters.get("model_name", self.model_name) if request.parameters else self.model_name
         temperature = request.parameters.get("temperature", self.temperature) if request.parameters else self.temperature
         max_tokens = request.parameters.get("max_tokens", self.max_tokens) if request.parameters else self.max_tokens
         
-        if (model_name != self.model_name or 
-            temperature != self.temperature or 
-            max_tokens != self.max_tokens):
-            self.model_name = model_name
-            self.temperature = temperature
-            self.max_tokens = max_tokens
-            self._initialize_generator()
+        if (model_name, temperature, max_tokens) == (self.model_name, self.temperature, self.max_tokens):
+            generator = self.generator
+        else:
+            generator = self._get_generator(model_name, temperature, max_tokens)
             
         # Run the generation process in a thread to avoid blocking
         loop = asyncio.get_event_loop()
         answer = await loop.run_in_executor(
             None,
-            lambda: generate_answer(self.generator, context, query)
+            lambda: generate_answer(generator, context, query)
         )
         
         # Extract sources from context (if available)
@@ -119,7 +117,7 @@ class GeneratorAgent(BaseAgent):
                     
         return GeneratorAgentResponse(
             content=answer,
-            metadata={"query": query, "model": self.model_name},
+            metadata={"query": query, "model": model_name},
             answer=answer,
             sources=sources
         )
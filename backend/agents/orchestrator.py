@@ -4,14 +4,26 @@ This module coordinates the communication between retriever, generator, and tool
 """
 
 import asyncio
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Awaitable, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field
+from langchain_core.documents import Document
 
 from backend.agents.base import AgentRequest, AgentResponse
 from backend.agents.retriever import RetrieverAgent, RetrieverAgentRequest
 from backend.agents.generator import GeneratorAgent, GeneratorAgentRequest
 from backend.agents.tools import TafsirToolAgent, TafsirLookupRequest
+from backend.core.config import (
+    CONTEXT_PACKING_ENABLED,
+    ORCHESTRATOR_DIRECT_TAFSIR_TIMEOUT,
+    ORCHESTRATOR_REFERENCE_TIMEOUT,
+    ORCHESTRATOR_RETRIEVAL_TIMEOUT
+)
+from backend.core.context_packing import context_token_budget
+from backend.core.metrics import ORCHESTRATOR_STEP_FAILURES_TOTAL, ORCHESTRATOR_STEP_SECONDS, step_timer
+from backend.core.reference_index import get_reference_index
+from backend.core.singleflight import SingleFlight, normalize_question
+from backend.core.retriever import format_context_from_docs
 
 
 class QuranQueryRequest(BaseModel):
@@ -21,6 +33,7 @@ class QuranQueryRequest(BaseModel):
     verse_filter: Optional[int] = None
     model_name: str = "gpt-3.5-turbo"
     use_direct_tafsir: bool = False
+    include_supplementary: bool = False  # Add vector-search passages to exact surah:verse lookups
 
 
 class QuranQueryResponse(BaseModel):
@@ -41,7 +54,9 @@ class A2AOrchestrator:
         self,
         vector_store_path: str = "vector_db/faiss_index",
         tafsirs_dir: str = "data/tafsirs",
-        model_name: str = "gpt-3.5-turbo"
+        model_name: str = "gpt-3.5-turbo",
+        quran_path: str = "data/quran.json",
+        step_timeouts: Optional[Dict[str, float]] = None
     ):
         """
         Initialize the orchestrator with the required agents.
@@ -50,10 +65,21 @@ class A2AOrchestrator:
             vector_store_path: Path to the FAISS vector store
             tafsirs_dir: Directory containing tafsir JSON files
             model_name: Default model name to use for generation
+            quran_path: Path to the Quran JSON file used for exact reference lookups
+            step_timeouts: Seconds per context step (``direct_tafsir``,
+                ``reference_lookup``, ``retrieval``) overriding the config; 0 disables
         """
+        self.step_timeouts = {
+            "direct_tafsir": ORCHESTRATOR_DIRECT_TAFSIR_TIMEOUT,
+            "reference_lookup": ORCHESTRATOR_REFERENCE_TIMEOUT,
+            "retrieval": ORCHESTRATOR_RETRIEVAL_TIMEOUT,
+            **(step_timeouts or {})
+        }
         self.retriever_agent = RetrieverAgent(vector_store_path=vector_store_path)
         self.generator_agent = GeneratorAgent(model_name=model_name)
         self.tafsir_tool_agent = TafsirToolAgent(tafsirs_dir=tafsirs_dir)
+        self.reference_index = get_reference_index(quran_path, tafsirs_dir)
+        self.single_flight = SingleFlight("orchestrator")
         print("Initialized A2A Orchestrator with all agents")
         
     async def process_query(self, request: QuranQueryRequest) -> QuranQueryResponse:
@@ -66,68 +92,142 @@ class A2AOrchestrator:
         Returns:
             A response containing the answer and sources
         """
+        # Identical requests in flight at the same time share one run
+        key = (
+            normalize_question(request.query),
+            request.surah_filter,
+            request.verse_filter,
+            request.model_name,
+            request.use_direct_tafsir,
+            request.include_supplementary
+        )
+        response, _ = await self.single_flight.do(key, lambda: self._timed_process_query(request))
+        return response
+
+    async def _timed_process_query(self, request: QuranQueryRequest) -> QuranQueryResponse:
+        with step_timer(ORCHESTRATOR_STEP_SECONDS, step="total"):
+            return await self._process_query(request)
+
+    async def _run_step(self, step: str, awaitable: Awaitable) -> Optional[Any]:
+        """
+        Await one context step under its timeout.
+
+        A step that times out or fails is logged and counted, and ``None`` is
+        returned so the answer is built from the steps that did finish.
+        Blocking work already handed to a thread keeps running in the
+        background after a timeout, but is no longer waited for.
+        """
+        timeout = self.step_timeouts.get(step) or None
+        try:
+            with step_timer(ORCHESTRATOR_STEP_SECONDS, step=step):
+                return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            print(f"Warning: Orchestrator step {step} timed out after {timeout}s, continuing without it")
+            ORCHESTRATOR_STEP_FAILURES_TOTAL.inc(step=step, reason="timeout")
+        except Exception as e:
+            print(f"Warning: Orchestrator step {step} failed, continuing without it: {e}")
+            ORCHESTRATOR_STEP_FAILURES_TOTAL.inc(step=step, reason="error")
+        return None
+
+    async def _lookup_reference(self, surah: int, verse: int) -> List[Dict[str, Any]]:
+        return self.reference_index.lookup(surah, verse)
+
+    async def _process_query(self, request: QuranQueryRequest) -> QuranQueryResponse:
+        # Each step is timed in quran_rag_orchestrator_step_seconds
         # Step 1: Prepare filters
         filters_applied = {}
         if request.surah_filter:
             filters_applied["surah_filter"] = request.surah_filter
         if request.verse_filter:
             filters_applied["verse_filter"] = request.verse_filter
-            
-        # Track all sources
-        all_sources = []
         
-        # Step 2: Check if direct tafsir lookup is needed
-        direct_tafsir_result = None
-        if request.use_direct_tafsir and request.surah_filter and request.verse_filter:
-            # Use the Tafsir Tool Agent for direct lookup
-            tafsir_request = TafsirLookupRequest(
+        # Step 2: Gather context. The direct tafsir lookup, the exact reference
+        # lookup and the retriever do not depend on each other, so they run
+        # concurrently: the wait is the slowest step (bounded by its timeout),
+        # not the sum. An exact surah:verse request is answered from the
+        # reference index; the retriever only runs for open questions or when
+        # supplementary passages were requested.
+        exact_reference = bool(request.surah_filter and request.verse_filter)
+        steps: Dict[str, Awaitable] = {}
+        if request.use_direct_tafsir and exact_reference:
+            steps["direct_tafsir"] = self.tafsir_tool_agent.process(TafsirLookupRequest(
                 query=f"Get tafsir for Surah {request.surah_filter}, Verse {request.verse_filter}",
                 surah=request.surah_filter,
                 verse=request.verse_filter
-            )
-            
-            tafsir_response = await self.tafsir_tool_agent.process(tafsir_request)
-            
+            ))
+        if exact_reference:
+            steps["reference_lookup"] = self._lookup_reference(request.surah_filter, request.verse_filter)
+        if not exact_reference or request.include_supplementary:
+            steps["retrieval"] = self.retriever_agent.process(RetrieverAgentRequest(
+                query=request.query,
+                surah_filter=request.surah_filter,
+                # Supplementary passages come from the whole surah
+                verse_filter=None if exact_reference else request.verse_filter,
+                model_name=request.model_name,
+                parameters={
+                    "k": 5,
+                    "use_compression": True
+                }
+            ))
+        results = dict(zip(steps, await asyncio.gather(
+            *(self._run_step(step, awaitable) for step, awaitable in steps.items())
+        )))
+        
+        # Step 3: Assemble sources and context in a fixed order, skipping
+        # steps that timed out or failed
+        all_sources = []
+        context_docs = []
+        direct_tafsir_result = None
+        tafsir_response = results.get("direct_tafsir")
+        if tafsir_response is not None:
             direct_tafsir_result = {
                 "tafsir_name": tafsir_response.tafsir_name,
                 "surah": tafsir_response.surah,
                 "verse": tafsir_response.verse,
                 "text": tafsir_response.tafsir_text
             }
-            
-            # Add to sources
             all_sources.append({
                 "source_type": "tafsir",
                 "reference": f"{request.surah_filter}:{request.verse_filter}",
                 "content": tafsir_response.tafsir_text
             })
         
-        # Step 3: Use the Retriever Agent to get relevant content
-        retriever_request = RetrieverAgentRequest(
-            query=request.query,
-            surah_filter=request.surah_filter,
-            verse_filter=request.verse_filter,
-            parameters={
-                "k": 5,
-                "use_compression": True
-            }
-        )
+        reference_docs = results.get("reference_lookup")
+        if reference_docs is not None:
+            context_docs.extend(reference_docs)
+            for doc in reference_docs:
+                all_sources.append({
+                    "source_type": doc["metadata"].get("source", "unknown"),
+                    "reference": doc["metadata"].get("reference", "unknown"),
+                    "content": doc["content"]
+                })
         
-        retriever_response = await self.retriever_agent.process(retriever_request)
+        retriever_response = results.get("retrieval")
+        if retriever_response is not None:
+            # Add retrieved documents to the context candidates and sources
+            if hasattr(retriever_response, 'documents') and retriever_response.documents:
+                context_docs.extend(retriever_response.documents)
+                for doc in retriever_response.documents:
+                    # Convert to a standardized source format
+                    source = {
+                        "source_type": doc.get("metadata", {}).get("source", "unknown"),
+                        "reference": doc.get("metadata", {}).get("reference", "unknown"),
+                        "content": doc.get("content", "")
+                    }
+                    all_sources.append(source)
         
-        # Extract documents from retriever response
-        context = retriever_response.formatted_context
-        
-        # Add retrieved documents to sources
-        if hasattr(retriever_response, 'documents') and retriever_response.documents:
-            for doc in retriever_response.documents:
-                # Convert to a standardized source format
-                source = {
-                    "source_type": doc.get("metadata", {}).get("source", "unknown"),
-                    "reference": doc.get("metadata", {}).get("reference", "unknown"),
-                    "content": doc.get("content", "")
-                }
-                all_sources.append(source)
+        # Pack the reference and retrieved passages together, so that the
+        # combined context stays within the chat model's token budget
+        if context_docs:
+            context_docs = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.retriever_agent.select_context(request.query, context_docs, request.model_name)
+            )
+        token_budget = context_token_budget(request.model_name) if CONTEXT_PACKING_ENABLED else None
+        context = format_context_from_docs([
+            Document(page_content=doc["content"], metadata=doc["metadata"])
+            for doc in context_docs
+        ], token_budget) if context_docs else ""
         
         # Step 4: Use the Generator Agent to create the answer
         generator_request = GeneratorAgentRequest(
@@ -140,7 +240,8 @@ class A2AOrchestrator:
             }
         )
         
-        generator_response = await self.generator_agent.process(generator_request)
+        with step_timer(ORCHESTRATOR_STEP_SECONDS, step="generation"):
+            generator_response = await self.generator_agent.process(generator_request)
         
         # Step 5: Compile the final response
         return QuranQueryResponse(
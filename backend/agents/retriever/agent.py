@@ -8,13 +8,17 @@ from typing import Any, Dict, List, Optional
 
 from backend.agents.base import BaseAgent, AgentRequest, AgentResponse
 from backend.core.retriever import (
-    create_enhanced_retriever,
+    RetrieverPool,
     retrieve_relevant_context,
     format_context_from_docs
 )
-from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
+from backend.core.config import CONTEXT_PACKING_ENABLED
+from backend.core.context_packing import ContextPacker, context_token_budget
 from backend.core.embeddings import get_embeddings_model
+from backend.core.incremental_index import embedding_model_id
+from backend.core.vector_search import PrefilteredFAISS, embed_query_array
 
 
 class RetrieverAgentRequest(AgentRequest):
@@ -23,6 +27,7 @@ class RetrieverAgentRequest(AgentRequest):
     verse_filter: Optional[int] = None
     k: int = 5
     use_compression: bool = True
+    model_name: str = "gpt-3.5-turbo"  # Chat model whose token budget the context is packed into
 
 
 class RetrieverAgentResponse(AgentResponse):
@@ -58,7 +63,7 @@ class RetrieverAgent(BaseAgent):
     def _initialize_vector_store(self):
         """Initialize the vector store from disk."""
         try:
-            self.vector_store = FAISS.load_local(
+            self.vector_store = PrefilteredFAISS.load_local(
                 self.vector_store_path,
                 self.embeddings,
                 allow_dangerous_deserialization=True
@@ -67,12 +72,39 @@ class RetrieverAgent(BaseAgent):
         except Exception as e:
             raise RuntimeError(f"Failed to load vector store: {e}")
         
-        # Create the retriever with default settings
-        self.retriever = create_enhanced_retriever(
-            self.vector_store,
-            k=5,
-            use_compression=True
-        )
+        # Shared pipelines, the default one (k=5 with compression) prebuilt
+        self.retriever_pool = RetrieverPool(self.vector_store)
+        self._initialize_context_packer()
+
+    def _initialize_context_packer(self):
+        """Load the token counts and chunk vectors used to pack the context."""
+        self.context_packer = None
+        if not CONTEXT_PACKING_ENABLED:
+            return
+        packer = ContextPacker.load(self.vector_store_path, embedding_model_id(self.embeddings))
+        if packer is None or len(packer) != self.vector_store.index.ntotal:
+            print("Warning: Token counts missing or out of date, trimming the context to the token budget only")
+            return
+        self.context_packer = packer
+
+    def select_context(self, query: str, documents: List[Dict[str, Any]], model_name: str = "gpt-3.5-turbo") -> List[Dict[str, Any]]:
+        """
+        The documents to put in the prompt, packed by MMR into the model's token budget.
+
+        Documents without a ``row`` (exact reference lookups) are always kept
+        and counted first (see :meth:`ContextPacker.select`). Without token
+        counts every document is returned; ``format_context_from_docs`` then
+        trims them to the budget.
+        """
+        if self.context_packer is None:
+            return list(documents)
+        query_vector = None
+        if self.context_packer.has_vectors:
+            try:
+                query_vector = embed_query_array(self.embeddings, query)
+            except Exception as e:
+                print(f"Warning: Could not embed the query, packing the context by retrieval order: {e}")
+        return self.context_packer.select(documents, context_token_budget(model_name), query_vector)
     
     async def process(self, request: RetrieverAgentRequest) -> RetrieverAgentResponse:
         """
@@ -99,31 +131,40 @@ class RetrieverAgent(BaseAgent):
         if verse_filter:
             filter_criteria["verse"] = verse_filter
             
-        # Update retriever if needed
-        if k != 5 or not use_compression:
-            self.retriever = create_enhanced_retriever(
-                self.vector_store, 
-                k=k,
-                use_compression=use_compression
-            )
-            
-        # Run the retrieval process in a thread to avoid blocking
+        # Run the retrieval process in a thread to avoid blocking. Pipelines
+        # are shared and never modified, so parallel requests need no locking;
+        # a new k builds its pipeline here, off the event loop
         loop = asyncio.get_event_loop()
         documents = await loop.run_in_executor(
             None,
-            lambda: retrieve_relevant_context(self.retriever, query, filter_criteria)
+            lambda: retrieve_relevant_context(self.retriever_pool.get(k, use_compression), query, filter_criteria)
         )
         
-        # Format the context
-        formatted_context = format_context_from_docs(documents)
-        
-        # Convert documents to serializable format
+        # Convert documents to serializable format; the vector store records
+        # each document's docstore row in its metadata
         serializable_docs = []
         for doc in documents:
-            serializable_docs.append({
+            metadata = dict(doc.metadata)
+            row = metadata.pop("row", None)
+            serializable = {
                 "content": doc.page_content,
-                "metadata": doc.metadata
-            })
+                "metadata": metadata
+            }
+            if row is not None:
+                serializable["row"] = row
+            serializable_docs.append(serializable)
+
+        # Pack the context into the requested chat model's token budget
+        model_name = request.parameters.get("model_name", request.model_name) if request.parameters else request.model_name
+        context_docs = await loop.run_in_executor(
+            None,
+            lambda: self.select_context(query, serializable_docs, model_name)
+        )
+        token_budget = context_token_budget(model_name) if CONTEXT_PACKING_ENABLED else None
+        formatted_context = format_context_from_docs(
+            [Document(page_content=doc["content"], metadata=doc["metadata"]) for doc in context_docs],
+            token_budget
+        )
             
         return RetrieverAgentResponse(
             content=formatted_context,
@@ -3,19 +3,19 @@ Tool agent implementation for tafsir lookup using A2A protocol.
 This agent provides specialized tools for the RAG Quran system.
 """
 
-import asyncio
-import json
-import os
 from typing import Any, Dict, List, Optional
 
 from backend.agents.base import BaseAgent, AgentRequest, AgentResponse
+from backend.core.tafsir_store import get_tafsir_store, readable_tafsir_name
 
 
 class TafsirLookupRequest(AgentRequest):
     """Specialized request model for tafsir lookup."""
+    query: str = ""
     surah: int
     verse: int
     tafsir_name: Optional[str] = None
+    end_verse: Optional[int] = None  # Look up verse..end_verse when set
 
 
 class TafsirLookupResponse(AgentResponse):
@@ -48,29 +48,20 @@ class TafsirToolAgent(BaseAgent):
         self._load_available_tafsirs()
         
     def _load_available_tafsirs(self):
-        """Load the list of available tafsirs."""
+        """Load the shared tafsir store and the list of available tafsirs."""
         try:
-            self.available_tafsirs = {}
-            # Get all JSON files in the tafsirs directory
-            for filename in os.listdir(self.tafsirs_dir):
-                if filename.endswith('.json'):
-                    tafsir_id = filename.replace('.json', '')
-                    
-                    # Extract a more readable name from the tafsir ID
-                    if '-' in tafsir_id:
-                        lang_code, tafsir_name = tafsir_id.split('-', 1)
-                        readable_name = tafsir_name.replace('-', ' ').title()
-                    else:
-                        readable_name = tafsir_id.replace('-', ' ').title()
-                        
-                    self.available_tafsirs[tafsir_id] = {
-                        'filename': filename,
-                        'readable_name': readable_name
-                    }
-                    
+            self.store = get_tafsir_store(self.tafsirs_dir)
+            self.available_tafsirs = {
+                tafsir_id: {
+                    'filename': f"{tafsir_id}.json",
+                    'readable_name': readable_tafsir_name(tafsir_id)
+                }
+                for tafsir_id in self.store.tafsir_ids
+            }
             print(f"Loaded {len(self.available_tafsirs)} available tafsirs")
         except Exception as e:
             print(f"Warning: Could not load tafsirs - {e}")
+            self.store = None
             self.available_tafsirs = {}
     
     async def process(self, request: TafsirLookupRequest) -> TafsirLookupResponse:
@@ -87,6 +78,7 @@ class TafsirToolAgent(BaseAgent):
         surah = request.parameters.get("surah", request.surah) if request.parameters else request.surah
         verse = request.parameters.get("verse", request.verse) if request.parameters else request.verse
         tafsir_name = request.parameters.get("tafsir_name", request.tafsir_name) if request.parameters else request.tafsir_name
+        end_verse = request.parameters.get("end_verse", request.end_verse) if request.parameters else request.end_verse
         
         # Default to the first available tafsir if none specified
         if not tafsir_name and self.available_tafsirs:
@@ -103,18 +95,17 @@ class TafsirToolAgent(BaseAgent):
                 verse=verse
             )
             
-        # Run the lookup process in a thread to avoid blocking
-        loop = asyncio.get_event_loop()
-        tafsir_text = await loop.run_in_executor(
-            None,
-            lambda: self._lookup_tafsir(tafsir_name, surah, verse)
-        )
+        # Lookups are in-memory dictionary reads, no need for a worker thread
+        if end_verse and end_verse > verse:
+            tafsir_text = self._lookup_tafsir_range(tafsir_name, surah, verse, end_verse)
+        else:
+            tafsir_text = self._lookup_tafsir(tafsir_name, surah, verse)
         
         readable_name = self.available_tafsirs[tafsir_name]['readable_name']
         
         return TafsirLookupResponse(
             content=tafsir_text,
-            metadata={"tafsir": tafsir_name, "surah": surah, "verse": verse},
+            metadata={"tafsir": tafsir_name, "surah": surah, "verse": verse, "end_verse": end_verse},
             tafsir_text=tafsir_text,
             tafsir_name=readable_name,
             surah=surah,
@@ -133,26 +124,28 @@ class TafsirToolAgent(BaseAgent):
         Returns:
             The tafsir text for the specified verse
         """
-        try:
-            # Get the filename for the requested tafsir
-            filename = os.path.join(self.tafsirs_dir, self.available_tafsirs[tafsir_name]['filename'])
-            
-            # Load the tafsir data
-            with open(filename, 'r', encoding='utf-8') as file:
-                tafsir_data = json.load(file)
-                
-            # Lookup by surah and verse
-            surah_str = str(surah)
-            verse_str = str(verse)
+        text = self.store.get(tafsir_name, surah, verse)
+        if text is None:
+            return f"No tafsir found for Surah {surah}, Verse {verse} in {tafsir_name}"
+        return text
+    
+    def _lookup_tafsir_range(self, tafsir_name: str, surah: int, start_verse: int, end_verse: int) -> str:
+        """
+        Look up the tafsir texts for a range of verses.
+        
+        Args:
+            tafsir_name: Name of the tafsir
+            surah: Surah number
+            start_verse: First verse number
+            end_verse: Last verse number (inclusive)
             
-            if surah_str in tafsir_data and verse_str in tafsir_data[surah_str]:
-                return tafsir_data[surah_str][verse_str]
-            else:
-                return f"No tafsir found for Surah {surah}, Verse {verse} in {tafsir_name}"
-                
-        except Exception as e:
-            print(f"Error looking up tafsir: {e}")
-            return f"Error retrieving tafsir: {str(e)}"
+        Returns:
+            The tafsir texts, one paragraph per verse prefixed with its reference
+        """
+        entries = self.store.get_range(tafsir_name, surah, start_verse, end_verse)
+        if not entries:
+            return f"No tafsir found for Surah {surah}, Verses {start_verse}-{end_verse} in {tafsir_name}"
+        return "\n\n".join(f"[{surah}:{verse}] {text}" for verse, text in entries)
     
     def get_capabilities(self) -> List[str]:
         """
@@ -164,5 +157,6 @@ class TafsirToolAgent(BaseAgent):
         return [
             "tafsir-lookup",
             "verse-explanation",
-            "direct-reference"
+            "direct-reference",
+            "range-lookup"
         ]
\ No newline at end of file
@@ -6,18 +6,33 @@ import numpy as np
 import faiss
 import requests
 import time
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from langchain_core.embeddings import Embeddings
 
 # Import from the new structure
-from backend.core.config import VECTOR_DB_PATH
+from backend.core.config import (VECTOR_DB_PATH, API_EMBEDDING_MODEL_TYPE, ANSWER_CACHE_ENABLED, HYBRID_SEARCH_ENABLED,
+                                 SENTENCE_COMPRESSION_ENABLED, CONTEXT_PACKING_ENABLED)
 from backend.core.embeddings import get_embedding_model
 from backend.core.api_key_manager import load_api_key, ensure_api_key
-from backend.core.generator import generate_answer, create_answer_generator
-from backend.core.direct_openai import generate_answer_with_openai
+from backend.core.generator import generate_answer, get_answer_generator
+from backend.core.direct_openai import agenerate_answer_with_openai, astream_answer_with_openai, close_openai_clients
+from backend.core.concurrency import run_blocking, shutdown_executor
+from backend.core.docstore import load_docstore
+from backend.core.ann_index import apply_search_params, describe_index
+from backend.core.vector_search import MetadataIndex, batch_retrieve, embed_query_array, hybrid_search, search_vectors
+from backend.core.lexical_index import load_lexical_index
+from backend.core.sentence_index import load_sentence_index
+from backend.core.context_packing import ContextPacker, context_token_budget
+from backend.core.incremental_index import embedding_model_id
+from backend.core.reference_index import get_reference_index
+from backend.core.embedding_cache import get_embedding_cache
+from backend.core.answer_cache import SemanticAnswerCache, make_cache_key
+from backend.core.singleflight import SingleFlight, normalize_question
+from backend.core.metrics import FALLBACK_TOTAL, REGISTRY, ServerTimingMiddleware, observe_stage, stage_timer
 
 # Direct OpenAI function for fallback mode
 def generate_direct_answer(question, api_key):
@@ -106,11 +121,19 @@ app = FastAPI(
     description="API for querying information about the Quran using RAG technology",
     version="1.0.0"
 )
+# Per-stage durations of each request in a Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
 
 # Global variables to store models and data
 embeddings = None
 index = None
-docstore_data = None
+docstore = None
+metadata_index = None
+lexical_index = None
+sentence_index = None
+context_packer = None
+reference_index = None
+answer_cache = None
 rag_system_ready = False
 initialization_error = None
 
@@ -120,7 +143,15 @@ load_dotenv()
 # Initialize the RAG system on startup
 @app.on_event("startup")
 async def startup_event():
-    global embeddings, index, docstore_data, rag_system_ready, initialization_error
+    global embeddings, index, docstore, metadata_index, lexical_index, sentence_index, context_packer, reference_index, answer_cache, rag_system_ready, initialization_error
+    
+    # Exact (surah, verse) lookups only need the source data, so build them
+    # independently of the vector database
+    try:
+        reference_index = get_reference_index()
+        print(f"✅ Reference index ready with {len(reference_index)} references")
+    except Exception as ref_error:
+        print(f"⚠️ WARNING: Could not build reference index: {ref_error}")
     
     try:
         # Check API key
@@ -130,16 +161,26 @@ async def startup_event():
             print("⚠️ WARNING: OpenAI API key not found")
             print("Some functionality may not work without an API key")
         
-        # Use basic embeddings for testing
-        print("Initializing basic embeddings for testing...")
-        class BasicEmbeddings(Embeddings):
-            def embed_documents(self, texts):
-                return [[1.0] * 384 for _ in texts]
-            def embed_query(self, text):
-                return [1.0] * 384
-        
-        embeddings = BasicEmbeddings()
-        print("✅ Successfully initialized basic embeddings")
+        if API_EMBEDDING_MODEL_TYPE == "basic":
+            # Use basic embeddings for testing
+            print("Initializing basic embeddings for testing...")
+            class BasicEmbeddings(Embeddings):
+                def embed_documents(self, texts):
+                    return [[1.0] * 384 for _ in texts]
+                def embed_query(self, text):
+                    return [1.0] * 384
+            
+            embeddings = BasicEmbeddings()
+            print("✅ Successfully initialized basic embeddings")
+        else:
+            print(f"Initializing {API_EMBEDDING_MODEL_TYPE} embeddings...")
+            embeddings = get_embedding_model(API_EMBEDDING_MODEL_TYPE)
+            print(f"✅ Successfully initialized {API_EMBEDDING_MODEL_TYPE} embeddings")
+            
+            # Constant placeholder embeddings would make every question a cache hit
+            if ANSWER_CACHE_ENABLED:
+                answer_cache = SemanticAnswerCache()
+                print(f"✅ Semantic answer cache enabled (threshold {answer_cache.threshold})")
         
         try:
             # Load FAISS index
@@ -154,21 +195,45 @@ async def startup_event():
             
             print("Loading FAISS index...")
             index = faiss.read_index(os.path.join(index_path, "index.faiss"))
-            print("✅ FAISS index loaded successfully")
-            
-            if not os.path.exists(os.path.join(index_path, "docstore.json")):
-                print(f"❌ ERROR: docstore.json file not found in {index_path}")
-                raise FileNotFoundError(f"docstore.json file not found in {index_path}")
+            # nprobe / efSearch are not stored in the index file
+            apply_search_params(index)
+            print(f"✅ FAISS index loaded successfully: {describe_index(index)}")
             
-            # Load the documents
+            # Memory-map the columnar document store (converted from the
+            # LangChain output on first start)
             print("Loading document store...")
-            with open(os.path.join(index_path, "docstore.json"), 'r') as f:
-                docstore_data = json.load(f)
+            docstore = load_docstore(index_path)
             
-            doc_count = len(docstore_data['docstore']['_dict'])
+            doc_count = len(docstore)
             print(f"✅ Loaded {doc_count} documents")
             if doc_count == 0:
                 print("❌ WARNING: Document store is empty")
+            
+            # Group rows by surah/verse so filtered requests only search their subset
+            metadata_index = MetadataIndex.from_docstore(docstore)
+            
+            # BM25 postings over the same rows (built and cached on first start)
+            try:
+                lexical_index = load_lexical_index(docstore)
+                print(f"✅ Keyword index ready with {len(lexical_index.vocabulary)} terms")
+            except Exception as lex_error:
+                print(f"⚠️ WARNING: Could not build keyword index: {lex_error}")
+            
+            # Sentence embeddings for extractive context compression (written at index-build time)
+            sentence_index = load_sentence_index(index_path)
+            if sentence_index is not None:
+                if sentence_index.model_id != embedding_model_id(embeddings) or len(sentence_index) != doc_count:
+                    print(f"⚠️ WARNING: Sentence index does not match the loaded model or documents "
+                          f"({sentence_index.model_id}), context compression disabled")
+                    sentence_index = None
+                else:
+                    print(f"✅ Sentence index ready with {sentence_index.num_sentences} sentences")
+            
+            # Token counts and chunk vectors for packing the prompt context (written at index-build time)
+            context_packer = ContextPacker.load(index_path, embedding_model_id(embeddings))
+            if context_packer is None or len(context_packer) != doc_count:
+                print("⚠️ WARNING: No token counts for this index, rebuild it to pack the context within a token budget")
+                context_packer = None
         except Exception as idx_error:
             print(f"❌ ERROR loading vector database: {str(idx_error)}")
             raise
@@ -183,11 +248,20 @@ async def startup_event():
         print("Entering fallback mode - API will still function but RAG capabilities may be limited")
         # We'll continue anyway and enter fallback mode
 
+# Release the shared OpenAI connections and worker threads on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_openai_clients()
+    shutdown_executor()
+
 # Request model
 class QuestionRequest(BaseModel):
     question: str
     surah_filter: Optional[int] = None
     verse_filter: Optional[int] = None
+    # With both filters set the verse and its tafsirs are looked up directly;
+    # set this to also add vector-search passages from the same surah
+    include_supplementary: bool = False
 
 # Source item model
 class SourceItem(BaseModel):
@@ -201,48 +275,60 @@ class AnswerResponse(BaseModel):
     sources: List[SourceItem]
     filters_applied: Dict[str, Any]
 
+# Batch retrieval models
+class BatchRetrieveRequest(BaseModel):
+    questions: List[str]
+    k: int = 15
+    surah_filter: Optional[int] = None
+    verse_filter: Optional[int] = None
+
+class RetrievedDocument(BaseModel):
+    content: str
+    metadata: Dict[str, Any]
+    score: float
+
+class BatchRetrieveResult(BaseModel):
+    question: str
+    documents: List[RetrievedDocument]
+
+class BatchRetrieveResponse(BaseModel):
+    results: List[BatchRetrieveResult]
+    elapsed_seconds: float
+
 # Helper functions to work with our modules in the API
 def retrieve_documents(query, filters=None):
     """Retrieve relevant documents from vector database"""
-    global embeddings, index, docstore_data, rag_system_ready
+    global embeddings, index, docstore, metadata_index, rag_system_ready
     
     start_time = time.time()
     
     # Check if we're in fallback mode
     if FALLBACK_MODE:
         print("Using fallback mode for document retrieval")
-        # Load sample documents from docstore.json if available
+        FALLBACK_TOTAL.inc(path="keyword_retrieval")
+        # BM25 over the inverted index instead of scanning every document
         try:
-            if docstore_data is not None:
-                # Try to get documents from the existing docstore
-                results = []
-                for doc_id, doc in docstore_data['docstore']['_dict'].items():
-                    # Apply filter if specified
-                    if filters and 'surah' in filters and filters['surah']:
-                        surah_filter = filters['surah']
-                        doc_metadata = doc.get('metadata', {})
-                        if 'surah' in doc_metadata and str(doc_metadata['surah']) != str(surah_filter):
-                            continue
-                    
-                    # Simple keyword matching since we can't use embeddings
-                    doc_content = doc.get('page_content', '').lower()
-                    if any(keyword in doc_content for keyword in query.lower().split()):
-                        results.append({
-                            'content': doc.get('page_content', ''),
-                            'metadata': doc.get('metadata', {}),
-                            'score': 1.0  # Dummy score
-                        })
-                
-                if results:
-                    print(f"Found {len(results)} documents using keyword matching")
-                    return results[:5]  # Return up to 5 documents
-                
+            if docstore is not None and lexical_index is not None:
+                row_ids = None
+                if filters and filters.get('surah') and metadata_index is not None:
+                    row_ids = metadata_index.rows_for(filters['surah'])
+                with stage_timer("bm25_search"):
+                    rows, scores = lexical_index.search(query, 5, row_ids)
+                if len(rows):
+                    print(f"Found {len(rows)} documents using keyword search")
+                    results = docstore.get_batch(rows)
+                    for doc, score, row in zip(results, scores, rows):
+                        doc['score'] = float(score)
+                        doc['row'] = int(row)
+                    return results
+            
+            if docstore is not None:
                 # If no matches, return first document as a fallback
-                if docstore_data['docstore']['_dict']:
-                    first_doc = list(docstore_data['docstore']['_dict'].values())[0]
+                if len(docstore) > 0:
+                    first_doc = docstore.get(0)
                     return [{
-                        'content': first_doc.get('page_content', 'No content available'),
-                        'metadata': first_doc.get('metadata', {'source': 'fallback', 'reference': 'fallback-1'}),
+                        'content': first_doc['content'] or 'No content available',
+                        'metadata': first_doc['metadata'],
                         'score': 1.0
                     }]
         except Exception as e:
@@ -288,7 +374,7 @@ def retrieve_documents(query, filters=None):
         print("❌ ERROR: FAISS index is None")
         raise HTTPException(status_code=500, detail="Vector database not initialized")
     
-    if docstore_data is None:
+    if docstore is None:
         print("❌ ERROR: Document store is None")
         raise HTTPException(status_code=500, detail="Document store not initialized")
     
@@ -310,10 +396,11 @@ def retrieve_documents(query, filters=None):
         # Embed the query
         print(f"Embedding query: {enhanced_query}")
         try:
-            query_vector = embeddings.embed_query(enhanced_query)
+            # (1, d) float32 straight from the model, no float-list round trip
+            with stage_timer("embedding"):
+                query_vector = embed_query_array(embeddings, enhanced_query)[None, :]
             if DEBUG_MODE:
-                print(f"Embedding successful, dimension: {len(query_vector)}")
-            query_vector = np.array([query_vector]).astype('float32')
+                print(f"Embedding successful, dimension: {query_vector.shape[1]}")
         except Exception as e:
             if DEBUG_MODE:
                 print(f"❌ ERROR embedding query: {str(e)}")
@@ -325,44 +412,27 @@ def retrieve_documents(query, filters=None):
         if DEBUG_MODE:
             print(f"Searching for top {k} matches...")
         
+        # Resolve filters to candidate rows so only that subset is searched
+        row_ids = None
+        if filters and metadata_index is not None:
+            row_ids = metadata_index.rows_for(filters.get('surah'), filters.get('verse'))
+            if DEBUG_MODE and row_ids is not None:
+                print(f"Filters matched {len(row_ids)} candidate rows")
+        
         try:
-            distances, indices = index.search(query_vector, k)
+            # Search and materialize the hits in one vectorized pass, fused
+            # with the BM25 ranking of the question when hybrid search is on
+            if HYBRID_SEARCH_ENABLED and lexical_index is not None:
+                results = hybrid_search(index, docstore, lexical_index, query_vector, query, k, row_ids)
+            else:
+                results = search_vectors(index, docstore, query_vector, k, row_ids)[0]
             if DEBUG_MODE:
-                print(f"Search completed, raw indices: {indices[0][:5]}...")
+                print(f"Search completed, {len(results)} results")
         except Exception as e:
             if DEBUG_MODE:
                 print(f"❌ ERROR searching index: {str(e)}")
             raise
         
-        # Get the documents
-        results = []
-        valid_count = 0
-        filtered_count = 0
-        for i, idx in enumerate(indices[0]):
-            if idx < 0 or idx >= len(docstore_data['docstore']['_dict']):
-                if DEBUG_MODE and idx >= 0:
-                    print(f"Index {idx} out of bounds for docstore with {len(docstore_data['docstore']['_dict'])} items")
-                continue
-                
-            doc_id = str(idx)
-            if doc_id in docstore_data['docstore']['_dict']:
-                doc_info = docstore_data['docstore']['_dict'][doc_id]
-                doc_content = doc_info.get('text', '')
-                doc_metadata = doc_info.get('metadata', {})
-                
-                # Apply additional filters if provided
-                include = True
-                if filters and 'surah' in filters and filters['surah']:
-                    if 'surah_number' in doc_metadata and doc_metadata['surah_number'] != filters['surah']:
-                        include = False
-                
-                if include:
-                    results.append({
-                        'content': doc_content,
-                        'metadata': doc_metadata,
-                        'score': float(distances[0][i])
-                    })
-        
         print(f"Retrieved {len(results)} relevant documents")
         return results
     except Exception as e:
@@ -384,6 +454,28 @@ def retrieve_documents(query, filters=None):
             # In production mode, raise an error
             raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
 
+def retrieve_reference_documents(query, surah, verse, include_supplementary=False):
+    """
+    Assemble context for an exact surah:verse request without vector search.
+
+    The verse text and its tafsirs come straight from the reference index;
+    vector search over the same surah is only used for supplementary passages
+    when the caller asks for them.
+    """
+    results = reference_index.lookup(surah, verse)
+    if DEBUG_MODE:
+        print(f"Exact reference lookup for {surah}:{verse} returned {len(results)} documents")
+    
+    if include_supplementary:
+        seen_refs = {(doc['metadata'].get('source'), doc['metadata'].get('reference')) for doc in results}
+        for doc in retrieve_documents(query, {"surah": surah}):
+            ref_key = (doc['metadata'].get('source'), doc['metadata'].get('reference'))
+            if ref_key not in seen_refs:
+                seen_refs.add(ref_key)
+                results.append(doc)
+    
+    return results
+
 def prepare_sources(results):
     """Format the search results for the response"""
     if not results:
@@ -414,6 +506,38 @@ def prepare_sources(results):
     
     return sources
 
+def embed_question(question):
+    """
+    Embedding of a question, or None when the embedding model fails
+
+    Callers then skip the answer cache and pack / compress the context
+    without it.
+    """
+    try:
+        with stage_timer("embedding"):
+            return embed_query_array(embeddings, question)
+    except Exception as e:
+        print(f"Warning: Could not embed the question: {e}")
+        return None
+
+def select_context(question, results, question_vector=None, model="gpt-3.5-turbo"):
+    """
+    Passages for the LLM prompt: the most relevant, least redundant ones that
+    fit the model's token budget (see context_packing), each reduced to its
+    sentences closest to the question (see sentence_index)
+    """
+    packer = context_packer if CONTEXT_PACKING_ENABLED else None
+    compressor = sentence_index if SENTENCE_COMPRESSION_ENABLED else None
+    if question_vector is None and embeddings is not None and (compressor is not None or (packer is not None and packer.has_vectors)):
+        question_vector = embed_question(question)
+    if packer is not None:
+        with stage_timer("context_packing"):
+            results = packer.select(results, context_token_budget(model), question_vector)
+    if compressor is not None and question_vector is not None:
+        with stage_timer("sentence_compression"):
+            results = compressor.compress(question_vector, results)
+    return results
+
 def format_context_for_llm(results):
     """Format the search results into a context string for the LLM"""
     if not results:
@@ -440,17 +564,9 @@ def format_context_for_llm(results):
     
     return "\n\n".join(context_parts)
 
-@app.post("/api/ask", response_model=AnswerResponse)
-async def ask_question(request: QuestionRequest):
-    """
-    Get an answer to a question about the Quran
-    """
-    overall_start_time = time.time() # Start timing the whole request
-    if DEBUG_MODE:
-        print(f"\n----- Processing question: '{request.question}' -----")
-
-    # Ensure RAG system is ready before proceeding (unless in fallback)
-    if not rag_system_ready and not FALLBACK_MODE:
+def ensure_rag_ready(needs_vector_search):
+    """Raise a 503 when vector search is needed but the RAG system is not ready"""
+    if not rag_system_ready and not FALLBACK_MODE and needs_vector_search:
          # Check if initialization failed during startup
         if initialization_error:
              error_detail = f"RAG system initialization failed: {initialization_error}. Cannot process RAG queries."
@@ -462,6 +578,43 @@ async def ask_question(request: QuestionRequest):
              if DEBUG_MODE: print(f"WARNING: {error_detail}")
              raise HTTPException(status_code=503, detail=error_detail)
 
+# Identical questions asked while the first is still being answered share its computation
+ask_flight = SingleFlight("api_ask")
+
+@app.post("/api/ask", response_model=AnswerResponse)
+async def ask_question(request: QuestionRequest, response: Response):
+    """
+    Get an answer to a question about the Quran
+
+    Answers to near-duplicate questions (same filters) are served from the
+    semantic answer cache when it is enabled; the ``X-Answer-Cache`` response
+    header reports ``hit``, ``miss`` or ``bypass``. A request identical to one
+    still being answered (same question up to case and spacing, same
+    filters) waits for that answer and reports ``coalesced``.
+    """
+    key = (
+        normalize_question(request.question),
+        make_cache_key({"surah": request.surah_filter, "verse": request.verse_filter},
+                       include_supplementary=request.include_supplementary)
+    )
+    answer, shared = await ask_flight.do(key, lambda: answer_question(request, response))
+    if shared:
+        response.headers["X-Answer-Cache"] = "coalesced"
+    return answer
+
+async def answer_question(request: QuestionRequest, response: Response) -> AnswerResponse:
+    """Answer one question; called once per distinct in-flight request by ask_question"""
+    overall_start_time = time.time() # Start timing the whole request
+    if DEBUG_MODE:
+        print(f"\n----- Processing question: '{request.question}' -----")
+
+    # Both filters given: the context is an exact lookup, no embeddings needed
+    exact_reference = bool(reference_index is not None and request.surah_filter and request.verse_filter)
+
+    # Ensure RAG system is ready before proceeding (unless in fallback or
+    # answering from an exact reference alone)
+    ensure_rag_ready(not exact_reference or request.include_supplementary)
+
     try:
         # Create filters dictionary
         filters = {}
@@ -470,13 +623,42 @@ async def ask_question(request: QuestionRequest):
         if request.verse_filter:
             filters["verse"] = request.verse_filter
 
+        # Near-duplicate questions with the same filters reuse a cached answer
+        question_vector = None
+        cache_key = make_cache_key(filters, include_supplementary=request.include_supplementary)
+        response.headers["X-Answer-Cache"] = "bypass"
+        if answer_cache is not None and embeddings is not None:
+            question_vector = await run_blocking(embed_question, request.question)
+        if question_vector is not None:
+            cached = answer_cache.lookup(question_vector, cache_key)
+            if cached is not None:
+                response.headers["X-Answer-Cache"] = "hit"
+                if DEBUG_MODE:
+                    print(f"Answer cache hit (similarity {cached['similarity']:.3f})")
+                return AnswerResponse(
+                    answer=cached["answer"],
+                    sources=[SourceItem(**s) for s in cached["sources"]],
+                    filters_applied=filters
+                )
+            response.headers["X-Answer-Cache"] = "miss"
+
         if DEBUG_MODE:
             print(f"Retrieving documents with filters: {filters}")
 
         # --- Time the retrieval step ---
         retrieval_start_time = time.time()
         try:
-            results = retrieve_documents(request.question, filters)
+            # Embedding and FAISS search are blocking, keep them off the event loop
+            if exact_reference:
+                results = await run_blocking(
+                    retrieve_reference_documents,
+                    request.question,
+                    request.surah_filter,
+                    request.verse_filter,
+                    request.include_supplementary
+                )
+            else:
+                results = await run_blocking(retrieve_documents, request.question, filters)
             retrieval_duration = time.time() - retrieval_start_time
             if DEBUG_MODE:
                 print(f"⏱️ Document retrieval took {retrieval_duration:.2f} seconds.")
@@ -506,7 +688,10 @@ async def ask_question(request: QuestionRequest):
         # Format context for the LLM
         if DEBUG_MODE:
             print(f"Formatting {len(results)} documents for LLM")
-        context = format_context_for_llm(results)
+        # Sources keep every retrieved passage in full, only the prompt is packed and compressed
+        context_results = await run_blocking(select_context, request.question, results, question_vector)
+        with stage_timer("context_format"):
+            context = format_context_for_llm(context_results)
 
         # Prepare sources for the response
         sources = prepare_sources(results)
@@ -531,14 +716,11 @@ async def ask_question(request: QuestionRequest):
         # --- Time the LLM generation step ---
         generation_start_time = time.time()
         try:
-            # Create an answer generator instance
-            generator = create_answer_generator()
-            
             # Try direct_openai approach first (more reliable)
             answer = None
             try:
                 print("API using direct OpenAI implementation first")
-                direct_answer = generate_answer_with_openai(context, request.question)
+                direct_answer = await agenerate_answer_with_openai(context, request.question)
                 if direct_answer and isinstance(direct_answer, str):
                     answer = direct_answer
                     print("API successfully used direct OpenAI implementation")
@@ -550,7 +732,10 @@ async def ask_question(request: QuestionRequest):
                 try:
                     # Call generate_answer with all required parameters
                     print("API falling back to LangChain implementation")
-                    langchain_answer = generate_answer(generator, context, request.question)
+                    FALLBACK_TOTAL.inc(path="langchain_generator")
+                    # Shared chain, built on first use since the direct OpenAI path usually succeeds
+                    generator = await run_blocking(get_answer_generator)
+                    langchain_answer = await run_blocking(generate_answer, generator, context, request.question, raise_errors=True)
                     
                     # Ensure answer is a string
                     if isinstance(langchain_answer, dict):
@@ -571,11 +756,13 @@ async def ask_question(request: QuestionRequest):
                     raise Exception(f"Both OpenAI direct and LangChain approaches failed: {str(langchain_error)}")
                 
             generation_duration = time.time() - generation_start_time
+            observe_stage("llm_total", generation_duration)
             if DEBUG_MODE:
                 print(f"⏱️ LLM answer generation took {generation_duration:.2f} seconds.")
 
         except Exception as gen_error:
             generation_duration = time.time() - generation_start_time
+            FALLBACK_TOTAL.inc(path="generation_error")
             error_detail = f"Error generating answer with LLM: {str(gen_error)} (attempt took {generation_duration:.2f}s)"
             if DEBUG_MODE:
                 print(f"ERROR: {error_detail}")
@@ -592,6 +779,9 @@ async def ask_question(request: QuestionRequest):
         # Convert source dict to SourceItem model
         source_items = [SourceItem(**s) for s in sources]
 
+        if question_vector is not None:
+            answer_cache.store(question_vector, cache_key, answer, sources)
+
         overall_duration = time.time() - overall_start_time
         if DEBUG_MODE:
             print(f"✅ Successfully processed question in {overall_duration:.2f} seconds.")
@@ -617,11 +807,185 @@ async def ask_question(request: QuestionRequest):
             traceback.print_exc() # Print full stack trace in debug mode
         raise HTTPException(status_code=500, detail=error_detail)
 
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_answer_events(request: QuestionRequest, filters, exact_reference):
+    """
+    Yield the SSE events for a streamed answer.
+
+    Events are ``sources`` (sent as soon as retrieval finishes), one ``token``
+    per LLM text fragment, and a final ``done`` with timing metadata. Failures
+    after the stream has started are reported as an ``error`` event.
+    """
+    start_time = time.time()
+    first_token_time = None
+    cache_status = "bypass"
+    question_vector = None
+    cache_key = make_cache_key(filters, include_supplementary=request.include_supplementary)
+
+    def done_event(num_sources):
+        return sse_event("done", {
+            "filters_applied": filters,
+            "num_sources": num_sources,
+            "answer_cache": cache_status,
+            "time_to_first_token_seconds": (first_token_time - start_time) if first_token_time else None,
+            "elapsed_seconds": time.time() - start_time
+        })
+
+    try:
+        if answer_cache is not None and embeddings is not None:
+            question_vector = await run_blocking(embed_question, request.question)
+        if question_vector is not None:
+            cached = answer_cache.lookup(question_vector, cache_key)
+            if cached is not None:
+                cache_status = "hit"
+                yield sse_event("sources", {"sources": cached["sources"], "filters_applied": filters})
+                first_token_time = time.time()
+                yield sse_event("token", {"text": cached["answer"]})
+                yield done_event(len(cached["sources"]))
+                return
+            cache_status = "miss"
+
+        if exact_reference:
+            results = await run_blocking(
+                retrieve_reference_documents,
+                request.question,
+                request.surah_filter,
+                request.verse_filter,
+                request.include_supplementary
+            )
+        else:
+            results = await run_blocking(retrieve_documents, request.question, filters)
+        sources = prepare_sources(results)
+        yield sse_event("sources", {"sources": sources, "filters_applied": filters})
+
+        if not results:
+            first_token_time = time.time()
+            yield sse_event("token", {"text": "I couldn't find specific information relevant to your question in the available documents. You could try rephrasing."})
+            yield done_event(0)
+            return
+
+        if not load_api_key():
+            yield sse_event("error", {"detail": "OpenAI API key not found. Cannot generate answer."})
+            return
+
+        context_results = await run_blocking(select_context, request.question, results, question_vector)
+        with stage_timer("context_format"):
+            context = format_context_for_llm(context_results)
+        answer_parts = []
+        generation_start_time = time.time()
+        async for text in astream_answer_with_openai(context, request.question):
+            if first_token_time is None:
+                first_token_time = time.time()
+                observe_stage("llm_first_token", first_token_time - generation_start_time)
+                if DEBUG_MODE:
+                    print(f"⏱️ First token after {first_token_time - start_time:.2f} seconds.")
+            answer_parts.append(text)
+            yield sse_event("token", {"text": text})
+        observe_stage("llm_total", time.time() - generation_start_time)
+
+        # Reached only when the stream finished cleanly, a dropped stream raises above
+        if question_vector is not None and answer_parts:
+            answer_cache.store(question_vector, cache_key, "".join(answer_parts), sources)
+        yield done_event(len(sources))
+
+    except Exception as e:
+        if DEBUG_MODE:
+            print(f"ERROR: Streaming answer failed: {str(e)}")
+        yield sse_event("error", {"detail": f"Error streaming answer: {str(e)}"})
+
+@app.post("/api/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """
+    Stream an answer to a question about the Quran as Server-Sent Events
+
+    The retrieved sources are sent first, then the answer tokens as the LLM
+    produces them, then a ``done`` event with timing metadata.
+    """
+    exact_reference = bool(reference_index is not None and request.surah_filter and request.verse_filter)
+    ensure_rag_ready(not exact_reference or request.include_supplementary)
+
+    filters = {}
+    if request.surah_filter:
+        filters["surah"] = request.surah_filter
+    if request.verse_filter:
+        filters["verse"] = request.verse_filter
+
+    return StreamingResponse(
+        stream_answer_events(request, filters, exact_reference),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/ask/stream")
+async def ask_question_stream_get(
+    question: str = Query(..., description="Your question about the Quran"),
+    surah: Optional[int] = Query(None, description="Optional surah number filter"),
+    verse: Optional[int] = Query(None, description="Optional verse number filter"),
+    supplementary: bool = Query(False, description="Add vector-search passages to an exact surah:verse lookup")
+):
+    """
+    Stream an answer as Server-Sent Events (GET endpoint, usable with EventSource)
+    """
+    request = QuestionRequest(
+        question=question,
+        surah_filter=surah,
+        verse_filter=verse,
+        include_supplementary=supplementary
+    )
+    return await ask_question_stream(request)
+
+@app.post("/api/retrieve/batch", response_model=BatchRetrieveResponse)
+def retrieve_batch(request: BatchRetrieveRequest):
+    """
+    Retrieve documents for many questions in one call.
+
+    All questions are embedded together and searched with a single FAISS call,
+    which is much faster than looping over /api/ask for evaluation and
+    precompute jobs. No answer is generated.
+    """
+    if not rag_system_ready or embeddings is None or index is None or docstore is None:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG system not initialized properly. Check API status for details."
+        )
+    if request.k < 1:
+        raise HTTPException(status_code=422, detail="k must be at least 1")
+    
+    row_ids = None
+    if metadata_index is not None:
+        row_ids = metadata_index.rows_for(request.surah_filter, request.verse_filter)
+    
+    start_time = time.time()
+    try:
+        batch_results = batch_retrieve(embeddings, index, docstore, request.questions, request.k, row_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving documents: {str(e)}")
+    elapsed_time = time.time() - start_time
+    
+    if DEBUG_MODE:
+        print(f"⏱️ Batch retrieval of {len(request.questions)} questions took {elapsed_time:.2f} seconds.")
+    
+    return BatchRetrieveResponse(
+        results=[
+            BatchRetrieveResult(
+                question=question,
+                documents=[RetrievedDocument(**doc) for doc in documents]
+            )
+            for question, documents in zip(request.questions, batch_results)
+        ],
+        elapsed_seconds=elapsed_time
+    )
+
 @app.get("/api/ask")
 async def ask_question_get(
+    response: Response,
     question: str = Query(..., description="Your question about the Quran"),
     surah: Optional[int] = Query(None, description="Optional surah number filter"),
-    verse: Optional[int] = Query(None, description="Optional verse number filter")
+    verse: Optional[int] = Query(None, description="Optional verse number filter"),
+    supplementary: bool = Query(False, description="Add vector-search passages to an exact surah:verse lookup")
 ):
     """
     Get an answer to a question about the Quran (GET endpoint)
@@ -630,9 +994,10 @@ async def ask_question_get(
     request = QuestionRequest(
         question=question,
         surah_filter=surah,
-        verse_filter=verse
+        verse_filter=verse,
+        include_supplementary=supplementary
     )
-    return await ask_question(request)
+    return await ask_question(request, response)
 
 @app.get("/")
 async def root():
@@ -647,10 +1012,19 @@ async def root():
     # Check RAG components
     details["embeddings"] = "initialized" if embeddings is not None else "failed"
     details["vector_db"] = "initialized" if index is not None else "failed"
-    details["document_store"] = "initialized" if docstore_data is not None else "failed"
+    if index is not None:
+        details["vector_index"] = describe_index(index)
+    details["document_store"] = "initialized" if docstore is not None else "failed"
+    details["reference_index"] = "initialized" if reference_index is not None else "failed"
     details["rag_system"] = "ready" if rag_system_ready else "limited"
     details["fallback_mode"] = "enabled" if FALLBACK_MODE else "disabled"
     
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is not None:
+        details["embedding_cache"] = embedding_cache.stats()
+    if answer_cache is not None:
+        details["answer_cache"] = answer_cache.stats()
+    
     if initialization_error:
         details["initialization_error"] = initialization_error
     
@@ -662,6 +1036,16 @@ async def root():
                 "methods": ["POST", "GET"],
                 "description": "Get an answer to a question about the Quran"
             },
+            {
+                "path": "/api/ask/stream",
+                "methods": ["POST", "GET"],
+                "description": "Stream sources, answer tokens and metadata as Server-Sent Events"
+            },
+            {
+                "path": "/api/retrieve/batch",
+                "methods": ["POST"],
+                "description": "Retrieve relevant documents for many questions at once"
+            },
             {
                 "path": "/docs",
                 "methods": ["GET"],
@@ -673,6 +1057,11 @@ async def root():
         "debug_mode": DEBUG_MODE
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latency histograms and fallback counters in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Run the API with uvicorn when this file is executed directly
 if __name__ == "__main__":
     import uvicorn
@@ -685,4 +1074,4 @@ if __name__ == "__main__":
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify API is running"""
-    return {"status": "ok", "rag_system_ready": rag_system_ready}
\ No newline at end of file
+    return {"status": "ok", "rag_system_ready": rag_system_ready}
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the RAG Quran retrieval and generation paths.
+Each module can be run with ``python -m backend.benchmarks.<name>``.
+"""
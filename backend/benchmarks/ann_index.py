@@ -0,0 +1,123 @@
+"""
+Compare FAISS index types on recall, latency and memory.
+
+    python -m backend.benchmarks.ann_index
+    python -m backend.benchmarks.ann_index --factory HNSW32 --factory "IVF{nlist},SQ8" --nprobe 32
+    python -m backend.benchmarks.ann_index --docs 200000   # synthetic corpus of a given size
+
+Uses the chunk vectors recorded by the last index build
+(``vector_db/faiss_index/vectors.npy``); without one, a synthetic clustered
+corpus of unit vectors of the same shape stands in. Queries are corpus
+vectors with noise added. For each factory string the report gives
+recall@k against the exact flat index, p50/p99 single-query latency, build
+time and serialized index size. Pick a type with ``FAISS_INDEX_FACTORY`` or
+``python -m backend.core.main --index-factory ...``.
+"""
+import argparse
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+
+from backend.core.ann_index import apply_search_params, create_index, index_memory_bytes, resolve_factory
+from backend.core.config import FAISS_EF_SEARCH, FAISS_NPROBE, VECTOR_DB_PATH
+from backend.core.incremental_index import VECTORS_FILENAME
+
+DEFAULT_FACTORIES = ["Flat", "HNSW32", "IVF{nlist},Flat", "IVF{nlist},SQ8", "IVF{nlist},PQ{pq_m}", "SQ8"]
+
+
+def _synthetic_corpus(num_docs: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Topic clusters, like verses and their tafsirs, rather than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, num_docs // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), num_docs)] + 0.6 * rng.standard_normal((num_docs, dim))
+    vectors = vectors.astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def load_corpus(num_docs: int, dim: int):
+    vectors_path = os.path.join(VECTOR_DB_PATH, "faiss_index", VECTORS_FILENAME)
+    if not num_docs and os.path.exists(vectors_path):
+        return np.ascontiguousarray(np.load(vectors_path), dtype=np.float32), "vector_db"
+    return _synthetic_corpus(num_docs or 12472, dim), "synthetic"
+
+
+def _queries(vectors: np.ndarray, num_queries: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), num_queries)]
+    # Noise of about a third of a unit vector's norm
+    noise = rng.standard_normal(queries.shape) * 0.3 / np.sqrt(queries.shape[1])
+    return np.ascontiguousarray(queries + noise, dtype=np.float32)
+
+
+def _latencies_ms(index, queries: np.ndarray, k: int, threads: int) -> np.ndarray:
+    # Builds use every core; the search threads are pinned like a serving worker
+    build_threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(threads)
+    latencies = np.empty(len(queries))
+    try:
+        for i in range(len(queries)):
+            start = time.perf_counter()
+            index.search(queries[i:i + 1], k)
+            latencies[i] = (time.perf_counter() - start) * 1000
+    finally:
+        faiss.omp_set_num_threads(build_threads)
+    return latencies
+
+
+def run(factories, num_docs: int, dim: int, num_queries: int, k: int, nprobe: int, ef_search: int,
+        threads: int = 1) -> dict:
+    vectors, corpus = load_corpus(num_docs, dim)
+    queries = _queries(vectors, num_queries)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = {"corpus": corpus, "documents": len(vectors), "dim": int(vectors.shape[1]),
+              "queries": num_queries, "k": k, "nprobe": nprobe, "efSearch": ef_search, "indexes": []}
+    for factory in factories:
+        factory = factory.replace("{pq_m}", str(vectors.shape[1] // 8))
+        start = time.perf_counter()
+        index = create_index(vectors, factory)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+        apply_search_params(index, nprobe=nprobe, ef_search=ef_search)
+
+        _, found = index.search(queries, k)
+        recall = np.mean([len(np.intersect1d(found[i], truth[i])) / k for i in range(num_queries)])
+        latencies = _latencies_ms(index, queries, k, threads)
+        report["indexes"].append({
+            "factory": resolve_factory(factory, len(vectors)),
+            f"recall@{k}": float(recall),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "build_seconds": build_seconds,
+            "memory_mb": index_memory_bytes(index) / 2 ** 20
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factory", action="append",
+                        help="FAISS factory string to evaluate (repeatable; {nlist} and {pq_m} are filled in)")
+    parser.add_argument("--docs", type=int, default=0,
+                        help="Size of a synthetic corpus (default: the built index, else 12472 synthetic vectors)")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=FAISS_NPROBE)
+    parser.add_argument("--ef-search", type=int, default=FAISS_EF_SEARCH)
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads while measuring latency")
+    args = parser.parse_args()
+
+    report = run(args.factory or DEFAULT_FACTORIES, args.docs, args.dim, args.queries, args.k,
+                 args.nprobe, args.ef_search, args.threads)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compare per-question retrieval with the batched /api/retrieve/batch path.
+
+    python -m backend.benchmarks.batch_retrieval --queries 1000
+    python -m backend.benchmarks.batch_retrieval --embeddings huggingface
+
+The per-question loop mirrors what retrieve_documents does for every /api/ask
+call: one embed_query and one index.search per question. The batched path
+embeds all questions in one embed_documents call and issues one search.
+Without an existing vector_db a synthetic index of the same shape is used.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from backend.core.ann_index import apply_search_params
+from backend.core.config import VECTOR_DB_PATH
+from backend.core.docstore import MmapDocStore, load_docstore, write_docstore
+from backend.core.embeddings import get_embedding_model
+from backend.core.vector_search import batch_retrieve, embed_query_array, search_vectors
+
+
+class HashEmbeddings:
+    """Cheap deterministic embeddings so the benchmark isolates search cost."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def embed_query(self, text):
+        rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+        return rng.standard_normal(self.dim).astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def _synthetic_index(num_docs: int, dim: int, workdir: str):
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(dim)
+    index.add(rng.standard_normal((num_docs, dim)).astype(np.float32))
+    documents = [
+        {"content": f"document {i}", "metadata": {"source": "quran", "surah_num": i % 114 + 1, "verse_num": i % 286 + 1}}
+        for i in range(num_docs)
+    ]
+    return index, MmapDocStore(write_docstore(documents, os.path.join(workdir, "docstore")))
+
+
+def run(num_queries: int, k: int, embedding_type: str, num_docs: int) -> dict:
+    index_path = os.path.join(VECTOR_DB_PATH, "faiss_index")
+    with tempfile.TemporaryDirectory() as workdir:
+        if os.path.exists(os.path.join(index_path, "index.faiss")):
+            index = apply_search_params(faiss.read_index(os.path.join(index_path, "index.faiss")))
+            docstore = load_docstore(index_path)
+            corpus = "vector_db"
+        else:
+            index, docstore = _synthetic_index(num_docs, 384, workdir)
+            corpus = "synthetic"
+
+        embeddings = HashEmbeddings(index.d) if embedding_type == "hash" else get_embedding_model(embedding_type)
+        queries = [f"What does the Quran say about topic {i}?" for i in range(num_queries)]
+
+        start = time.perf_counter()
+        for query in queries:
+            vector = embed_query_array(embeddings, query)[None, :]
+            search_vectors(index, docstore, vector, k)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch_retrieve(embeddings, index, docstore, queries, k)
+        batch_seconds = time.perf_counter() - start
+
+    return {
+        "corpus": corpus,
+        "documents": len(docstore),
+        "queries": num_queries,
+        "k": k,
+        "embeddings": embedding_type,
+        "loop_qps": num_queries / loop_seconds,
+        "batch_qps": num_queries / batch_seconds,
+        "speedup": loop_seconds / batch_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--embeddings", choices=["hash", "huggingface", "openai"], default="hash")
+    parser.add_argument("--docs", type=int, default=12472, help="Size of the synthetic corpus")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.queries, args.k, args.embeddings, args.docs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
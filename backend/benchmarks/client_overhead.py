@@ -0,0 +1,90 @@
+"""
+Per-request client overhead: fresh OpenAI client per call vs the pooled registry.
+
+    python -m backend.benchmarks.client_overhead --requests 200
+
+Both runs send the same sequential chat completion requests to a local fake
+server with zero latency, so the difference is client construction plus
+connection setup:
+
+* ``per_request``: a new ``openai.OpenAI`` client (new httpx pool, new
+  connection) and a new LangChain answer chain for every call, as
+  ``/api/ask`` used to do
+* ``pooled``: the shared client from ``get_client_registry()``, reusing
+  keep-alive connections; the answer chain is not built at all
+
+The fake server speaks plain HTTP, so the TLS handshake a real endpoint adds
+to every new connection is not included; real savings are larger.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import httpx
+import openai
+
+from backend.benchmarks.concurrent_ask import FakeOpenAIServer
+from backend.core.client_registry import LLMClientRegistry
+from backend.core.direct_openai import build_answer_messages
+from backend.core.generator import create_answer_generator
+
+
+def _complete(client, question):
+    client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=build_answer_messages("context", question),
+        temperature=0,
+        max_tokens=1000
+    )
+
+
+def run(num_requests: int) -> dict:
+    with FakeOpenAIServer(latency=0.0) as server:
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        questions = [f"Question {i}" for i in range(num_requests)]
+        report = {"requests": num_requests}
+
+        timings = []
+        for question in questions:
+            start = time.perf_counter()
+            create_answer_generator()
+            client = openai.OpenAI(api_key="sk-benchmark", http_client=httpx.Client())
+            _complete(client, question)
+            timings.append(time.perf_counter() - start)
+            client.close()
+        report["per_request"] = timings
+
+        registry = LLMClientRegistry()
+        timings = []
+        for question in questions:
+            start = time.perf_counter()
+            _complete(registry.sync_client("sk-benchmark"), question)
+            timings.append(time.perf_counter() - start)
+        report["pooled"] = timings
+        report["pooled_clients_created"] = registry.clients_created
+        registry.sync_client("sk-benchmark").close()
+
+    for mode in ("per_request", "pooled"):
+        timings = report[mode]
+        report[mode] = {
+            "mean_ms": statistics.mean(timings) * 1000,
+            "p50_ms": statistics.median(timings) * 1000,
+            "p95_ms": sorted(timings)[int(0.95 * (len(timings) - 1))] * 1000
+        }
+    report["overhead_saved_ms"] = report["per_request"]["mean_ms"] - report["pooled"]["mean_ms"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.requests), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Load test for /api/ask concurrency against a fake OpenAI endpoint.
+
+    python -m backend.benchmarks.concurrent_ask --requests 64 --latency 0.5
+    python -m backend.benchmarks.concurrent_ask --requests 64 --distinct 4   # trending questions
+
+A local server stands in for the chat completions API and answers every
+request after a fixed delay, so the measurement is about how the handler
+overlaps in-flight LLM calls rather than about the model. Two runs are
+compared with the same number of concurrent requests:
+
+* ``blocking``: retrieval and a synchronous OpenAI call straight on the event
+  loop, which is what ``ask_question`` used to do
+* ``async``: the current ``ask_question`` (thread-pool retrieval and the
+  shared ``AsyncOpenAI`` client)
+
+With a serialized handler throughput stays near ``1 / latency`` requests per
+second; with the async pipeline it grows with the number of in-flight calls.
+With ``--distinct`` below ``--requests`` the same questions are asked
+several times at once, and ``llm_calls`` shows how many the async handler's
+single-flight coalescing saved.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import httpx
+import openai
+import uvicorn
+from fastapi import FastAPI, Response
+
+from backend.benchmarks.batch_retrieval import HashEmbeddings, _synthetic_index
+from backend.core.direct_openai import build_answer_messages
+from backend.core.vector_search import MetadataIndex
+
+
+class FakeOpenAIServer:
+    """Chat completions endpoint that replies after a fixed latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.chat_completions)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def chat_completions(self):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-3.5-turbo",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Benchmark answer."},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        }
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def _run_blocking(routes, questions, base_url):
+    client = openai.OpenAI(api_key="sk-benchmark", base_url=base_url, http_client=httpx.Client())
+
+    async def ask(question):
+        # Everything below runs on the event loop, as the old handler did
+        results = routes.retrieve_documents(question, {})
+        context = routes.format_context_for_llm(results)
+        client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=build_answer_messages(context, question),
+            temperature=0,
+            max_tokens=1000
+        )
+
+    await asyncio.gather(*(ask(question) for question in questions))
+    client.close()
+
+
+async def _run_async(routes, questions):
+    await asyncio.gather(*(
+        routes.ask_question(routes.QuestionRequest(question=question), Response())
+        for question in questions
+    ))
+    await routes.close_openai_clients()
+
+
+def run(num_requests: int, latency: float, num_docs: int, distinct: int = 0) -> dict:
+    with FakeOpenAIServer(latency) as server, tempfile.TemporaryDirectory() as workdir:
+        os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        # Import after the environment points the OpenAI clients at the fake server
+        from backend.api import routes
+
+        routes.index, routes.docstore = _synthetic_index(num_docs, 384, workdir)
+        routes.embeddings = HashEmbeddings(routes.index.d)
+        routes.metadata_index = MetadataIndex.from_docstore(routes.docstore)
+        routes.answer_cache = None
+        routes.rag_system_ready = True
+        routes.DEBUG_MODE = False
+
+        distinct = distinct or num_requests
+        questions = [f"What does the Quran say about topic {i % distinct}?" for i in range(num_requests)]
+        report = {"requests": num_requests, "distinct_questions": distinct, "llm_latency_seconds": latency}
+
+        for mode in ("blocking", "async"):
+            server.max_in_flight = 0
+            server.calls = 0
+            start = time.perf_counter()
+            if mode == "blocking":
+                asyncio.run(_run_blocking(routes, questions, server.base_url))
+            else:
+                asyncio.run(_run_async(routes, questions))
+            elapsed = time.perf_counter() - start
+            report[mode] = {
+                "elapsed_seconds": elapsed,
+                "requests_per_second": num_requests / elapsed,
+                "max_in_flight_llm_calls": server.max_in_flight,
+                "llm_calls": server.calls
+            }
+
+    report["speedup"] = report["blocking"]["elapsed_seconds"] / report["async"]["elapsed_seconds"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64, help="Concurrent /api/ask requests")
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    parser.add_argument("--docs", type=int, default=12472, help="Size of the synthetic corpus")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Distinct questions among the requests (default: all distinct)")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.requests, args.latency, args.docs, args.distinct), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Prompt size and latency of sentence-level extractive context compression.
+
+    python -m backend.benchmarks.context_compression
+    python -m backend.benchmarks.context_compression --max-sentences 8 --embeddings ngram
+
+Builds (or refreshes) the retrieval evaluation index, sentence index
+included, then runs each golden question through the API's
+``retrieve_documents`` and formats the LLM context twice: from the full
+passages and from the passages reduced by ``SentenceIndex.compress``.
+Reports the prompt tokens of both and the compression latency (question
+embedding excluded; the API reuses the cached question vector).
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from backend.benchmarks.retrieval_eval import load_golden_questions
+from backend.benchmarks.retrieval_eval.evaluate import api_stage, build_eval_index, get_eval_embeddings
+from backend.core.config import CACHE_DIR, SENTENCE_COMPRESSION_MAX_SENTENCES
+from backend.core.embedding_scheduler import get_token_counter
+from backend.core.sentence_index import load_sentence_index
+from backend.core.vector_search import embed_query_array
+
+
+def _summary(values) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+
+
+def run(embeddings_kind: str, max_sentences: int, index_dir: str) -> dict:
+    from backend.api import routes
+
+    embeddings = get_eval_embeddings(embeddings_kind)
+    index_path, num_chunks = build_eval_index(embeddings, index_dir)
+    api_stage(index_path, embeddings)
+    sentence_index = load_sentence_index(index_path)
+    count_tokens = get_token_counter("gpt-3.5-turbo")
+
+    tokens_before, tokens_after, latencies_ms, shortened, passages = [], [], [], 0, 0
+    for question in load_golden_questions():
+        results = routes.retrieve_documents(question["question"])
+        question_vector = embed_query_array(embeddings, question["question"])
+        start = time.perf_counter()
+        compressed = sentence_index.compress(question_vector, results, max_sentences)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        tokens_before.append(count_tokens(routes.format_context_for_llm(results)))
+        tokens_after.append(count_tokens(routes.format_context_for_llm(compressed)))
+        passages += len(results)
+        shortened += sum(1 for full, kept in zip(results, compressed) if kept["content"] != full["content"])
+
+    return {
+        "embedding_model": sentence_index.model_id,
+        "chunks": num_chunks,
+        "sentences": sentence_index.num_sentences,
+        "queries": len(tokens_before),
+        "max_sentences": max_sentences,
+        "prompt_tokens_full": _summary(tokens_before),
+        "prompt_tokens_compressed": _summary(tokens_after),
+        "token_reduction": 1 - sum(tokens_after) / sum(tokens_before),
+        "passages_shortened": shortened / passages,
+        "compression_ms": _summary(latencies_ms)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", choices=["auto", "huggingface", "ngram"], default="auto")
+    parser.add_argument("--max-sentences", type=int, default=SENTENCE_COMPRESSION_MAX_SENTENCES)
+    parser.add_argument("--index-dir", default=os.path.join(CACHE_DIR, "retrieval_eval"))
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.embeddings, args.max_sentences, args.index_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
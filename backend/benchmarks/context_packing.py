@@ -0,0 +1,124 @@
+"""
+Prompt tokens, cost and generation latency with token-budgeted MMR context packing.
+
+    python -m backend.benchmarks.context_packing
+    python -m backend.benchmarks.context_packing --model gpt-4-turbo --mmr-lambda 0.5
+    python -m backend.benchmarks.context_packing --openai   # measure real chat completions
+
+Builds (or refreshes) the retrieval evaluation index, token counts
+included, and runs each golden question through the API's
+``retrieve_documents``. The prompt is then built twice: from every
+retrieved passage (the previous behaviour) and from the passages
+``ContextPacker.select`` fits into the model's budget.
+
+For each prompt the report gives its tokens, its input cost at
+``--price-per-1k`` and its generation latency. The latency is measured
+with ``--openai`` and otherwise modeled as ``--base-latency-ms`` plus
+``--prefill-ms-per-token`` for each prompt token. ``context_recall`` is the
+share of expected verses whose passages made it into the prompt, to check
+that packing keeps the answers.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from backend.benchmarks.retrieval_eval import load_golden_questions
+from backend.benchmarks.retrieval_eval.evaluate import api_stage, build_eval_index, get_eval_embeddings
+from backend.benchmarks.retrieval_eval.metrics import ranked_references
+from backend.core.config import CACHE_DIR, CONTEXT_MMR_LAMBDA
+from backend.core.context_packing import TOKEN_COUNT_MODEL, ContextPacker, context_token_budget
+from backend.core.direct_openai import build_answer_messages
+from backend.core.embedding_scheduler import get_token_counter
+from backend.core.incremental_index import embedding_model_id
+from backend.core.vector_search import embed_query_array
+
+
+def _summary(values) -> dict:
+    values = np.asarray(values, dtype=np.float64)
+    return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+
+
+def run(embeddings_kind: str, model: str, mmr_lambda: float, price_per_1k: float, base_latency_ms: float,
+        prefill_ms_per_token: float, use_openai: bool, index_dir: str) -> dict:
+    from backend.api import routes
+
+    embeddings = get_eval_embeddings(embeddings_kind)
+    index_path, num_chunks = build_eval_index(embeddings, index_dir)
+    api_stage(index_path, embeddings)
+    packer = ContextPacker.load(index_path, embedding_model_id(embeddings))
+    budget = context_token_budget(model)
+    count_tokens = get_token_counter(TOKEN_COUNT_MODEL)
+    if use_openai:
+        from backend.core.direct_openai import generate_answer_with_openai
+
+    variants = {"all_passages": {"tokens": [], "latency_ms": [], "recall": [], "passages": []},
+                "packed": {"tokens": [], "latency_ms": [], "recall": [], "passages": []}}
+    packing_ms = []
+    for question in load_golden_questions():
+        results = routes.retrieve_documents(question["question"])
+        question_vector = embed_query_array(embeddings, question["question"])
+        start = time.perf_counter()
+        packed = packer.select(results, budget, question_vector, mmr_lambda)
+        packing_ms.append((time.perf_counter() - start) * 1000)
+
+        for name, documents in (("all_passages", results), ("packed", packed)):
+            context = routes.format_context_for_llm(documents)
+            messages = build_answer_messages(context, question["question"])
+            tokens = sum(count_tokens(message["content"]) for message in messages)
+            if use_openai:
+                start = time.perf_counter()
+                generate_answer_with_openai(context, question["question"], model=model)
+                latency_ms = (time.perf_counter() - start) * 1000
+            else:
+                latency_ms = base_latency_ms + tokens * prefill_ms_per_token
+            found = set(ranked_references(documents)) & set(question["expected"])
+            variants[name]["tokens"].append(tokens)
+            variants[name]["latency_ms"].append(latency_ms)
+            variants[name]["recall"].append(len(found) / len(question["expected"]))
+            variants[name]["passages"].append(len(documents))
+
+    report = {
+        "embedding_model": embedding_model_id(embeddings),
+        "chunks": num_chunks,
+        "queries": len(packing_ms),
+        "model": model,
+        "token_budget": budget,
+        "mmr": packer.has_vectors,
+        "mmr_lambda": mmr_lambda,
+        "generation_latency": "measured" if use_openai else
+                              f"modeled: {base_latency_ms} ms + {prefill_ms_per_token} ms per prompt token",
+        "packing_ms": _summary(packing_ms)
+    }
+    for name, values in variants.items():
+        report[name] = {
+            "passages": float(np.mean(values["passages"])),
+            "prompt_tokens": _summary(values["tokens"]),
+            "cost_per_1k_requests": float(np.mean(values["tokens"])) * price_per_1k,
+            "generation_latency_ms": _summary(values["latency_ms"]),
+            "context_recall": float(np.mean(values["recall"]))
+        }
+    report["token_reduction"] = 1 - report["packed"]["prompt_tokens"]["mean"] / report["all_passages"]["prompt_tokens"]["mean"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", choices=["auto", "huggingface", "ngram"], default="auto")
+    parser.add_argument("--model", default="gpt-3.5-turbo", help="Chat model whose token budget is used")
+    parser.add_argument("--mmr-lambda", type=float, default=CONTEXT_MMR_LAMBDA)
+    parser.add_argument("--price-per-1k", type=float, default=0.0005, help="USD per 1k input tokens")
+    parser.add_argument("--base-latency-ms", type=float, default=400.0)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.2)
+    parser.add_argument("--openai", action="store_true", help="Measure real chat completions")
+    parser.add_argument("--index-dir", default=os.path.join(CACHE_DIR, "retrieval_eval"))
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.embeddings, args.model, args.mmr_lambda, args.price_per_1k, args.base_latency_ms,
+                         args.prefill_ms_per_token, args.openai, args.index_dir), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Peak memory and build time of the index build: float lists vs float32 arrays.
+
+    python -m backend.benchmarks.embedding_pipeline
+    python -m backend.benchmarks.embedding_pipeline --embeddings huggingface
+
+Both runs embed the full corpus (Quran plus every tafsir, chunked as in
+``backend.core.main``) in batches of 500 and build a flat FAISS index:
+
+* ``lists``: ``embed_documents`` returns Python float lists that the stock
+  LangChain ``FAISS.from_texts`` / ``add_texts`` turn back into arrays, which
+  is how the index used to be built
+* ``arrays``: ``PrefilteredFAISS.from_texts`` / ``add_texts``, which take the
+  model's float32 ``ndarray`` straight to ``index.add``
+
+Peak memory is measured with ``tracemalloc`` (Python and NumPy allocations).
+The default ``synthetic`` embeddings produce random unit vectors of the
+MiniLM shape so the run isolates the pipeline cost from the model.
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from backend.core import config
+from backend.core.data_processing import create_document_chunks, load_quran_data, load_tafsir_data
+from backend.core.embeddings import get_embedding_model
+from backend.core.vector_search import PrefilteredFAISS
+
+
+class SyntheticEmbeddings(Embeddings):
+    """Array-native stand-in for the sentence-transformer (384-d unit vectors)."""
+
+    model_name = "synthetic"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.rng = np.random.default_rng(0)
+
+    def embed_documents_array(self, texts):
+        vectors = self.rng.standard_normal((len(texts), self.dim), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def embed_documents(self, texts):
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _build(store_cls, texts, metadatas, embeddings, batch_size):
+    store = store_cls.from_texts(texts[:batch_size], embeddings, metadatas=metadatas[:batch_size])
+    for i in range(batch_size, len(texts), batch_size):
+        store.add_texts(texts[i:i + batch_size], metadatas=metadatas[i:i + batch_size])
+    return store
+
+
+def _measure(store_cls, texts, metadatas, embeddings, batch_size):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = _build(store_cls, texts, metadatas, embeddings, batch_size)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert store.index.ntotal == len(texts)
+    return {"build_seconds": elapsed, "peak_mb": peak / 2 ** 20}
+
+
+def run(embedding_type: str, batch_size: int) -> dict:
+    documents = load_quran_data(config.QURAN_DATA_PATH) + load_tafsir_data(config.TAFSIR_DIR_PATH)
+    chunks = create_document_chunks(documents, config.CHUNK_SIZE)
+    texts = [doc['content'] for doc in chunks]
+    metadatas = [doc['metadata'] for doc in chunks]
+
+    embeddings = SyntheticEmbeddings() if embedding_type == "synthetic" else get_embedding_model(embedding_type)
+    report = {"chunks": len(texts), "embeddings": embedding_type, "batch_size": batch_size}
+    report["lists"] = _measure(FAISS, texts, metadatas, embeddings, batch_size)
+    report["arrays"] = _measure(PrefilteredFAISS, texts, metadatas, embeddings, batch_size)
+    report["peak_memory_ratio"] = report["lists"]["peak_mb"] / report["arrays"]["peak_mb"]
+    report["speedup"] = report["lists"]["build_seconds"] / report["arrays"]["build_seconds"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--embeddings", choices=["synthetic", "huggingface", "openai"], default="synthetic")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.embeddings, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
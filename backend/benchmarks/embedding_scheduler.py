@@ -0,0 +1,103 @@
+"""
+OpenAI embedding throughput for index builds: sequential batches vs the scheduler.
+
+    python -m backend.benchmarks.embedding_scheduler --docs 5000 --latency 0.3
+    python -m backend.benchmarks.embedding_scheduler --error-rate 0.1 --rpm 300
+
+Runs against ``FakeEmbeddingServer`` on a local port, so no API key or
+network is needed. Two runs embed the same texts:
+
+* ``sequential``: batches of 100 sent one after another through the sync
+  client, which is how ``CustomOpenAIEmbeddings.embed_documents`` used to work
+* ``scheduler``: ``EmbeddingScheduler`` with token-sized batches, several
+  requests in flight and retries under the RPM/TPM budgets
+
+With ``--error-rate`` the sequential run shows how many documents would have
+been replaced by placeholder vectors; the scheduler retries them instead.
+"""
+import argparse
+import json
+import random
+import time
+
+import httpx
+import openai
+
+from backend.benchmarks.fake_embedding_server import FakeEmbeddingServer
+from backend.core.embedding_scheduler import EmbeddingScheduler
+
+
+def _texts(num_docs: int, seed: int = 0):
+    # Chunk-sized texts with the length spread of the tafsir corpus
+    rng = random.Random(seed)
+    return [f"doc {i} " + "tafsir " * rng.randint(20, 250) for i in range(num_docs)]
+
+
+def _run_sequential(server, texts, model):
+    client = openai.OpenAI(api_key="sk-benchmark", base_url=server.base_url, max_retries=0, http_client=httpx.Client())
+    failed = 0
+    for i in range(0, len(texts), 100):
+        batch = texts[i:i + 100]
+        try:
+            client.embeddings.create(model=model, input=batch, encoding_format="base64")
+        except openai.APIError:
+            failed += len(batch)
+    client.close()
+    return failed
+
+
+def run(num_docs: int, latency: float, error_rate: float, rpm: int, concurrency: int, batch_tokens: int) -> dict:
+    model = "text-embedding-3-small"
+    texts = _texts(num_docs)
+    report = {"documents": num_docs, "latency_seconds": latency, "error_rate": error_rate}
+
+    with FakeEmbeddingServer(latency=latency, error_rate=error_rate, requests_per_minute=rpm) as server:
+        start = time.perf_counter()
+        failed = _run_sequential(server, texts, model)
+        elapsed = time.perf_counter() - start
+        report["sequential"] = {
+            "docs_per_second": num_docs / elapsed,
+            "requests": server.requests,
+            "placeholder_documents": failed
+        }
+
+        server.requests = server.errors = server.rate_limited = server.max_in_flight = 0
+        scheduler = EmbeddingScheduler(
+            model,
+            api_key="sk-benchmark",
+            base_url=server.base_url,
+            concurrency=concurrency,
+            requests_per_minute=0,  # Let the server's 429s drive the backoff
+            max_batch_tokens=batch_tokens,
+            backoff_base=0.05
+        )
+        result = scheduler.embed(texts)
+        report["scheduler"] = {
+            "docs_per_second": num_docs / result.seconds,
+            "requests": result.requests,
+            "retries": result.retries,
+            "rate_limited": server.rate_limited,
+            "failed_documents": len(result.failed),
+            "max_in_flight": server.max_in_flight
+        }
+
+    report["speedup"] = report["scheduler"]["docs_per_second"] / report["sequential"]["docs_per_second"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5000, help="Number of texts to embed")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated request latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with a 500")
+    parser.add_argument("--rpm", type=int, default=0, help="Server-side requests-per-minute limit (0 = none)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-tokens", type=int, default=8000)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.docs, args.latency, args.error_rate, args.rpm, args.concurrency, args.batch_tokens),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
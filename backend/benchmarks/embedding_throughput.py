@@ -0,0 +1,101 @@
+"""
+Local embedding throughput on the tafsir corpus: fixed batches vs length buckets.
+
+    python -m backend.benchmarks.embedding_throughput --limit 2000
+    python -m backend.benchmarks.embedding_throughput --threads 4 --token-budget 8192
+
+Embeds the chunks of every file in ``data/tafsirs`` with the
+sentence-transformer used by ``CustomHuggingFaceEmbeddings`` twice:
+
+* ``fixed``: batches of 32 texts in input order, each padded to its longest
+  member, which is how ``embed_with_transformers`` used to batch
+* ``bucketed``: the current length-sorted batching under a padded-token budget
+
+and reports docs/sec plus the share of computed tokens that were padding.
+Needs the model weights (downloaded on first use).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from backend.core import config
+from backend.core.data_processing import create_document_chunks, load_tafsir_data
+from backend.core.embeddings import CustomHuggingFaceEmbeddings, configure_torch_threads, plan_length_batches
+
+
+def _embed_fixed(embeddings, texts, batch_size=32):
+    import torch
+    import torch.nn.functional as F
+
+    results = []
+    for i in range(0, len(texts), batch_size):
+        encoded_input = embeddings.tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                                             max_length=512, return_tensors='pt')
+        with torch.no_grad():
+            model_output = embeddings.model(**encoded_input)
+        pooled = embeddings.mean_pooling(model_output, encoded_input['attention_mask'])
+        results.append(F.normalize(pooled, p=2, dim=1).cpu().numpy())
+    return np.vstack(results)
+
+
+def _padding_share(lengths, batches):
+    computed = sum(len(batch) * max(lengths[row] for row in batch) for batch in batches)
+    return 1 - sum(lengths) / computed
+
+
+def run(limit: int, token_budget: int, max_batch_size: int) -> dict:
+    chunks = create_document_chunks(load_tafsir_data(config.TAFSIR_DIR_PATH), config.CHUNK_SIZE)
+    texts = [doc['content'] for doc in chunks][:limit or None]
+
+    embeddings = CustomHuggingFaceEmbeddings()
+    if not hasattr(embeddings, 'use_alternative'):
+        raise SystemExit("The transformers backend is not available; nothing to compare")
+
+    lengths = [len(ids) for ids in embeddings.tokenizer(texts, truncation=True, max_length=512)['input_ids']]
+    fixed_batches = [np.arange(i, min(i + 32, len(texts))) for i in range(0, len(texts), 32)]
+    bucketed_batches = plan_length_batches(lengths, token_budget, max_batch_size)
+
+    start = time.perf_counter()
+    fixed = _embed_fixed(embeddings, texts)
+    fixed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bucketed = embeddings.embed_with_transformers(texts, token_budget, max_batch_size)
+    bucketed_seconds = time.perf_counter() - start
+
+    import torch
+    return {
+        "documents": len(texts),
+        "torch_threads": torch.get_num_threads(),
+        "token_budget": token_budget,
+        "fixed": {
+            "docs_per_second": len(texts) / fixed_seconds,
+            "padding_share": _padding_share(lengths, fixed_batches)
+        },
+        "bucketed": {
+            "docs_per_second": len(texts) / bucketed_seconds,
+            "padding_share": _padding_share(lengths, bucketed_batches),
+            "batches": len(bucketed_batches)
+        },
+        "speedup": fixed_seconds / bucketed_seconds,
+        "max_abs_difference": float(np.abs(fixed - bucketed).max())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=0, help="Only embed the first N chunks (0 = all)")
+    parser.add_argument("--token-budget", type=int, default=config.EMBEDDING_TOKEN_BUDGET)
+    parser.add_argument("--max-batch-size", type=int, default=config.EMBEDDING_MAX_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=config.EMBEDDING_TORCH_THREADS,
+                        help="Torch intra-op threads (0 = torch default)")
+    args = parser.parse_args()
+
+    configure_torch_threads(args.threads)
+    print(json.dumps(run(args.limit, args.token_budget, args.max_batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
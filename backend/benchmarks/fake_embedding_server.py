@@ -0,0 +1,142 @@
+"""
+Local stand-in for the OpenAI embeddings endpoint.
+
+Serves ``POST /v1/embeddings`` with deterministic unit vectors (a hash of
+each input seeds its vector), in float or base64 encoding, after a fixed
+latency. Failures can be injected to exercise the embedding scheduler
+offline:
+
+* ``error_rate``: share of requests answered with a 500
+* ``requests_per_minute``: requests beyond the budget get a 429 with ``Retry-After``
+* ``poison``: inputs containing this string always fail their request
+
+The ``app`` can be mounted in-process with ``httpx.ASGITransport`` (tests) or
+served on a local port with the context manager (benchmarks).
+"""
+import asyncio
+import base64
+import hashlib
+import random
+import socket
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Union
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: Union[str, List[str]]
+    encoding_format: Optional[str] = "float"
+
+
+def fake_vector(text: str, dim: int) -> np.ndarray:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeEmbeddingServer:
+    """Embeddings endpoint with configurable latency, errors and rate limit."""
+
+    def __init__(
+        self,
+        dim: int = 1536,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        requests_per_minute: int = 0,
+        poison: Optional[str] = None,
+        seed: int = 0
+    ):
+        self.dim = dim
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests_per_minute = requests_per_minute
+        self.poison = poison
+        self._random = random.Random(seed)
+        self._accepted = deque()
+
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.inputs_embedded = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self.app = FastAPI()
+        self.app.post("/v1/embeddings")(self.embeddings)
+
+    async def embeddings(self, request: EmbeddingRequest):
+        self.requests += 1
+        inputs = [request.input] if isinstance(request.input, str) else request.input
+
+        if self.requests_per_minute:
+            now = time.monotonic()
+            while self._accepted and self._accepted[0] <= now - 60:
+                self._accepted.popleft()
+            if len(self._accepted) >= self.requests_per_minute:
+                self.rate_limited += 1
+                retry_after = self._accepted[0] + 60 - now
+                return JSONResponse(
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status_code=429,
+                    headers={"retry-after": f"{retry_after:.3f}"}
+                )
+            self._accepted.append(now)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        poisoned = self.poison is not None and any(self.poison in text for text in inputs)
+        if poisoned or self._random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({"error": {"message": "Internal error", "type": "server_error"}}, status_code=500)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_vector(text, self.dim)
+            if request.encoding_format == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        self.inputs_embedded += len(inputs)
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": request.model,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    # Served on a local port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
@@ -0,0 +1,132 @@
+"""
+Latency of the retriever's compression step: cross-encoder reranking vs LLMChainExtractor.
+
+    python -m backend.benchmarks.reranker
+    python -m backend.benchmarks.reranker --llm-latency 0.8 --candidates 15 --k 5
+    python -m backend.benchmarks.reranker --openai   # real chat completions for the LLM compressor
+
+For each golden question the candidates are the BM25 top ``--candidates``
+chunks of the Quran and tafsir corpus (``k * 3`` in the retriever). Two
+compressors reduce them to ``k`` documents:
+
+* ``llm``: ``LLMChainExtractor``, one sequential chat call per candidate.
+  Offline, each call is simulated with ``--llm-latency`` seconds of round
+  trip, so the figure scales with the number of calls.
+* ``cross_encoder``: ``CrossEncoderCompressor``, one batched forward pass on
+  CPU (onnxruntime when ``RERANKER_ONNX_PATH`` exists).
+
+Without the reranker weights in the local cache, a randomly initialized
+model with the same architecture (12 layers, hidden size 384) and a WordPiece
+tokenizer trained on the corpus stand in. The latency is representative;
+the ranking is not.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from langchain.retrievers.document_compressors import LLMChainExtractor
+from langchain_core.documents import Document
+
+from backend.benchmarks.retrieval_eval import load_golden_questions
+from backend.benchmarks.retrieval_eval.offline import EchoExtractorChatModel
+from backend.core.config import CHUNK_SIZE, QURAN_DATA_PATH, RERANKER_MAX_LENGTH, TAFSIR_DIR_PATH
+from backend.core.data_processing import create_document_chunks, load_quran_data, load_tafsir_data
+from backend.core.lexical_index import BM25Index
+from backend.core.reranker import CrossEncoderCompressor, CrossEncoderReranker
+
+
+def random_architecture_reranker(texts, vocab_size: int = 30000) -> CrossEncoderReranker:
+    """MiniLM-L12-H384-shaped cross-encoder with random weights and a corpus-trained tokenizer."""
+    from tokenizers import BertWordPieceTokenizer
+    from transformers import BertConfig, BertForSequenceClassification, PreTrainedTokenizerFast
+
+    wordpiece = BertWordPieceTokenizer(lowercase=True, strip_accents=False)
+    wordpiece.train_from_iterator(texts, vocab_size=vocab_size, show_progress=False)
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=wordpiece._tokenizer, pad_token="[PAD]",
+                                        cls_token="[CLS]", sep_token="[SEP]", unk_token="[UNK]")
+    model = BertForSequenceClassification(BertConfig(
+        vocab_size=len(tokenizer), hidden_size=384, num_hidden_layers=12, num_attention_heads=12,
+        intermediate_size=1536, num_labels=1
+    ))
+    return CrossEncoderReranker(model_name="random-minilm-l12-h384", onnx_path=None, tokenizer=tokenizer, model=model)
+
+
+def _candidates(num_candidates: int, limit: int):
+    documents = load_quran_data(QURAN_DATA_PATH) + load_tafsir_data(TAFSIR_DIR_PATH)
+    chunks = create_document_chunks(documents, CHUNK_SIZE)
+    texts = [chunk["content"] for chunk in chunks]
+    index = BM25Index.build(texts)
+    queries = []
+    for question in load_golden_questions():
+        rows, _ = index.search(question["question"], num_candidates)
+        # Questions with no keyword match in the Arabic corpus have no candidates
+        if len(rows) == num_candidates:
+            queries.append((question["question"], [Document(page_content=texts[row], metadata=chunks[row]["metadata"])
+                                                   for row in rows]))
+    return texts, queries[:limit or None]
+
+
+def _summary(latencies_ms) -> dict:
+    latencies_ms = np.asarray(latencies_ms)
+    return {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99))
+    }
+
+
+def _time_compressor(compressor, queries):
+    latencies = []
+    for question, candidates in queries:
+        start = time.perf_counter()
+        compressor.compress_documents(candidates, question)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def run(num_candidates: int, k: int, llm_latency: float, use_openai: bool, limit: int) -> dict:
+    texts, queries = _candidates(num_candidates, limit)
+    report = {"queries": len(queries), "candidates_per_query": num_candidates, "k": k}
+
+    if use_openai:
+        from backend.core.llm_client import get_chat_model
+        llm = get_chat_model(model_name="gpt-3.5-turbo", temperature=0)
+        report["llm"] = {"model": "gpt-3.5-turbo"}
+    else:
+        llm = EchoExtractorChatModel(latency=llm_latency)
+        report["llm"] = {"simulated_latency_seconds": llm_latency}
+    report["llm"].update(_summary(_time_compressor(LLMChainExtractor.from_llm(llm), queries)))
+    report["llm"]["calls_per_query"] = num_candidates
+
+    try:
+        reranker = CrossEncoderReranker()
+        weights = "pretrained"
+    except Exception:
+        reranker = random_architecture_reranker(texts)
+        weights = "random"
+    compressor = CrossEncoderCompressor(reranker=reranker, top_n=k)
+    _time_compressor(compressor, queries[:2])  # Warm-up
+    report["cross_encoder"] = {"model": reranker.model_name, "weights": weights, "backend": reranker.backend,
+                               "max_length": RERANKER_MAX_LENGTH, "calls_per_query": 1}
+    report["cross_encoder"].update(_summary(_time_compressor(compressor, queries)))
+
+    report["speedup_p50"] = report["llm"]["p50_ms"] / report["cross_encoder"]["p50_ms"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=15, help="Candidates per query (k * 3 in the retriever)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.8,
+                        help="Simulated seconds per chat-completion call of the LLM compressor")
+    parser.add_argument("--openai", action="store_true", help="Call OpenAI for the LLM compressor")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N questions with candidates")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.candidates, args.k, args.llm_latency, args.openai, args.limit), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+Retrieval quality and latency evaluation on a golden question set.
+
+    python -m backend.benchmarks.retrieval_eval --output eval.json
+    python -m backend.benchmarks.retrieval_eval --compare baseline.json
+
+``golden_questions.json`` maps curated English and Arabic questions to the
+verse references that should be retrieved. Every question goes through the
+API's ``retrieve_documents``, ``RetrieverAgent.process`` and the MCP
+``retrieve`` tool. Each stage gets recall@k, MRR and latency percentiles. A
+retrieved tafsir counts for the verse it explains.
+
+Runs offline: local embeddings (the cached sentence-transformer, otherwise a
+lexical n-gram hash embedding) and a stub LLM for contextual compression.
+The report is JSON, so runs can be diffed across commits with ``--compare``.
+"""
+from backend.benchmarks.retrieval_eval.evaluate import load_golden_questions, run_eval
+from backend.benchmarks.retrieval_eval.metrics import compare_reports, recall_at_k, reciprocal_rank
+
+__all__ = ["load_golden_questions", "run_eval", "compare_reports", "recall_at_k", "reciprocal_rank"]
@@ -0,0 +1,55 @@
+"""Command line entry point: ``python -m backend.benchmarks.retrieval_eval``."""
+import argparse
+import json
+import os
+import sys
+
+# Local models only; never reach out to the Hugging Face hub
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+from backend.benchmarks import retrieval_eval  # noqa: E402
+from backend.benchmarks.retrieval_eval import compare_reports, load_golden_questions, run_eval  # noqa: E402
+from backend.benchmarks.retrieval_eval.evaluate import GOLDEN_QUESTIONS_PATH, STAGES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=retrieval_eval.__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", default=GOLDEN_QUESTIONS_PATH, help="Golden question file")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="Stage to run (repeatable; default all)")
+    parser.add_argument("--embeddings", choices=["auto", "huggingface", "ngram"], default="auto")
+    parser.add_argument("--k", type=int, default=10, help="Documents requested from the agent and MCP stages")
+    parser.add_argument("--no-compression", action="store_true", help="Skip contextual compression")
+    parser.add_argument("--limit", type=int, help="Only index the first N chunks (quick runs)")
+    parser.add_argument("--details", action="store_true", help="Include per-question rankings")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline report; exit 1 on quality or latency regressions")
+    args = parser.parse_args()
+
+    report = run_eval(
+        load_golden_questions(args.questions),
+        stages=args.stage or STAGES,
+        embeddings_kind=args.embeddings,
+        k=args.k,
+        use_compression=not args.no_compression,
+        limit=args.limit,
+        include_questions=args.details
+    )
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Build the evaluation index and run the golden questions through each retrieval stage."""
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import faiss
+
+from backend.benchmarks.retrieval_eval.metrics import ranked_references, summarize_stage
+from backend.benchmarks.retrieval_eval.offline import NgramHashEmbeddings, stub_compression_llm
+from backend.core import config
+from backend.core.ann_index import apply_search_params
+from backend.core.data_processing import create_document_chunks, load_quran_data, load_tafsir_data
+from backend.core.docstore import load_docstore
+from backend.core.incremental_index import build_incremental_index, embedding_model_id
+from backend.core.lexical_index import load_lexical_index
+from backend.core.vector_search import MetadataIndex
+
+GOLDEN_QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_questions.json")
+STAGES = ("api", "agent", "mcp")
+
+
+def load_golden_questions(path: str = GOLDEN_QUESTIONS_PATH) -> List[Dict[str, Any]]:
+    """``{'id', 'language', 'question', 'expected'}`` entries; expected are ``"surah:verse"`` references."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_eval_embeddings(kind: str = "auto"):
+    """
+    Local embeddings for the evaluation.
+
+    ``huggingface`` needs the sentence-transformer weights in the local cache,
+    ``ngram`` needs nothing, ``auto`` tries the former and falls back to the latter.
+    """
+    if kind in ("auto", "huggingface"):
+        try:
+            from backend.core.embeddings import CustomHuggingFaceEmbeddings
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                return CustomHuggingFaceEmbeddings()
+        except Exception as e:
+            if kind == "huggingface":
+                raise
+            print(f"Local sentence-transformer unavailable ({e}); using n-gram hash embeddings")
+    return NgramHashEmbeddings()
+
+
+def build_eval_index(embeddings, index_dir: str, limit: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Build (or incrementally refresh) a FAISS index over the Quran and tafsir chunks.
+
+    Returns:
+        The index directory and the number of chunks
+    """
+    documents = load_quran_data(config.QURAN_DATA_PATH) + load_tafsir_data(config.TAFSIR_DIR_PATH)
+    chunks = create_document_chunks(documents, config.CHUNK_SIZE)[:limit or None]
+    index_path = os.path.join(index_dir, embedding_model_id(embeddings).replace("/", "_"), "faiss_index")
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        build_incremental_index(chunks, index_path, embeddings)
+    return index_path, len(chunks)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=config.BASE_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def api_stage(index_path: str, embeddings) -> Callable:
+    """``retrieve_documents`` of the API with its globals pointed at the evaluation index."""
+    from backend.api import routes
+
+    routes.embeddings = embeddings
+    routes.index = apply_search_params(faiss.read_index(os.path.join(index_path, "index.faiss")))
+    routes.docstore = load_docstore(index_path)
+    routes.metadata_index = MetadataIndex.from_docstore(routes.docstore)
+    routes.lexical_index = load_lexical_index(routes.docstore)
+    routes.rag_system_ready = True
+
+    async def retrieve(question: str, k: int) -> List[Dict[str, Any]]:
+        return routes.retrieve_documents(question)
+    return retrieve
+
+
+def _retriever_agent(index_path: str, embeddings):
+    from backend.agents.retriever import RetrieverAgent
+
+    return RetrieverAgent(vector_store_path=index_path, embeddings=embeddings)
+
+
+def agent_stage(index_path: str, embeddings, use_compression: bool) -> Callable:
+    """``RetrieverAgent.process`` over the evaluation index."""
+    from backend.agents.retriever import RetrieverAgentRequest
+
+    agent = _retriever_agent(index_path, embeddings)
+
+    async def retrieve(question: str, k: int) -> List[Dict[str, Any]]:
+        request = RetrieverAgentRequest(query=question, k=k, use_compression=use_compression)
+        return (await agent.process(request)).documents
+    return retrieve
+
+
+def mcp_stage(index_path: str, embeddings, use_compression: bool) -> Callable:
+    """The MCP ``retrieve`` tool, called through ``execute_tool``."""
+    from modelcontextprotocol import ToolCall  # Optional dependency: ImportError skips the stage
+    from backend.mcp_servers.retriever.server import RetrieverMCPServer
+
+    server = RetrieverMCPServer(vector_store_path=index_path, agent=_retriever_agent(index_path, embeddings))
+
+    async def retrieve(question: str, k: int) -> List[Dict[str, Any]]:
+        parameters = {"query": question, "k": k, "use_compression": use_compression}
+        result = await server.execute_tool(ToolCall(name="retrieve", parameters=parameters))
+        if result.error:
+            raise RuntimeError(result.error)
+        return result.result["documents"]
+    return retrieve
+
+
+async def _run_stage(retrieve: Callable, questions: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+    await retrieve(questions[0]["question"], k)  # Warm-up: lazy loads and first-call costs
+    results = []
+    for item in questions:
+        start = time.perf_counter()
+        documents = await retrieve(item["question"], k)
+        seconds = time.perf_counter() - start
+        results.append({"id": item["id"], "language": item.get("language"), "expected": item["expected"],
+                        "ranked": ranked_references(documents), "seconds": seconds})
+    return results
+
+
+def run_eval(
+    questions: List[Dict[str, Any]],
+    stages: Sequence[str] = STAGES,
+    embeddings_kind: str = "auto",
+    index_dir: str = os.path.join(config.CACHE_DIR, "retrieval_eval"),
+    k: int = 10,
+    ks: Sequence[int] = (1, 5, 10),
+    use_compression: bool = True,
+    limit: Optional[int] = None,
+    include_questions: bool = False
+) -> Dict[str, Any]:
+    """
+    Evaluate each stage on the golden questions.
+
+    Returns:
+        A JSON-serializable report with recall@k, MRR and latency per stage
+    """
+    embeddings = get_eval_embeddings(embeddings_kind)
+    build_start = time.perf_counter()
+    index_path, num_chunks = build_eval_index(embeddings, index_dir, limit)
+    report: Dict[str, Any] = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "embeddings": embedding_model_id(embeddings),
+        "index_factory": config.FAISS_INDEX_FACTORY,
+        "chunks": num_chunks,
+        "index_build_seconds": time.perf_counter() - build_start,
+        "k": k,
+        "use_compression": use_compression,
+        "compressor": config.RETRIEVER_COMPRESSOR,
+        "stages": {}
+    }
+    if include_questions:
+        report["questions"] = {}
+
+    builders = {
+        "api": lambda: api_stage(index_path, embeddings),
+        "agent": lambda: agent_stage(index_path, embeddings, use_compression),
+        "mcp": lambda: mcp_stage(index_path, embeddings, use_compression)
+    }
+    with stub_compression_llm():
+        for stage in stages:
+            try:
+                # The pipeline logs every step; keep the report output clean
+                with contextlib.redirect_stdout(open(os.devnull, "w")), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    retrieve = builders[stage]()
+                    results = asyncio.run(_run_stage(retrieve, questions, k))
+            except ImportError as e:
+                report["stages"][stage] = {"skipped": f"missing dependency: {e.name}"}
+                continue
+            report["stages"][stage] = summarize_stage(results, ks)
+            if include_questions:
+                report["questions"][stage] = results
+    return report
@@ -0,0 +1,103 @@
+"""Ranking and latency metrics for the retrieval evaluation."""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def document_reference(metadata: Dict[str, Any]) -> Optional[str]:
+    """``"surah:verse"`` of a retrieved document (Quran text and tafsir alike)."""
+    surah, verse = metadata.get("surah_num"), metadata.get("verse_num")
+    if surah is not None and verse is not None:
+        return f"{int(surah)}:{int(verse)}"
+    return metadata.get("reference")
+
+
+def ranked_references(documents: Iterable[Dict[str, Any]]) -> List[str]:
+    """Distinct verse references in rank order; a verse and its tafsir count once."""
+    references = []
+    for doc in documents:
+        reference = document_reference(doc.get("metadata") or {})
+        if reference and reference not in references:
+            references.append(reference)
+    return references
+
+
+def recall_at_k(ranked: Sequence[str], expected: Sequence[str], k: int) -> float:
+    """Share of the expected references found in the top ``k``."""
+    return len(set(ranked[:k]) & set(expected)) / len(expected)
+
+
+def reciprocal_rank(ranked: Sequence[str], expected: Sequence[str]) -> float:
+    """1 / rank of the first expected reference, 0 if none was retrieved."""
+    expected = set(expected)
+    for rank, reference in enumerate(ranked, start=1):
+        if reference in expected:
+            return 1.0 / rank
+    return 0.0
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """Mean and percentile latencies in milliseconds."""
+    milliseconds = np.asarray(seconds, dtype=np.float64) * 1000
+    summary = {"mean_ms": float(milliseconds.mean())}
+    for percentile in LATENCY_PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(milliseconds, percentile))
+    return summary
+
+
+def summarize_stage(results: List[Dict[str, Any]], ks: Sequence[int]) -> Dict[str, Any]:
+    """
+    Aggregate per-question results of one stage.
+
+    Args:
+        results: ``{'expected', 'ranked', 'seconds'}`` (and optionally ``'language'``) per question
+        ks: Cut-offs for recall@k
+    """
+    summary: Dict[str, Any] = {"questions": len(results)}
+    for k in ks:
+        summary[f"recall@{k}"] = float(np.mean([recall_at_k(r["ranked"], r["expected"], k) for r in results]))
+    summary["mrr"] = float(np.mean([reciprocal_rank(r["ranked"], r["expected"]) for r in results]))
+    summary["latency"] = latency_summary([r["seconds"] for r in results])
+
+    languages = sorted({r["language"] for r in results if r.get("language")})
+    if len(languages) > 1:
+        summary["by_language"] = {}
+        for language in languages:
+            subset = [r for r in results if r.get("language") == language]
+            summary["by_language"][language] = {
+                "questions": len(subset),
+                **{f"recall@{k}": float(np.mean([recall_at_k(r["ranked"], r["expected"], k) for r in subset]))
+                   for k in ks},
+                "mrr": float(np.mean([reciprocal_rank(r["ranked"], r["expected"]) for r in subset]))
+            }
+    return summary
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    quality_tolerance: float = 0.02,
+    latency_tolerance: float = 0.25
+) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline``.
+
+    A quality metric regresses when it drops by more than ``quality_tolerance``
+    (absolute); p50 latency when it grows by more than ``latency_tolerance``
+    (relative).
+    """
+    regressions = []
+    for stage, old in baseline.get("stages", {}).items():
+        new = current.get("stages", {}).get(stage)
+        if not new or "skipped" in old or "skipped" in new:
+            continue
+        for metric, old_value in old.items():
+            if (metric.startswith("recall@") or metric == "mrr") and metric in new:
+                if new[metric] < old_value - quality_tolerance:
+                    regressions.append(f"{stage} {metric}: {old_value:.3f} -> {new[metric]:.3f}")
+        old_p50, new_p50 = old["latency"]["p50_ms"], new["latency"]["p50_ms"]
+        if new_p50 > old_p50 * (1 + latency_tolerance):
+            regressions.append(f"{stage} p50 latency: {old_p50:.2f} ms -> {new_p50:.2f} ms")
+    return regressions
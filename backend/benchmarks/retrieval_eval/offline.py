@@ -0,0 +1,95 @@
+"""
+Network-free stand-ins for the evaluation.
+
+``NgramHashEmbeddings`` is a lexical embedding (hashed word and character
+trigram counts over diacritic-free Arabic/English text) used when the
+sentence-transformer weights are not available locally. ``EchoExtractorChatModel``
+replaces the OpenAI model behind ``LLMChainExtractor`` and returns the
+document it is asked to compress unchanged, so the compression path runs end
+to end without changing which documents come back.
+"""
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+
+from backend.core.lexical_index import normalize_arabic as normalize_for_matching
+
+_WORD = re.compile(r"\w+")
+
+
+class NgramHashEmbeddings(Embeddings):
+    """Deterministic hashed bag of words and character trigrams, L2-normalized."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model_name = f"ngram-hash-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in _WORD.findall(normalize_for_matching(text)):
+            features.append(word)
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)], dtype=np.int64)
+        if len(hashes):
+            signs = np.where(hashes & 1, 1.0, -1.0)
+            vector += np.bincount((hashes >> 1) % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vectors[row] = self.embed_query_array(text)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
+
+
+class EchoExtractorChatModel(SimpleChatModel):
+    """Stub LLM that answers ``LLMChainExtractor`` prompts with the full context."""
+
+    # Simulated round-trip time per call, in seconds
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo-extractor"
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+              **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1].content
+        start, end = prompt.find(">>>\n"), prompt.rfind("\n>>>")
+        return prompt[start + 4:end] if 0 <= start < end else prompt
+
+
+@contextmanager
+def stub_compression_llm():
+    """Route the retriever's contextual compression through ``EchoExtractorChatModel``."""
+    from backend.core import retriever
+
+    original = retriever.get_chat_model
+    retriever.get_chat_model = lambda *args, **kwargs: EchoExtractorChatModel()
+    try:
+        yield
+    finally:
+        retriever.get_chat_model = original
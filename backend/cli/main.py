@@ -22,7 +22,8 @@ Examples:
   quran-cli translate 1 1
   
   # Get tafsir explanation
-  quran-cli tafsir 1 1 --tafsir ibn_kathir
+  quran-cli tafsir 1 1 --tafsir ar-tafsir-muyassar
+  quran-cli tafsir 2 1 --end-verse 5
   
   # Configure API settings
   quran-cli config --api-key your_api_key --model gpt-4-turbo
@@ -50,8 +51,10 @@ Examples:
     tafsir_parser = subparsers.add_parser('tafsir', help='Get tafsir explanation')
     tafsir_parser.add_argument('surah', type=int, help='Surah number')
     tafsir_parser.add_argument('verse', type=int, help='Verse number')
-    tafsir_parser.add_argument('--tafsir', default='ibn_kathir',
-                             help='Tafsir to use (default: ibn_kathir)')
+    tafsir_parser.add_argument('--tafsir', default=None,
+                             help='Tafsir to use (default: first available)')
+    tafsir_parser.add_argument('--end-verse', type=int, default=None,
+                             help='Last verse to include for a range of verses')
     
     # Config command
     config_parser = subparsers.add_parser('config', help='Configure settings')
@@ -120,14 +123,17 @@ async def handle_tafsir(args: argparse.Namespace) -> None:
         
         agent = TafsirToolAgent()
         request = TafsirLookupRequest(
+            query=f"Lookup tafsir for Surah {args.surah}, Verse {args.verse}",
             surah=args.surah,
             verse=args.verse,
-            tafsir_name=args.tafsir
+            tafsir_name=args.tafsir,
+            end_verse=args.end_verse
         )
         
         response = await agent.process(request)
         
-        print_info(f"\nTafsir for Surah {args.surah}, Verse {args.verse} ({args.tafsir}):")
+        verses = f"Verses {args.verse}-{args.end_verse}" if args.end_verse else f"Verse {args.verse}"
+        print_info(f"\nTafsir for Surah {args.surah}, {verses} ({response.tafsir_name}):")
         print(f"\n{response.tafsir_text}\n")
         print_info(f"Source: {response.tafsir_name}")
     except Exception as e:
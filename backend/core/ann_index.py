@@ -0,0 +1,121 @@
+# backend/core/ann_index.py
+"""
+Configurable FAISS index types for the verse / tafsir vectors.
+
+Indexes are described by FAISS factory strings (``FAISS_INDEX_FACTORY``):
+``Flat`` (exact, the default), ``HNSW32``, ``IVF{nlist},Flat``,
+``IVF{nlist},PQ48``, ``IVF{nlist},SQ8``, ``SQ8`` and so on. ``{nlist}`` is
+replaced with a list count suited to the corpus size, so the same setting
+keeps working as tafsir editions are added. Trainable indexes (IVF, PQ, SQ)
+are trained on a random sample of the vectors. Search-time knobs (``nprobe``
+for IVF, ``efSearch`` for HNSW) are not stored in the index file and are
+applied after loading with :func:`apply_search_params`, which also builds
+the IVF direct map that filtered searches read stored vectors through.
+"""
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+from backend.core.config import FAISS_EF_SEARCH, FAISS_INDEX_FACTORY, FAISS_NPROBE, FAISS_TRAIN_SAMPLE
+
+
+def default_nlist(num_vectors: int) -> int:
+    """Inverted list count of about 4 * sqrt(N), with at least 39 training points per list."""
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+
+
+def resolve_factory(factory: str, num_vectors: int) -> str:
+    """Substitute ``{nlist}`` in a factory string for a corpus of ``num_vectors``."""
+    return factory.replace("{nlist}", str(default_nlist(num_vectors)))
+
+
+def is_flat_factory(factory: Optional[str]) -> bool:
+    return not factory or factory.strip() == "Flat"
+
+
+def create_index(
+    vectors: np.ndarray,
+    factory: str = FAISS_INDEX_FACTORY,
+    metric: int = faiss.METRIC_L2,
+    train_sample: int = FAISS_TRAIN_SAMPLE,
+    seed: int = 0
+):
+    """
+    Build an empty (but trained) index for ``vectors``.
+
+    Args:
+        vectors: float32 (N, d) matrix the index will hold; a sample is used for training
+        factory: FAISS factory string, optionally with ``{nlist}``
+        metric: ``faiss.METRIC_L2`` or ``faiss.METRIC_INNER_PRODUCT``
+        train_sample: Maximum number of vectors used for training
+        seed: Seed of the training sample
+
+    Returns:
+        The index, with the configured search parameters applied
+    """
+    index = faiss.index_factory(vectors.shape[1], resolve_factory(factory, len(vectors)), metric)
+    if not index.is_trained:
+        if len(vectors) > train_sample:
+            rows = np.random.default_rng(seed).choice(len(vectors), train_sample, replace=False)
+            training = vectors[np.sort(rows)]
+        else:
+            training = vectors
+        index.train(np.ascontiguousarray(training, dtype=np.float32))
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """
+    Set ``nprobe`` on IVF indexes and ``efSearch`` on HNSW indexes (no-op for others).
+
+    IVF indexes also get their direct map (see :func:`build_direct_map`), so
+    this is the one call needed before an index is shared between searches.
+    """
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass  # Not an IVF index
+    build_direct_map(index)
+    base = faiss.downcast_index(index)
+    if hasattr(base, "hnsw"):
+        base.hnsw.efSearch = ef_search
+    return index
+
+
+def build_direct_map(index):
+    """
+    Let an IVF index reconstruct stored vectors by row id.
+
+    Filtered searches fetch the candidate rows' vectors through
+    ``reconstruct_batch``, which IVF indexes only support with a direct map.
+    Building it modifies the index, so it is done once at load time rather
+    than during concurrent searches. Rows added later are mapped by FAISS
+    itself. No-op for other index types.
+    """
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return index  # Not an IVF index
+    if ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index
+
+
+def describe_index(index) -> Dict[str, object]:
+    """Type, size and search parameters of an index, for logs and status pages."""
+    base = faiss.downcast_index(index)
+    description = {"type": type(base).__name__, "ntotal": int(index.ntotal), "dim": int(index.d)}
+    try:
+        description["nprobe"] = int(faiss.extract_index_ivf(index).nprobe)
+    except RuntimeError:
+        pass
+    if hasattr(base, "hnsw"):
+        description["efSearch"] = int(base.hnsw.efSearch)
+    return description
+
+
+def index_memory_bytes(index) -> int:
+    """Size of the serialized index, a close proxy for its resident memory."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,146 @@
+# backend/core/answer_cache.py
+"""
+Semantic answer cache for the /api/ask endpoint.
+
+Answers are stored under the question embedding together with the filters
+and options that produced them. A new question reuses a stored answer when its
+cosine similarity to a cached question reaches the configured threshold and
+the filters match, which saves the LLM call for near-duplicate questions.
+Cached question vectors live in a small FAISS inner-product index. Entries
+expire after a TTL and the least recently used ones are evicted once the
+cache is full.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from backend.core.config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS
+
+# How many nearest cached questions to inspect for a matching filter key
+_CANDIDATES = 8
+
+
+def make_cache_key(filters: Optional[Dict[str, Any]], **options: Any) -> Tuple:
+    """Hashable key for the parts of a request that must match exactly."""
+    return tuple(sorted({**(filters or {}), **options}.items()))
+
+
+class SemanticAnswerCache:
+    """Similarity-threshold answer cache with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a cached answer to be reused
+            ttl_seconds: Lifetime of a cached answer
+            max_entries: Number of answers kept before LRU eviction
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._index = None  # Created on first store, once the dimension is known
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, vector, key: Tuple) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question vector.
+
+        Returns:
+            ``{'answer', 'sources', 'similarity'}`` on a hit, otherwise None
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            self._expire()
+            if self._index is None or self._index.ntotal == 0 or query.shape[1] != self._index.d:
+                self._stats["misses"] += 1
+                return None
+
+            similarities, ids = self._index.search(query, min(_CANDIDATES, self._index.ntotal))
+            for similarity, entry_id in zip(similarities[0], ids[0]):
+                if entry_id < 0 or similarity < self.threshold:
+                    break  # Results are sorted, nothing further can match
+                entry = self._entries.get(int(entry_id))
+                if entry is not None and entry["key"] == key:
+                    self._entries.move_to_end(int(entry_id))
+                    self._stats["hits"] += 1
+                    return {
+                        "answer": entry["answer"],
+                        "sources": entry["sources"],
+                        "similarity": float(similarity)
+                    }
+
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, vector, key: Tuple, answer: str, sources: List[Dict[str, Any]]) -> None:
+        """Cache an answer under its question vector and filter key."""
+        query = self._normalize(vector)
+        with self._lock:
+            if self._index is None or query.shape[1] != self._index.d:
+                # First entry (or the embedding model changed): start afresh
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(query.shape[1]))
+                self._entries.clear()
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(query, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "key": key,
+                "answer": answer,
+                "sources": sources,
+                "created": time.monotonic()
+            }
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                oldest_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([oldest_id], dtype=np.int64))
+                self._stats["evictions"] += 1
+
+    def _expire(self) -> None:
+        """Drop entries older than the TTL (caller holds the lock)."""
+        if not self._entries or self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry["created"] < cutoff]
+        if expired:
+            for entry_id in expired:
+                del self._entries[entry_id]
+            self._index.remove_ids(np.array(expired, dtype=np.int64))
+            self._stats["expirations"] += len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus the current number of entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,120 @@
+# backend/core/client_registry.py
+"""
+Process-wide registry of pooled OpenAI clients.
+
+Building an ``openai.OpenAI`` client creates a new httpx connection pool, so
+doing it per request pays a TCP/TLS handshake on every call. The registry
+builds one sync and one async client per API key, each backed by a
+keep-alive pool with the limits from the config (HTTP/2 when the optional
+``h2`` package is installed), and closes them on shutdown.
+"""
+import importlib.util
+import threading
+from typing import Dict, Optional
+
+import httpx
+import openai
+
+from backend.core.api_key_manager import load_api_key
+from backend.core.config import (
+    OPENAI_HTTP2,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    OPENAI_TIMEOUT
+)
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class LLMClientRegistry:
+    """Lazily built, shared OpenAI clients keyed by API key."""
+
+    def __init__(
+        self,
+        max_connections: int = OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections: int = OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = OPENAI_KEEPALIVE_EXPIRY,
+        timeout: float = OPENAI_TIMEOUT,
+        http2: bool = OPENAI_HTTP2
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2 = http2 and http2_available()
+        self._sync_clients: Dict[str, openai.OpenAI] = {}
+        self._async_clients: Dict[str, openai.AsyncOpenAI] = {}
+        self._lock = threading.Lock()
+        self.clients_created = 0
+
+    @staticmethod
+    def _resolve_key(api_key: Optional[str]) -> str:
+        api_key = api_key or load_api_key()
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is required")
+        return api_key
+
+    def sync_client(self, api_key: Optional[str] = None) -> openai.OpenAI:
+        """Shared sync client for an API key (the configured key by default)."""
+        api_key = self._resolve_key(api_key)
+        with self._lock:
+            client = self._sync_clients.get(api_key)
+            if client is None:
+                # Passing the httpx client explicitly also avoids the removed
+                # `proxies` argument on newer httpx releases
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    timeout=self.timeout,
+                    max_retries=3,
+                    http_client=httpx.Client(timeout=self.timeout, limits=self.limits, http2=self.http2)
+                )
+                self._sync_clients[api_key] = client
+                self.clients_created += 1
+            return client
+
+    def async_client(self, api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+        """Shared async client for an API key (the configured key by default)."""
+        api_key = self._resolve_key(api_key)
+        with self._lock:
+            client = self._async_clients.get(api_key)
+            if client is None:
+                client = openai.AsyncOpenAI(
+                    api_key=api_key,
+                    timeout=self.timeout,
+                    max_retries=3,
+                    http_client=httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+                )
+                self._async_clients[api_key] = client
+                self.clients_created += 1
+            return client
+
+    async def aclose(self) -> None:
+        """Close every client and its connections."""
+        with self._lock:
+            sync_clients = list(self._sync_clients.values())
+            async_clients = list(self._async_clients.values())
+            self._sync_clients.clear()
+            self._async_clients.clear()
+        for client in sync_clients:
+            client.close()
+        for client in async_clients:
+            await client.close()
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> LLMClientRegistry:
+    """The process-wide client registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = LLMClientRegistry()
+        return _registry
@@ -0,0 +1,47 @@
+# backend/core/concurrency.py
+"""
+Run blocking work (FAISS search, embedding, LangChain calls) off the event loop.
+
+The API handlers are ``async def``; calling CPU-bound or synchronous network
+code from them directly stalls every other request on the worker. They hand
+such calls to a bounded thread pool instead, so the pool size caps how much
+blocking work runs at once while the event loop keeps serving requests.
+Context variables (the request's Server-Timing collector) are carried over
+to the worker thread.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from backend.core.config import BLOCKING_WORKER_THREADS
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide thread pool for blocking work."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKER_THREADS, thread_name_prefix="blocking")
+        return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await ``func(*args, **kwargs)`` running on the blocking thread pool."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    """Stop the thread pool (it is recreated on the next use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
@@ -15,4 +15,103 @@ EMBEDDING_MODEL_TYPE = os.getenv('EMBEDDING_MODEL_TYPE', 'openai')
 LLM_MODEL_NAME = os.getenv('LLM_MODEL_NAME', 'gpt-4-turbo')
 
 # Processing settings
-CHUNK_SIZE = 1000
\ No newline at end of file
+CHUNK_SIZE = 1000
+
+# Vector index settings (see backend/core/ann_index.py)
+# FAISS factory string: Flat (exact), HNSW32, IVF{nlist},Flat, IVF{nlist},PQ48, IVF{nlist},SQ8, ...
+FAISS_INDEX_FACTORY = os.getenv('FAISS_INDEX_FACTORY', 'Flat')
+FAISS_TRAIN_SAMPLE = int(os.getenv('FAISS_TRAIN_SAMPLE', '100000'))
+# Search-time knobs: IVF lists probed per query, HNSW candidate list size
+FAISS_NPROBE = int(os.getenv('FAISS_NPROBE', '16'))
+FAISS_EF_SEARCH = int(os.getenv('FAISS_EF_SEARCH', '64'))
+
+# Keyword retrieval (see backend/core/lexical_index.py)
+# Fuse BM25 hits with the FAISS hits by reciprocal rank fusion
+HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+BM25_K1 = float(os.getenv('BM25_K1', '1.2'))
+BM25_B = float(os.getenv('BM25_B', '0.75'))
+# RRF rank offset: score = sum of 1 / (RRF_K + rank)
+RRF_K = int(os.getenv('RRF_K', '60'))
+
+# Extractive context compression (see backend/core/sentence_index.py)
+# Embed the sentences of every chunk at index-build time
+SENTENCE_INDEX_ENABLED = os.getenv('SENTENCE_INDEX_ENABLED', 'true').lower() == 'true'
+# Keep only the sentences closest to the question when building the prompt
+SENTENCE_COMPRESSION_ENABLED = os.getenv('SENTENCE_COMPRESSION_ENABLED', 'true').lower() == 'true'
+# Sentences kept across all passages, on top of the best sentence of each passage
+SENTENCE_COMPRESSION_MAX_SENTENCES = int(os.getenv('SENTENCE_COMPRESSION_MAX_SENTENCES', '12'))
+# Shorter sentence fragments are merged into their neighbour
+SENTENCE_MIN_CHARS = int(os.getenv('SENTENCE_MIN_CHARS', '40'))
+
+# Token-budgeted context packing (see backend/core/context_packing.py)
+CONTEXT_PACKING_ENABLED = os.getenv('CONTEXT_PACKING_ENABLED', 'true').lower() == 'true'
+# Prompt context tokens per chat model ("model=tokens,..."); CONTEXT_TOKEN_BUDGET for other models
+CONTEXT_TOKEN_BUDGETS = {
+    model.strip(): int(tokens)
+    for model, tokens in (item.split('=') for item in os.getenv(
+        'CONTEXT_TOKEN_BUDGETS', 'gpt-3.5-turbo=600,gpt-4=1000,gpt-4-turbo=1500,gpt-4o=1500'
+    ).split(',') if item.strip())
+}
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '600'))
+# MMR trade-off: 1 ranks by relevance only, lower values favour passages unlike those already chosen
+CONTEXT_MMR_LAMBDA = float(os.getenv('CONTEXT_MMR_LAMBDA', '0.5'))
+
+# Local embedding settings (transformers path of CustomHuggingFaceEmbeddings)
+# Padded tokens (batch size x longest sequence) allowed per forward pass
+EMBEDDING_TOKEN_BUDGET = int(os.getenv('EMBEDDING_TOKEN_BUDGET', '16384'))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv('EMBEDDING_MAX_BATCH_SIZE', '256'))
+# Torch intra-op threads for embedding; 0 keeps the torch default
+EMBEDDING_TORCH_THREADS = int(os.getenv('EMBEDDING_TORCH_THREADS', '0'))
+
+# Cache settings
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(CACHE_DIR, 'query_embeddings.sqlite'))
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '4096'))
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600'))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '2048'))
+
+# Reranking of the retriever agent's candidates (see backend/core/reranker.py)
+# cross_encoder (local model on CPU) or llm (LLMChainExtractor, one chat call per candidate)
+RETRIEVER_COMPRESSOR = os.getenv('RETRIEVER_COMPRESSOR', 'cross_encoder')
+# Multilingual MiniLM cross-encoder, since the corpus is Arabic
+RERANKER_MODEL = os.getenv('RERANKER_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+# An exported ONNX model at this path is run with onnxruntime instead of torch
+RERANKER_ONNX_PATH = os.getenv('RERANKER_ONNX_PATH', os.path.join(CACHE_DIR, 'reranker', RERANKER_MODEL.replace('/', '--') + '.onnx'))
+# Query + passage tokens per pair; longer passages are truncated
+RERANKER_MAX_LENGTH = int(os.getenv('RERANKER_MAX_LENGTH', '256'))
+
+
+# API settings
+# Embedding model used by the API for questions; "basic" is a constant
+# placeholder (the semantic answer cache is disabled with it)
+API_EMBEDDING_MODEL_TYPE = os.getenv('API_EMBEDDING_MODEL_TYPE', 'basic')
+
+# Concurrency settings
+# Threads for blocking FAISS search and embedding work off the event loop
+BLOCKING_WORKER_THREADS = int(os.getenv('BLOCKING_WORKER_THREADS', str(min(32, (os.cpu_count() or 1) + 4))))
+# Connection pool of the shared OpenAI clients (see backend/core/client_registry.py)
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '60'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+# HTTP/2 is used when the optional `h2` package is installed
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'true').lower() == 'true'
+# Answer chains kept ready per (model, temperature, max_tokens) (see backend/core/generator.py)
+GENERATOR_REGISTRY_SIZE = int(os.getenv('GENERATOR_REGISTRY_SIZE', '8'))
+# Seconds each concurrent context step of A2AOrchestrator may take before the
+# answer is generated without it; 0 disables the timeout
+ORCHESTRATOR_DIRECT_TAFSIR_TIMEOUT = float(os.getenv('ORCHESTRATOR_DIRECT_TAFSIR_TIMEOUT', '5'))
+ORCHESTRATOR_REFERENCE_TIMEOUT = float(os.getenv('ORCHESTRATOR_REFERENCE_TIMEOUT', '5'))
+ORCHESTRATOR_RETRIEVAL_TIMEOUT = float(os.getenv('ORCHESTRATOR_RETRIEVAL_TIMEOUT', '20'))
+
+# OpenAI embedding requests during index builds (see backend/core/embedding_scheduler.py)
+OPENAI_EMBEDDING_CONCURRENCY = int(os.getenv('OPENAI_EMBEDDING_CONCURRENCY', '8'))
+# Account budgets; 0 disables a limit
+OPENAI_EMBEDDING_RPM = int(os.getenv('OPENAI_EMBEDDING_RPM', '3000'))
+OPENAI_EMBEDDING_TPM = int(os.getenv('OPENAI_EMBEDDING_TPM', '1000000'))
+OPENAI_EMBEDDING_BATCH_TOKENS = int(os.getenv('OPENAI_EMBEDDING_BATCH_TOKENS', '32000'))
+OPENAI_EMBEDDING_MAX_BATCH_SIZE = int(os.getenv('OPENAI_EMBEDDING_MAX_BATCH_SIZE', '512'))
+OPENAI_EMBEDDING_MAX_RETRIES = int(os.getenv('OPENAI_EMBEDDING_MAX_RETRIES', '6'))
@@ -0,0 +1,174 @@
+# backend/core/context_packing.py
+"""
+Token-budgeted, diversity-aware selection of the passages sent to the LLM.
+
+Retrieval returns up to 15 passages, often a verse next to several tafsirs
+saying much the same thing. Instead of concatenating all of them, the
+context is packed greedily by Maximal Marginal Relevance under a per-model
+token budget. Each step picks the passage that maximizes
+
+    lambda * sim(question, passage) - (1 - lambda) * max sim(passage, chosen)
+
+among those that still fit the remaining budget.
+
+Everything per passage is precomputed at index-build time: the token
+counts (``token_counts.npy``, one per docstore row) and the chunk
+embeddings (``vectors.npy`` of the build manifest). At query time this
+costs one gather and two small matrix products. Passages without a docstore
+row (exact reference lookups) are always kept and counted against the
+budget first.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.core.config import CONTEXT_MMR_LAMBDA, CONTEXT_TOKEN_BUDGET, CONTEXT_TOKEN_BUDGETS
+from backend.core.embedding_scheduler import get_token_counter
+from backend.core.incremental_index import load_manifest
+
+TOKEN_COUNTS_FILENAME = "token_counts.npy"
+# Tokenizer used for the stored counts (shared by the gpt-3.5 / gpt-4 family)
+TOKEN_COUNT_MODEL = "gpt-3.5-turbo"
+# "[Tafsir muyassar on 2:153]: " and the blank line between passages
+PASSAGE_OVERHEAD_TOKENS = 12
+
+
+def context_token_budget(model: str) -> int:
+    """Prompt context tokens allowed for a chat model."""
+    return CONTEXT_TOKEN_BUDGETS.get(model, CONTEXT_TOKEN_BUDGET)
+
+
+def write_token_counts(index_path: str, texts: Sequence[str]) -> np.ndarray:
+    """Count the tokens of every chunk (docstore row order) and store them next to the index."""
+    count_tokens = get_token_counter(TOKEN_COUNT_MODEL)
+    counts = np.fromiter((count_tokens(text) for text in texts), dtype=np.int32, count=len(texts))
+    np.save(os.path.join(index_path, TOKEN_COUNTS_FILENAME), counts)
+    return counts
+
+
+def mmr_select(
+    relevance: np.ndarray,
+    costs: np.ndarray,
+    budget: int,
+    similarity: Optional[np.ndarray] = None,
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA
+) -> List[int]:
+    """
+    Greedy MMR selection under a token budget.
+
+    Args:
+        relevance: Relevance of each candidate to the question, shape (n,)
+        costs: Tokens of each candidate, shape (n,)
+        budget: Tokens available
+        similarity: Pairwise candidate similarities, shape (n, n); without it
+            candidates are taken by relevance alone
+        mmr_lambda: Weight of relevance against redundancy
+
+    Returns:
+        Indices of the chosen candidates, in selection order
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    costs = np.asarray(costs, dtype=np.int64)
+    available = np.ones(len(relevance), dtype=bool)
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    remaining = budget
+    selected: List[int] = []
+    while True:
+        available &= costs <= remaining
+        if not available.any():
+            return selected
+        scores = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        remaining -= int(costs[best])
+        if similarity is not None:
+            np.maximum(redundancy, similarity[best], out=redundancy)
+
+
+class ContextPacker:
+    """Chooses the passages of the LLM context from precomputed token counts and embeddings."""
+
+    def __init__(self, token_counts: np.ndarray, vectors: Optional[np.ndarray] = None):
+        """
+        Args:
+            token_counts: Tokens of each docstore row
+            vectors: Chunk embeddings of each docstore row; without them
+                passages are packed in retrieval order (budget only)
+        """
+        self.token_counts = token_counts
+        self.vectors = vectors
+        self._count_tokens = get_token_counter(TOKEN_COUNT_MODEL)
+
+    def __len__(self) -> int:
+        return len(self.token_counts)
+
+    @property
+    def has_vectors(self) -> bool:
+        return self.vectors is not None
+
+    @classmethod
+    def load(cls, index_path: str, model_id: Optional[str] = None) -> Optional["ContextPacker"]:
+        """
+        Open the token counts and chunk vectors of an index, or None without token counts.
+
+        The vectors are only used when they come from ``model_id``, the model
+        that embeds the questions.
+        """
+        counts_path = os.path.join(index_path, TOKEN_COUNTS_FILENAME)
+        if not os.path.exists(counts_path):
+            return None
+        token_counts = np.load(counts_path, mmap_mode="r")
+        manifest, vectors = load_manifest(index_path)
+        if manifest is not None and model_id is not None and manifest.get("embedding_model") != model_id:
+            print(f"Warning: Index vectors come from {manifest.get('embedding_model')}, not {model_id}; "
+                  "packing the context by retrieval order")
+            vectors = None
+        if vectors is not None and len(vectors) != len(token_counts):
+            vectors = None
+        return cls(token_counts, vectors)
+
+    def select(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        budget: int,
+        query_vector: Optional[np.ndarray] = None,
+        mmr_lambda: float = CONTEXT_MMR_LAMBDA
+    ) -> List[Dict[str, Any]]:
+        """
+        The passages to put in the prompt.
+
+        Args:
+            documents: Retrieved ``{'content', 'metadata', 'row', ...}`` dictionaries, best first
+            budget: Tokens available for the context
+            query_vector: Question embedding; MMR needs it and the stored vectors
+            mmr_lambda: Weight of relevance against redundancy
+
+        Returns:
+            Documents without a known ``row`` first, then the chosen passages
+            in selection order
+        """
+        pinned, candidates = [], []
+        for doc in documents:
+            row = doc.get("row", -1)
+            (candidates if 0 <= row < len(self) else pinned).append(doc)
+        budget -= sum(self._count_tokens(doc["content"]) + PASSAGE_OVERHEAD_TOKENS for doc in pinned)
+        if not candidates:
+            return pinned
+
+        rows = np.array([doc["row"] for doc in candidates], dtype=np.int64)
+        costs = self.token_counts[rows] + PASSAGE_OVERHEAD_TOKENS
+        similarity = None
+        if self.vectors is not None and query_vector is not None:
+            vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            query = np.asarray(query_vector, dtype=np.float32).ravel()
+            relevance = vectors @ (query / max(float(np.linalg.norm(query)), 1e-12))
+            similarity = vectors @ vectors.T
+        else:
+            # Retrieval order is the only relevance signal left
+            relevance = 1 - np.arange(len(candidates), dtype=np.float32) / len(candidates)
+
+        chosen = mmr_select(relevance, costs, budget, similarity, mmr_lambda)
+        return pinned + [candidates[i] for i in chosen]
@@ -73,15 +73,37 @@ def load_tafsir_data(tafsir_dir: str) -> List[Dict[str, Any]]:
                     })
         elif isinstance(tafsir_data, list):
             # List format where each item is expected to have reference and explanation
+            # Downloaded editions list one record per verse but leave the verse
+            # number out of the reference ("surah:None"); within a surah the
+            # records are sorted by the verse number as a string (1, 10, 100,
+            # 101, ..., 2, 20, ...), so rebuild the numbers from that order
+            unnumbered = {}
+            for item in tafsir_data:
+                if isinstance(item, dict):
+                    match = re.match(r'(\d+):None', str(item.get('reference', '')))
+                    if match:
+                        surah_num = int(match.group(1))
+                        unnumbered[surah_num] = unnumbered.get(surah_num, 0) + 1
+            verse_order = {
+                surah_num: sorted(range(1, count + 1), key=str)
+                for surah_num, count in unnumbered.items()
+            }
+            verses_seen = {}  # Running record count per surah for "surah:None" references
             for item in tafsir_data:
                 if isinstance(item, dict) and 'reference' in item and ('explanation' in item or 'text' in item):
                     reference = item.get('reference')
                     explanation = item.get('explanation', item.get('text', ''))
                     
                     # Extract surah and verse numbers
-                    match = re.match(r'(\d+):(\d+)', reference)
+                    match = re.match(r'(\d+):(\d+|None)', reference)
                     if match:
-                        surah_num, verse_num = map(int, match.groups())
+                        surah_num = int(match.group(1))
+                        if match.group(2) == 'None':
+                            verse_num = verse_order[surah_num][verses_seen.get(surah_num, 0)]
+                            verses_seen[surah_num] = verses_seen.get(surah_num, 0) + 1
+                            reference = f"{surah_num}:{verse_num}"
+                        else:
+                            verse_num = int(match.group(2))
                         
                         tafsir_documents.append({
                             'content': explanation,
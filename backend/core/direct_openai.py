@@ -3,33 +3,48 @@ Direct OpenAI API integration that bypasses LangChain's complexities.
 This provides a simplified, reliable way to generate answers using OpenAI's API.
 """
 import os
-import openai
-import httpx
 from dotenv import load_dotenv
 
+from backend.core.client_registry import get_client_registry
+
 # Load environment variables
 load_dotenv()
 
 def get_openai_client():
-    """Get an OpenAI API client with the API key from environment"""
+    """
+    Get the shared OpenAI API client for the API key from environment
+
+    The client comes from the process-wide registry, so its keep-alive
+    connection pool is reused across calls.
+    """
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is required")
-    
-    try:
-        # Initialize with default client
-        return openai.OpenAI(
-            api_key=api_key,
-            timeout=30.0,  # Add timeout
-            max_retries=3  # Add retries
-        )
-    except Exception as e:
-        # If the above fails (e.g., with older versions of the openai package),
-        # fall back to the legacy client
-        print(f"Warning: Could not create OpenAI client: {e}")
-        print("Falling back to legacy client initialization")
-        openai.api_key = api_key
-        return openai
+    return get_client_registry().sync_client(api_key)
+
+ANSWER_SYSTEM_PROMPT = """You are a knowledgeable Quran scholar assistant. Your task is to provide accurate, respectful, and helpful information about the Quran based on the context provided. Consider different interpretations where relevant, but avoid making claims without textual support.
+
+Context information is below:
+-----------------
+{context}
+-----------------
+
+Given this context, provide a thoughtful response to the user's question. If the context doesn't contain sufficient information to answer fully, acknowledge the limitations while providing what you can based on the available information.
+
+Ensure your response is well-structured with:
+1. A direct answer to the question
+2. Supporting evidence from the Quran verses and/or tafsir provided in the context
+3. If applicable, mention different scholarly interpretations
+
+Cite specific Surah and verse numbers when referencing Quranic text (e.g., "Quran 2:255").
+"""
+
+def build_answer_messages(context, question):
+    """Chat messages for answering a question from retrieved context"""
+    return [
+        {"role": "system", "content": ANSWER_SYSTEM_PROMPT.format(context=context)},
+        {"role": "user", "content": question}
+    ]
 
 def generate_answer_with_openai(context, question, model="gpt-3.5-turbo"):
     """
@@ -47,31 +62,12 @@ def generate_answer_with_openai(context, question, model="gpt-3.5-turbo"):
         # Get client
         client = get_openai_client()
         
-        # Create prompt
-        system_prompt = """You are a knowledgeable Quran scholar assistant. Your task is to provide accurate, respectful, and helpful information about the Quran based on the context provided. Consider different interpretations where relevant, but avoid making claims without textual support.
-
-Context information is below:
------------------
-{context}
------------------
-
-Given this context, provide a thoughtful response to the user's question. If the context doesn't contain sufficient information to answer fully, acknowledge the limitations while providing what you can based on the available information.
-
-Ensure your response is well-structured with:
-1. A direct answer to the question
-2. Supporting evidence from the Quran verses and/or tafsir provided in the context
-3. If applicable, mention different scholarly interpretations
-
-Cite specific Surah and verse numbers when referencing Quranic text (e.g., "Quran 2:255").
-""".format(context=context)
+        messages = build_answer_messages(context, question)
 
         # Call OpenAI API
         response = client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question}
-            ],
+            messages=messages,
             temperature=0,
             max_tokens=1000
         )
@@ -89,4 +85,68 @@ Cite specific Surah and verse numbers when referencing Quranic text (e.g., "Qura
     
     except Exception as e:
         print(f"Error generating answer with OpenAI: {e}")
-        return f"I encountered an error when generating the answer: {str(e)}"
\ No newline at end of file
+        return f"I encountered an error when generating the answer: {str(e)}"
+
+def get_async_openai_client():
+    """Get the shared async OpenAI API client for the API key from environment"""
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
+    return get_client_registry().async_client(api_key)
+
+async def close_openai_clients():
+    """Close the shared OpenAI clients and their connections"""
+    await get_client_registry().aclose()
+
+async def agenerate_answer_with_openai(context, question, model="gpt-3.5-turbo"):
+    """
+    Async version of ``generate_answer_with_openai``
+
+    Awaiting the request frees the event loop for other requests while the
+    model generates. Unlike the sync version, API errors are raised so the
+    caller can fall back to another generator.
+
+    Returns:
+        str: The generated answer
+    """
+    client = get_async_openai_client()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=build_answer_messages(context, question),
+        temperature=0,
+        max_tokens=1000
+    )
+    return response.choices[0].message.content
+
+async def astream_answer_with_openai(context, question, model="gpt-3.5-turbo"):
+    """
+    Stream an answer from the OpenAI API as it is generated
+
+    Args:
+        context: The context information from retrieved documents
+        question: The user's question
+        model: The OpenAI model to use
+
+    Yields:
+        str: Answer text fragments in arrival order
+
+    Raises:
+        RuntimeError: The stream ended without a finish reason (dropped
+            partway), so the fragments are not a complete answer
+    """
+    client = get_async_openai_client()
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=build_answer_messages(context, question),
+        temperature=0,
+        max_tokens=1000,
+        stream=True
+    )
+    finish_reason = None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        if chunk.choices and chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+    if finish_reason is None:
+        raise RuntimeError("OpenAI stream ended before the answer was finished")
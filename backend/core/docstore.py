@@ -0,0 +1,329 @@
+# backend/core/docstore.py
+"""
+Memory-mapped columnar document store.
+
+The store lives next to the FAISS index in a ``docstore/`` directory and is laid
+out so that row ``i`` of the FAISS index is row ``i`` of the store:
+
+    offsets.npy   int64[n + 1]  byte offsets of each document in text.bin
+    text.bin      uint8         concatenated UTF-8 page contents
+    surah.npy     int16[n]      surah number (-1 when unknown)
+    verse.npy     int16[n]      verse number (-1 when unknown)
+    source.npy    int16[n]      code into the ``sources`` table of meta.json
+    meta.json                   format version, document count, lookup tables
+
+Every array is opened with ``mmap_mode='r'`` so startup only touches the file
+headers, pages are shared between uvicorn workers through the page cache and a
+lookup by FAISS row id is a pair of array reads.
+"""
+import json
+import os
+import pickle
+import shutil
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+DOCSTORE_DIRNAME = "docstore"
+DOCSTORE_FORMAT_VERSION = 1
+
+_META_FILE = "meta.json"
+_TEXT_FILE = "text.bin"
+_OFFSETS_FILE = "offsets.npy"
+_SURAH_FILE = "surah.npy"
+_VERSE_FILE = "verse.npy"
+_SOURCE_FILE = "source.npy"
+
+# Metadata keys that may carry the surah / verse number, in order of preference
+SURAH_KEYS = ("surah_num", "surah_number", "surah")
+VERSE_KEYS = ("verse_num", "verse_number", "verse")
+
+
+def metadata_int(metadata: Dict[str, Any], keys: Sequence[str]) -> int:
+    """Return the first integer-like value found under ``keys`` or -1."""
+    for key in keys:
+        value = metadata.get(key)
+        if value is None:
+            continue
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return -1
+
+
+class MmapDocStore:
+    """Read-only, memory-mapped view over a document store directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, _META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("version") != DOCSTORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported docstore format version: {meta.get('version')}")
+
+        self.sources: List[str] = meta["sources"]
+        self.surah_names: Dict[int, str] = {int(k): v for k, v in meta.get("surah_names", {}).items()}
+        self._count = int(meta["count"])
+
+        self.offsets = np.load(os.path.join(path, _OFFSETS_FILE), mmap_mode="r")
+        self.surah = np.load(os.path.join(path, _SURAH_FILE), mmap_mode="r")
+        self.verse = np.load(os.path.join(path, _VERSE_FILE), mmap_mode="r")
+        self.source_codes = np.load(os.path.join(path, _SOURCE_FILE), mmap_mode="r")
+
+        text_path = os.path.join(path, _TEXT_FILE)
+        if os.path.getsize(text_path) > 0:
+            self._text = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            # np.memmap refuses zero-length files
+            self._text = np.empty(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, row: int) -> bool:
+        return 0 <= row < self._count
+
+    def text(self, row: int) -> str:
+        """Return the page content stored at ``row``."""
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return self._text[start:end].tobytes().decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Rebuild the metadata dictionary for ``row`` from the packed columns."""
+        return self._build_metadata(
+            self.sources[self.source_codes[row]],
+            int(self.surah[row]),
+            int(self.verse[row])
+        )
+
+    def _build_metadata(self, source: str, surah_num: int, verse_num: int) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {"source": source}
+        if surah_num >= 0:
+            metadata["surah_num"] = surah_num
+            if source == "quran" and surah_num in self.surah_names:
+                metadata["surah_name"] = self.surah_names[surah_num]
+        if verse_num >= 0:
+            metadata["verse_num"] = verse_num
+        metadata["reference"] = f"{surah_num}:{verse_num}" if surah_num >= 0 and verse_num >= 0 else ""
+        return metadata
+
+    def get(self, row: int) -> Optional[Dict[str, Any]]:
+        """Return ``{'content', 'metadata'}`` for a FAISS row id, or None if out of range."""
+        if row < 0 or row >= self._count:
+            return None
+        return {"content": self.text(row), "metadata": self.metadata(row)}
+
+    def get_many(self, rows: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Vector form of :meth:`get` that keeps the input order."""
+        return [self.get(int(row)) for row in rows]
+
+    def get_batch(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Materialize many rows at once.
+
+        Offsets and metadata columns are gathered with a single fancy-indexing
+        operation each; only the UTF-8 decode remains per document. Every row
+        must be in range.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        ends = self.offsets[rows + 1]
+        surahs = self.surah[rows]
+        verses = self.verse[rows]
+        codes = self.source_codes[rows]
+
+        documents = []
+        for start, end, surah_num, verse_num, code in zip(starts, ends, surahs, verses, codes):
+            documents.append({
+                "content": self._text[start:end].tobytes().decode("utf-8"),
+                "metadata": self._build_metadata(self.sources[code], int(surah_num), int(verse_num)),
+            })
+        return documents
+
+    def iter_documents(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every document in row order."""
+        for row in range(self._count):
+            yield self.get(row)
+
+
+def staging_directory(path: str) -> str:
+    """Empty sibling directory to write a new version of ``path`` into (see :func:`replace_directory`)."""
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def replace_directory(staging: str, path: str) -> None:
+    """
+    Move a fully written ``staging`` directory to ``path``, replacing the old one.
+
+    The old files are renamed away and unlinked, never truncated, so readers
+    that still have them memory-mapped keep a consistent view until they
+    reopen. Until the second rename ``path`` is briefly missing, which
+    loaders treat as no store yet.
+    """
+    previous = None
+    if os.path.exists(path):
+        previous = f"{path}.old"
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(path, previous)
+    os.replace(staging, path)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def write_docstore(documents: Sequence[Dict[str, Any]], path: str) -> str:
+    """
+    Write documents to a docstore directory in FAISS row order.
+
+    The store is written to a staging directory and then swapped in whole,
+    so a running process reading the previous store is never handed a
+    truncated or half-written file.
+
+    Args:
+        documents: ``{'content', 'metadata'}`` dictionaries, one per FAISS row
+        path: Target directory (replaced if it exists)
+
+    Returns:
+        The directory that was written
+    """
+    final_path = path
+    path = staging_directory(final_path)
+
+    count = len(documents)
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    surah = np.full(count, -1, dtype=np.int16)
+    verse = np.full(count, -1, dtype=np.int16)
+    source_codes = np.zeros(count, dtype=np.int16)
+    sources: List[str] = []
+    source_lookup: Dict[str, int] = {}
+    surah_names: Dict[str, str] = {}
+
+    with open(os.path.join(path, _TEXT_FILE), "wb") as text_file:
+        position = 0
+        for row, doc in enumerate(documents):
+            encoded = (doc.get("content") or "").encode("utf-8")
+            text_file.write(encoded)
+            position += len(encoded)
+            offsets[row + 1] = position
+
+            metadata = doc.get("metadata") or {}
+            source = str(metadata.get("source", "unknown"))
+            if source not in source_lookup:
+                source_lookup[source] = len(sources)
+                sources.append(source)
+            source_codes[row] = source_lookup[source]
+
+            surah[row] = metadata_int(metadata, SURAH_KEYS)
+            verse[row] = metadata_int(metadata, VERSE_KEYS)
+            if metadata.get("surah_name") and surah[row] >= 0:
+                surah_names[str(int(surah[row]))] = metadata["surah_name"]
+
+    np.save(os.path.join(path, _OFFSETS_FILE), offsets)
+    np.save(os.path.join(path, _SURAH_FILE), surah)
+    np.save(os.path.join(path, _VERSE_FILE), verse)
+    np.save(os.path.join(path, _SOURCE_FILE), source_codes)
+
+    with open(os.path.join(path, _META_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": DOCSTORE_FORMAT_VERSION,
+            "count": count,
+            "sources": sources,
+            "surah_names": surah_names,
+        }, f, ensure_ascii=False)
+
+    replace_directory(path, final_path)
+    return final_path
+
+
+def _documents_from_langchain_pickle(pickle_path: str) -> List[Dict[str, Any]]:
+    """Read the ``(docstore, index_to_docstore_id)`` pair written by ``FAISS.save_local``."""
+    with open(pickle_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    documents = []
+    for row in range(len(index_to_docstore_id)):
+        doc = docstore.search(index_to_docstore_id[row])
+        documents.append({
+            "content": getattr(doc, "page_content", ""),
+            "metadata": dict(getattr(doc, "metadata", {}) or {}),
+        })
+    return documents
+
+
+def _documents_from_docstore_json(json_path: str) -> List[Dict[str, Any]]:
+    """Read a ``docstore.json`` dump keyed by stringified FAISS row ids."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)["docstore"]["_dict"]
+
+    documents = []
+    for key in sorted(entries, key=int):
+        entry = entries[key]
+        documents.append({
+            "content": entry.get("text", entry.get("page_content", "")),
+            "metadata": entry.get("metadata", {}),
+        })
+    return documents
+
+
+def convert_langchain_index(index_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Convert the output of LangChain's ``FAISS.save_local`` into a docstore.
+
+    ``index.pkl`` is preferred; a legacy ``docstore.json`` is used when no
+    pickle is present.
+
+    Args:
+        index_path: Directory containing ``index.faiss`` and ``index.pkl``
+        output_path: Target directory (defaults to ``<index_path>/docstore``)
+
+    Returns:
+        The directory that was written
+    """
+    output_path = output_path or os.path.join(index_path, DOCSTORE_DIRNAME)
+
+    pickle_path = os.path.join(index_path, "index.pkl")
+    json_path = os.path.join(index_path, "docstore.json")
+    if os.path.exists(pickle_path):
+        documents = _documents_from_langchain_pickle(pickle_path)
+    elif os.path.exists(json_path):
+        documents = _documents_from_docstore_json(json_path)
+    else:
+        raise FileNotFoundError(f"Neither index.pkl nor docstore.json found in {index_path}")
+
+    print(f"Converting {len(documents)} documents to {output_path}")
+    return write_docstore(documents, output_path)
+
+
+def load_docstore(index_path: str, build_if_missing: bool = True) -> MmapDocStore:
+    """
+    Open the docstore stored alongside a FAISS index.
+
+    Args:
+        index_path: Directory containing the FAISS index
+        build_if_missing: Convert the LangChain output when no docstore exists yet
+
+    Returns:
+        A memory-mapped document store
+    """
+    store_path = os.path.join(index_path, DOCSTORE_DIRNAME)
+    if not os.path.exists(os.path.join(store_path, _META_FILE)):
+        if not build_if_missing:
+            raise FileNotFoundError(f"No docstore found at {store_path}")
+        convert_langchain_index(index_path, store_path)
+    return MmapDocStore(store_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a LangChain FAISS index to a memory-mapped docstore")
+    parser.add_argument("index_path", help="Directory written by FAISS.save_local")
+    parser.add_argument("--output", help="Output directory (default: <index_path>/docstore)")
+    args = parser.parse_args()
+
+    written = convert_langchain_index(args.index_path, args.output)
+    print(f"Docstore written to {written} ({len(MmapDocStore(written))} documents)")
@@ -0,0 +1,141 @@
+# backend/core/embedding_cache.py
+"""
+Content-addressed cache for query embeddings.
+
+Entries are keyed by the embedding model name plus the normalized question
+text and hold float32 vectors. Lookups go through an in-process LRU first and
+then a SQLite file in WAL mode, which every worker process on the host
+shares, so a repeated question skips the OpenAI round-trip or the transformer
+forward pass.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from backend.core.config import EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_SIZE
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a question so trivially different spellings share an entry."""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Two-tier (LRU + SQLite) embedding cache with hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = EMBEDDING_CACHE_PATH, max_memory_items: int = EMBEDDING_CACHE_SIZE):
+        """
+        Args:
+            path: SQLite file for the persistent tier, or None for memory only
+            max_memory_items: Capacity of the in-process LRU tier
+        """
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                "vector BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Content address for a (model, question) pair."""
+        return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector or None."""
+        key = self.make_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self._stats["disk_hits"] += 1
+                    return vector
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, model: str, text: str, vector) -> None:
+        """Store a vector for a (model, question) pair in both tiers."""
+        key = self.make_key(model, text)
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, created) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, int(vector.shape[0]), vector.tobytes(), time.time())
+                )
+                self._db.commit()
+            self._stats["writes"] += 1
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus the current hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when disabled in the config."""
+    global _embedding_cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            try:
+                _embedding_cache = EmbeddingCache()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not open embedding cache at {EMBEDDING_CACHE_PATH}: {e}")
+                print("Falling back to an in-memory embedding cache")
+                _embedding_cache = EmbeddingCache(path=None)
+        return _embedding_cache
@@ -0,0 +1,299 @@
+# backend/core/embedding_scheduler.py
+"""
+Concurrent, rate-limited OpenAI embedding requests for index builds.
+
+Texts are packed into requests by token count, and several requests are kept
+in flight at once. A shared limiter keeps the requests and tokens sent in any
+60 second window under the account's RPM/TPM budgets. Rate-limit, timeout,
+connection and 5xx errors are retried with jittered exponential backoff,
+honouring ``Retry-After``. Texts whose request still fails are reported back
+instead of being filled with placeholder vectors, so the caller can leave
+them out of the index and retry them on the next build.
+"""
+import asyncio
+import base64
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+import openai
+
+from backend.core.config import (
+    OPENAI_EMBEDDING_BATCH_TOKENS,
+    OPENAI_EMBEDDING_CONCURRENCY,
+    OPENAI_EMBEDDING_MAX_BATCH_SIZE,
+    OPENAI_EMBEDDING_MAX_RETRIES,
+    OPENAI_EMBEDDING_RPM,
+    OPENAI_EMBEDDING_TPM,
+    OPENAI_TIMEOUT
+)
+
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+
+def get_token_counter(model: str) -> Callable[[str], int]:
+    """
+    Token counter for an OpenAI embedding or chat model.
+
+    Uses ``tiktoken`` when it is installed and its encoding can be loaded,
+    otherwise a conservative estimate of one token per three characters.
+    """
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception:  # Not installed, unknown model or encoding not downloadable
+        return lambda text: len(text) // 3 + 1
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def plan_token_batches(token_counts: Sequence[int], max_batch_tokens: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Split rows into consecutive batches under a token and a size limit.
+
+    A single text longer than ``max_batch_tokens`` gets a batch of its own.
+
+    Returns:
+        Lists of row indices, in input order
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for row, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(row)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RateLimiter:
+    """Sliding-window requests-per-minute and tokens-per-minute limiter."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, period: float = 60.0):
+        """
+        Args:
+            requests_per_minute: Requests allowed per window (0 = unlimited)
+            tokens_per_minute: Tokens allowed per window (0 = unlimited)
+            period: Window length in seconds
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._sent: "deque[tuple]" = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._sent and self._sent[0][0] <= now - self.period:
+            _, tokens = self._sent.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        over_requests = self.requests_per_minute and len(self._sent) >= self.requests_per_minute
+        # An oversized request is let through once the window is empty
+        over_tokens = (
+            self.tokens_per_minute and self._sent
+            and self._tokens_in_window + tokens > self.tokens_per_minute
+        )
+        if over_requests or over_tokens:
+            return self._sent[0][0] + self.period - now
+        return 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of ``tokens`` tokens fits in the budgets, then record it."""
+        async with self._lock:  # Callers are served in arrival order
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self._sent.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for ``seconds`` (e.g. after a 429 with Retry-After)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+@dataclass
+class EmbeddingRun:
+    """Result of embedding a list of texts."""
+
+    vectors: np.ndarray  # float32 (N, d); rows listed in ``failed`` are zero
+    failed: Dict[int, str] = field(default_factory=dict)  # Row -> error message
+    requests: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> np.ndarray:
+        """Boolean mask of the rows that were embedded."""
+        mask = np.ones(len(self.vectors), dtype=bool)
+        mask[list(self.failed)] = False
+        return mask
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler:
+    """Keeps several token-sized embedding requests in flight under RPM/TPM budgets."""
+
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        concurrency: int = OPENAI_EMBEDDING_CONCURRENCY,
+        requests_per_minute: int = OPENAI_EMBEDDING_RPM,
+        tokens_per_minute: int = OPENAI_EMBEDDING_TPM,
+        max_batch_tokens: int = OPENAI_EMBEDDING_BATCH_TOKENS,
+        max_batch_size: int = OPENAI_EMBEDDING_MAX_BATCH_SIZE,
+        max_retries: int = OPENAI_EMBEDDING_MAX_RETRIES,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = OPENAI_TIMEOUT,
+        http_client_factory: Optional[Callable[[], httpx.AsyncClient]] = None
+    ):
+        """
+        Args:
+            model: OpenAI embedding model
+            api_key, base_url: Passed to ``openai.AsyncOpenAI`` (environment defaults otherwise)
+            concurrency: Requests in flight at once
+            requests_per_minute, tokens_per_minute: Account budgets (0 = unlimited)
+            max_batch_tokens, max_batch_size: Limits of a single request
+            max_retries: Retries of a failing request before its texts are reported as failed
+            backoff_base, backoff_max: Exponential backoff bounds in seconds
+            timeout: Per-request timeout
+            http_client_factory: Builds the ``httpx.AsyncClient`` of a run (tests pass an in-process transport)
+        """
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.http_client_factory = http_client_factory
+        self.count_tokens = get_token_counter(model)
+
+    def _make_client(self) -> openai.AsyncOpenAI:
+        # A client per run: async connection pools are bound to the event loop
+        # they were created on, and each sync call runs its own loop
+        if self.http_client_factory is not None:
+            http_client = self.http_client_factory()
+        else:
+            http_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            )
+        return openai.AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,  # Retries are handled here, under the rate limiter
+            http_client=http_client
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def _embed_batch(self, client, limiter, texts: List[str], tokens: int, run: EmbeddingRun) -> np.ndarray:
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            run.requests += 1
+            try:
+                response = await client.embeddings.create(model=self.model, input=texts, encoding_format="base64")
+                rows = sorted(response.data, key=lambda data: data.index)
+                return np.vstack([
+                    np.frombuffer(base64.b64decode(data.embedding), dtype=np.float32)
+                    if isinstance(data.embedding, str) else np.asarray(data.embedding, dtype=np.float32)
+                    for data in rows
+                ])
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = _retry_after(e)
+                if delay is not None and isinstance(e, openai.RateLimitError):
+                    limiter.pause(delay)
+                else:
+                    delay = self._backoff(attempt)
+                attempt += 1
+                run.retries += 1
+                print(f"Embedding request failed ({type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def aembed(self, texts: List[str]) -> EmbeddingRun:
+        """Embed ``texts``; rows whose request failed after all retries are listed in ``failed``."""
+        start_time = time.perf_counter()
+        token_counts = [self.count_tokens(text) for text in texts]
+        batches = plan_token_batches(token_counts, self.max_batch_tokens, self.max_batch_size)
+        limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        run = EmbeddingRun(vectors=np.empty((0, 0), dtype=np.float32))
+        results: Dict[int, np.ndarray] = {}
+
+        async def worker(batch_id: int, rows: List[int]):
+            async with semaphore:
+                try:
+                    results[batch_id] = await self._embed_batch(
+                        client, limiter, [texts[row] for row in rows], sum(token_counts[row] for row in rows), run
+                    )
+                except Exception as e:
+                    print(f"Embedding {len(rows)} texts failed: {e}")
+                    for row in rows:
+                        run.failed[row] = f"{type(e).__name__}: {e}"
+
+        client = self._make_client()
+        try:
+            await asyncio.gather(*(worker(batch_id, rows) for batch_id, rows in enumerate(batches)))
+        finally:
+            await client.close()
+
+        dim = next(iter(results.values())).shape[1] if results else 0
+        run.vectors = np.zeros((len(texts), dim), dtype=np.float32)
+        for batch_id, vectors in results.items():
+            run.vectors[batches[batch_id]] = vectors
+        run.seconds = time.perf_counter() - start_time
+        return run
+
+    def embed(self, texts: List[str]) -> EmbeddingRun:
+        """Synchronous wrapper around ``aembed`` for index builds."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aembed(texts))
+        # Called from inside an event loop: run on a separate one
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, self.aembed(texts)).result()
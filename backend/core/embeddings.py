@@ -1,15 +1,22 @@
 # backend/core/embeddings.py
+import base64
 import os
 import pickle
 from typing import List, Dict, Any
 import openai
 # from langchain_openai import OpenAIEmbeddings  # Comment out as we're not using this directly
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from dotenv import load_dotenv
 from langchain_core.embeddings import Embeddings
 import numpy as np
 import httpx
+from backend.core.docstore import convert_langchain_index
+from backend.core.vector_search import PrefilteredFAISS
+from backend.core.embedding_cache import get_embedding_cache
+from backend.core.client_registry import get_client_registry
+from backend.core.embedding_scheduler import EmbeddingRun, EmbeddingScheduler
+from backend.core.incremental_index import build_incremental_index
+from backend.core.config import FAISS_INDEX_FACTORY, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_TOKEN_BUDGET, EMBEDDING_TORCH_THREADS
 
 load_dotenv()  # Load API keys from .env file
 
@@ -28,6 +35,9 @@ class CustomOpenAIEmbeddings(Embeddings):
     
     def __init__(self, model="text-embedding-3-small"):
         self.model = model
+        self.model_name = model
+        self.cache = get_embedding_cache()
+        self.scheduler = None  # Built on the first document batch
         # Ensure the API key is set globally
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -35,12 +45,8 @@ class CustomOpenAIEmbeddings(Embeddings):
         
         # Initialize the client for OpenAI v1.0.0+
         try:
-            from openai import OpenAI
-            self.client = OpenAI(
-                api_key=api_key,
-                timeout=30.0,  # Add timeout
-                max_retries=3  # Add retries
-            )
+            # Shared pooled client from the process-wide registry
+            self.client = get_client_registry().sync_client(api_key)
             self.use_new_api = True
             print(f"Using OpenAI v1.0.0+ API with model {self.model}")
         except (ImportError, TypeError) as e:
@@ -51,51 +57,119 @@ class CustomOpenAIEmbeddings(Embeddings):
             self.use_new_api = False
             print(f"Using OpenAI pre-1.0.0 API with model {self.model}")
     
+    @staticmethod
+    def _embedding_array(data) -> np.ndarray:
+        """Decode one embedding from the API (base64 float32 bytes or a float list)"""
+        if isinstance(data.embedding, str):
+            return np.frombuffer(base64.b64decode(data.embedding), dtype=np.float32)
+        return np.asarray(data.embedding, dtype=np.float32)
+    
+    def _request_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Call the embeddings endpoint and return a float32 (N, d) array"""
+        if self.use_new_api:
+            # New API (v1.0.0+); base64 skips parsing thousands of JSON floats
+            response = self.client.embeddings.create(model=self.model, input=texts, encoding_format="base64")
+        else:
+            # Legacy API (pre-1.0.0)
+            response = openai.Embedding.create(model=self.model, input=texts)
+        return np.vstack([self._embedding_array(data) for data in response.data])
+    
+    def embed_documents_run(self, texts: List[str]) -> EmbeddingRun:
+        """Embed documents with the concurrent, rate-limited scheduler; failed rows are reported, not filled"""
+        if not self.use_new_api:
+            # Legacy API: one batch of 100 after another
+            vectors = [self._request_embeddings(texts[i:i+100]) for i in range(0, len(texts), 100)]
+            return EmbeddingRun(vectors=np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32))
+        if self.scheduler is None:
+            self.scheduler = EmbeddingScheduler(self.model, api_key=self.client.api_key, base_url=self.client.base_url)
+        run = self.scheduler.embed(texts)
+        print(
+            f"Embedded {len(texts) - len(run.failed)}/{len(texts)} documents in {run.seconds:.1f}s "
+            f"({run.requests} requests, {run.retries} retries)"
+        )
+        return run
+    
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of documents as a contiguous float32 (N, d) array"""
+        run = self.embed_documents_run(texts)
+        if run.failed:
+            # Placeholder vectors would silently poison the index
+            raise RuntimeError(f"Failed to embed {len(run.failed)} of {len(texts)} documents: {next(iter(run.failed.values()))}")
+        return np.ascontiguousarray(run.vectors, dtype=np.float32)
+    
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of documents using the OpenAI API"""
-        # Call OpenAI's embeddings endpoint
-        results = []
-        for i in range(0, len(texts), 100):  # Process in batches of 100
-            batch = texts[i:i+100]
-            try:
-                if self.use_new_api:
-                    # New API (v1.0.0+)
-                    response = self.client.embeddings.create(model=self.model, input=batch)
-                    results.extend([data.embedding for data in response.data])
-                else:
-                    # Legacy API (pre-1.0.0)
-                    response = openai.Embedding.create(model=self.model, input=batch)
-                    results.extend([data.embedding for data in response.data])
-            except Exception as e:
-                print(f"Error embedding documents: {e}")
-                # Return dummy embeddings if we can't get real ones
-                # This ensures the system doesn't crash
-                dim = 1536 if "3" not in self.model else 1536
-                results.extend([[1.0] * dim for _ in batch])
-        return results
+        return self.embed_documents_array(texts).tolist()
     
-    def embed_query(self, text: str) -> List[float]:
-        """Embed a query using the OpenAI API"""
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Embed a query as a float32 vector"""
+        # Repeat questions are served from the embedding cache
+        if self.cache is not None:
+            cached = self.cache.get(self.model_name, text)
+            if cached is not None:
+                return cached
+        
         try:
-            if self.use_new_api:
-                # New API (v1.0.0+)
-                response = self.client.embeddings.create(model=self.model, input=[text])
-                return response.data[0].embedding
-            else:
-                # Legacy API (pre-1.0.0)
-                response = openai.Embedding.create(model=self.model, input=[text])
-                return response.data[0].embedding
+            embedding = self._request_embeddings([text])[0]
         except Exception as e:
+            # A placeholder vector would match every other failed query (e.g. in the answer cache)
             print(f"Error embedding query: {e}")
-            # Return dummy embedding if we can't get a real one
-            dim = 1536 if "3" not in self.model else 1536
-            return [1.0] * dim
+            raise
+        
+        if self.cache is not None:
+            self.cache.put(self.model_name, text, embedding)
+        return embedding
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query using the OpenAI API"""
+        return self.embed_query_array(text).tolist()
+
+def plan_length_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[np.ndarray]:
+    """
+    Group row indices into batches of similar token length.
+    
+    Rows are sorted by length; a batch grows until its padded size (rows x
+    longest row) would exceed ``token_budget`` or it reaches
+    ``max_batch_size`` rows. A single row longer than the budget gets a batch
+    of its own.
+    
+    Returns:
+        Arrays of row indices, one per batch
+    """
+    batches = []
+    current = []
+    for row in np.argsort(np.asarray(lengths), kind='stable'):
+        # Sorted ascending, so this row is the longest of the grown batch
+        if current and ((len(current) + 1) * lengths[row] > token_budget or len(current) >= max_batch_size):
+            batches.append(np.array(current))
+            current = []
+        current.append(row)
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+_torch_threads_configured = False
+
+def configure_torch_threads(num_threads: int = EMBEDDING_TORCH_THREADS):
+    """Apply the configured torch intra-op thread count once per process."""
+    global _torch_threads_configured
+    if _torch_threads_configured or num_threads <= 0:
+        return
+    import torch
+    torch.set_num_threads(num_threads)
+    _torch_threads_configured = True
+    print(f"Using {num_threads} torch threads for embeddings")
 
 # Custom HuggingFace embeddings class to handle import issues
 class CustomHuggingFaceEmbeddings(Embeddings):
     """Custom implementation of HuggingFace embeddings to avoid import issues."""
     
+    model_name = "sentence-transformers/all-MiniLM-L6-v2"
+    
     def __init__(self):
+        self.cache = get_embedding_cache()
+        configure_torch_threads()
+        
         # Check if model is already in cache
         if "transformer_model" in _GLOBAL_MODEL_CACHE and "tokenizer" in _GLOBAL_MODEL_CACHE:
             print("Using cached transformer model")
@@ -165,21 +239,36 @@ class CustomHuggingFaceEmbeddings(Embeddings):
         input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
         return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
     
-    def embed_with_transformers(self, texts):
-        """Alternative embedding method using the transformers library directly"""
+    def embed_with_transformers(self, texts, token_budget=None, max_batch_size=None):
+        """
+        Alternative embedding method using the transformers library directly
+        
+        Texts are tokenized once, sorted by token length and grouped so that
+        each batch stays under a padded-token budget (batch size x longest
+        member) instead of a fixed item count. Similar lengths share a batch,
+        so little compute goes to padding. Rows come back in input order.
+        """
         import torch
         import torch.nn.functional as F
         
-        # Process in batches to avoid memory issues
-        max_batch_size = 32  # Adjust based on your available memory
-        results = []
+        if not texts:
+            return np.empty((0, 384), dtype=np.float32)
         
-        for i in range(0, len(texts), max_batch_size):
-            batch_texts = texts[i:i+max_batch_size]
-            
-            # Tokenize batch
-            encoded_input = self.tokenizer(batch_texts, padding=True, truncation=True, 
-                                          max_length=512, return_tensors='pt')
+        # Tokenize everything once, without padding, to learn the lengths
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=512)
+        lengths = [len(ids) for ids in encoded['input_ids']]
+        
+        results = None
+        for batch_rows in plan_length_batches(
+            lengths,
+            token_budget or EMBEDDING_TOKEN_BUDGET,
+            max_batch_size or EMBEDDING_MAX_BATCH_SIZE
+        ):
+            # Pad the batch to its own longest member only
+            encoded_input = self.tokenizer.pad(
+                {key: [encoded[key][row] for row in batch_rows] for key in encoded.keys()},
+                return_tensors='pt'
+            )
             
             # Compute token embeddings
             with torch.no_grad():
@@ -191,46 +280,60 @@ class CustomHuggingFaceEmbeddings(Embeddings):
             # Normalize embeddings
             embeddings = F.normalize(embeddings, p=2, dim=1)
             
-            # Add to results
-            results.append(embeddings.cpu().numpy())
+            # Scatter back to the input order
+            if results is None:
+                results = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            results[batch_rows] = embeddings.cpu().numpy()
         
-        # Combine all batches
-        if len(results) > 1:
-            return np.vstack(results)
-        elif len(results) == 1:
-            return results[0]
-        else:
-            return np.array([])
+        return results
     
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed a list of documents using SentenceTransformer"""
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed a list of documents as a contiguous float32 (N, 384) array"""
         try:
             if hasattr(self, 'use_alternative'):
                 # Use alternative embedding method
-                return self.embed_with_transformers(texts).tolist()
+                embeddings = self.embed_with_transformers(texts)
             else:
                 # Use standard SentenceTransformer
-                embeddings = self.model.encode(texts, normalize_embeddings=True)
-                return embeddings.tolist()
+                embeddings = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+            return np.ascontiguousarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
         except Exception as e:
             print(f"Error in embed_documents: {e}")
             # Return basic embeddings as fallback
-            return [[1.0] * 384 for _ in texts]
+            return np.ones((len(texts), 384), dtype=np.float32)
     
-    def embed_query(self, text: str) -> List[float]:
-        """Embed a query using SentenceTransformer"""
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of documents using SentenceTransformer"""
+        return self.embed_documents_array(texts).tolist()
+    
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Embed a query as a float32 vector of shape (384,)"""
+        # Repeat questions are served from the embedding cache
+        if self.cache is not None:
+            cached = self.cache.get(self.model_name, text)
+            if cached is not None:
+                return cached
+        
         try:
             if hasattr(self, 'use_alternative'):
                 # Use alternative embedding method
-                return self.embed_with_transformers([text])[0].tolist()
+                embedding = self.embed_with_transformers([text])[0]
             else:
                 # Use standard SentenceTransformer
-                embedding = self.model.encode(text, normalize_embeddings=True)
-                return embedding.tolist()
+                embedding = self.model.encode(text, normalize_embeddings=True, convert_to_numpy=True)
         except Exception as e:
+            # A placeholder vector would match every other failed query (e.g. in the answer cache)
             print(f"Error in embed_query: {e}")
-            # Return basic embedding as fallback
-            return [1.0] * 384
+            raise
+        
+        embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+        if self.cache is not None:
+            self.cache.put(self.model_name, text, embedding)
+        return embedding
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query using SentenceTransformer"""
+        return self.embed_query_array(text).tolist()
 
 def get_embedding_model(model_type: str = "openai"):
     """
@@ -273,7 +376,9 @@ def get_embeddings_model(model_type: str = "openai"):
 def create_vector_store(documents: List[Dict[str, Any]], 
                         persist_directory: str,
                         embedding_model_type: str = "openai",
-                        fallback: bool = False):
+                        fallback: bool = False,
+                        full_rebuild: bool = False,
+                        index_factory: str = FAISS_INDEX_FACTORY):
     """
     Create and persist a vector store from documents
     
@@ -282,6 +387,10 @@ def create_vector_store(documents: List[Dict[str, Any]],
         persist_directory: Directory to persist the vector store
         embedding_model_type: Type of embedding model to use
         fallback: If True, use a more compatible but potentially slower embedding model
+        full_rebuild: If True, re-embed every chunk instead of reusing the
+            vectors of unchanged chunks from the previous build
+        index_factory: FAISS factory string of the index type to build
+            (e.g. "Flat", "HNSW32", "IVF{nlist},SQ8")
     """
     # Make sure directory exists
     os.makedirs(os.path.dirname(persist_directory), exist_ok=True)
@@ -316,32 +425,17 @@ def create_vector_store(documents: List[Dict[str, Any]],
             print(f"Initializing embedding model: {embedding_model_type}")
             embedding_model = get_embedding_model(embedding_model_type)
         
-        # Process in smaller batches to avoid memory issues
+        # Only new or changed chunks are embedded; the rest reuse the vectors
+        # recorded by the previous build
         print(f"Creating FAISS vector store with {len(texts)} documents...")
-        batch_size = 500  # Smaller batches to avoid memory issues
-        
-        # Create FAISS index with first batch
-        first_batch_end = min(batch_size, len(texts))
-        print(f"Processing initial batch (0 to {first_batch_end})")
-        vector_store = FAISS.from_texts(
-            texts=texts[:first_batch_end],
-            embedding=embedding_model,
-            metadatas=metadatas[:first_batch_end]
+        vector_store, _ = build_incremental_index(
+            documents,
+            index_path,
+            embedding_model,
+            batch_size=500,  # Smaller batches to avoid memory issues
+            full_rebuild=full_rebuild,
+            index_factory=index_factory
         )
-        
-        # Add remaining documents in batches
-        for i in range(batch_size, len(texts), batch_size):
-            end_idx = min(i + batch_size, len(texts))
-            print(f"Processing batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1} ({i} to {end_idx})")
-            batch_texts = texts[i:end_idx]
-            batch_metadatas = metadatas[i:end_idx]
-            
-            # Add batch to vector store
-            vector_store.add_texts(batch_texts, metadatas=batch_metadatas)
-        
-        # Save to disk
-        print(f"Saving FAISS index to {index_path}")
-        vector_store.save_local(index_path)
         print(f"Vector store created with {len(texts)} documents and saved to {index_path}")
         return vector_store
         
@@ -362,7 +456,7 @@ def create_vector_store(documents: List[Dict[str, Any]],
             def embed_query(self, text):
                 return [1.0] * 384
         
-        vector_store = FAISS.from_texts(
+        vector_store = PrefilteredFAISS.from_texts(
             texts=texts,
             embedding=BasicEmbeddings(),
             metadatas=metadatas
@@ -370,6 +464,7 @@ def create_vector_store(documents: List[Dict[str, Any]],
         
         # Save to disk
         vector_store.save_local(index_path)
+        convert_langchain_index(index_path)
         print(f"Minimal vector store created with {len(texts)} documents and saved to {index_path}")
         return vector_store
 
@@ -387,7 +482,7 @@ def load_vector_store(persist_directory: str, embedding_model_type: str = "opena
         # Check if index exists
         if os.path.exists(index_path):
             print(f"Loading FAISS index from {index_path}")
-            vector_store = FAISS.load_local(
+            vector_store = PrefilteredFAISS.load_local(
                 index_path,
                 embedding_model,
             )
@@ -404,7 +499,7 @@ def load_vector_store(persist_directory: str, embedding_model_type: str = "opena
             
             index_path = os.path.join(persist_directory, "faiss_index")
             if os.path.exists(index_path):
-                vector_store = FAISS.load_local(
+                vector_store = PrefilteredFAISS.load_local(
                     index_path,
                     embedding_model,
                 )
@@ -424,7 +519,7 @@ def load_vector_store(persist_directory: str, embedding_model_type: str = "opena
             
             index_path = os.path.join(persist_directory, "faiss_index")
             if os.path.exists(index_path):
-                vector_store = FAISS.load_local(
+                vector_store = PrefilteredFAISS.load_local(
                     index_path,
                     BasicEmbeddings(),
                 )
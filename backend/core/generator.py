@@ -1,6 +1,8 @@
 # backend/core/generator.py
 import os
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from langchain.chains import LLMChain
 from langchain.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain.schema import Document
@@ -11,6 +13,8 @@ from dotenv import load_dotenv
 from backend.core.retriever import retrieve_relevant_context, format_context_from_docs
 from backend.core.llm_client import get_chat_model, UnifiedLLMChat
 from backend.core.direct_openai import generate_answer_with_openai
+from backend.core.config import GENERATOR_REGISTRY_SIZE
+from backend.core.metrics import GENERATOR_CHAINS_TOTAL
 
 load_dotenv()
 
@@ -53,9 +57,90 @@ def create_answer_generator(model_name="gpt-3.5-turbo", temperature=0, max_token
     prompt = create_quran_rag_prompt()
     return prompt | llm
 
-def generate_answer(generator, context: str, question: str) -> str:
+class GeneratorRegistry:
+    """
+    Ready answer chains keyed by ``(model_name, temperature, max_tokens)``.
+
+    Chains are stateless once built, so callers with different parameters
+    share them instead of rebuilding the prompt, chat model and client on
+    every change. The least recently used chain is dropped beyond
+    ``max_size`` keys. Lookups are counted in
+    ``quran_rag_generator_chains_total``.
+
+    A chain is built outside the registry lock, so a slow first build for
+    one key does not hold up lookups of the others; concurrent requests for
+    the same new key wait on that key's build instead of repeating it.
+    """
+
+    def __init__(self, max_size: int = GENERATOR_REGISTRY_SIZE):
+        self.max_size = max_size
+        self._chains: "OrderedDict[Tuple[str, float, int], Any]" = OrderedDict()
+        self._building: Dict[Tuple[str, float, int], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Tuple[str, float, int]):
+        """The chain for ``key`` marked as most recently used, or None; call with the lock held."""
+        chain = self._chains.get(key)
+        if chain is not None:
+            self._chains.move_to_end(key)
+            GENERATOR_CHAINS_TOTAL.inc(result="hit")
+        return chain
+
+    def get(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0, max_tokens: int = 1000):
+        """The shared chain for these parameters, built on first use."""
+        key = (model_name, float(temperature), int(max_tokens))
+        with self._lock:
+            chain = self._lookup(key)
+            if chain is not None:
+                return chain
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Built by another caller while this one waited
+                chain = self._lookup(key)
+                if chain is not None:
+                    return chain
+            try:
+                chain = create_answer_generator(model_name=key[0], temperature=key[1], max_tokens=key[2])
+                GENERATOR_CHAINS_TOTAL.inc(result="build")
+                with self._lock:
+                    self._chains[key] = chain
+                    if len(self._chains) > self.max_size:
+                        self._chains.popitem(last=False)
+                        GENERATOR_CHAINS_TOTAL.inc(result="evict")
+                return chain
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._chains)
+
+
+_generator_registry: Optional[GeneratorRegistry] = None
+_generator_registry_lock = threading.Lock()
+
+
+def get_generator_registry() -> GeneratorRegistry:
+    """The process-wide generator chain registry."""
+    global _generator_registry
+    with _generator_registry_lock:
+        if _generator_registry is None:
+            _generator_registry = GeneratorRegistry()
+        return _generator_registry
+
+
+def get_answer_generator(model_name: str = "gpt-3.5-turbo", temperature: float = 0, max_tokens: int = 1000):
+    """Shared answer chain for these parameters (see :class:`GeneratorRegistry`)."""
+    return get_generator_registry().get(model_name, temperature, max_tokens)
+
+def generate_answer(generator, context: str, question: str, raise_errors: bool = False) -> str:
     """
     Generate an answer based on the context and question
+
+    Failures are returned as an apology message, or raised with
+    ``raise_errors`` so that callers caching answers can tell them apart.
     """
     try:
         print(f"Generating answer for question: {question[:50]}...")
@@ -106,6 +191,8 @@ def generate_answer(generator, context: str, question: str) -> str:
     except Exception as e:
         error_msg = f"Error generating answer: {str(e)}"
         print(error_msg)
+        if raise_errors:
+            raise
         return "I encountered an error processing your query. Please try again or rephrase your question."
 
 def process_query(retriever, generator, query: str, filters: Dict = None):
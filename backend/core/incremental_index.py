@@ -0,0 +1,223 @@
+# backend/core/incremental_index.py
+"""
+Incremental, content-hashed vector index builds.
+
+Every build writes a manifest next to the FAISS index recording the
+embedding model and the content hash of each chunk, plus the chunk vectors
+themselves (``vectors.npy``, one row per manifest entry). The next build
+hashes the current chunks, reuses the stored vector of every chunk whose
+content and model are unchanged, embeds only new or changed chunks, and
+leaves removed chunks out. Adding one tafsir edition therefore costs one
+edition's worth of embedding instead of a full rebuild.
+
+Chunks that could not be embedded (e.g. OpenAI requests that kept failing
+after their retries) are left out of the index and listed under ``failed`` in
+the manifest; having no stored vector, they are embedded again on the next
+build.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.ann_index import describe_index
+from backend.core.config import FAISS_INDEX_FACTORY, SENTENCE_INDEX_ENABLED
+from backend.core.docstore import convert_langchain_index
+from backend.core.vector_search import PrefilteredFAISS, embed_documents_array
+
+MANIFEST_FILENAME = "build_manifest.json"
+VECTORS_FILENAME = "vectors.npy"
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text that gets embedded."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embedding_model_id(embedding_model) -> str:
+    """Identifier recorded in the manifest; vectors are only reused for the same model."""
+    return getattr(embedding_model, "model_name", None) or type(embedding_model).__name__
+
+
+def load_manifest(index_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[np.ndarray]]:
+    """Return the previous build's manifest and vectors, or ``(None, None)``."""
+    manifest_path = os.path.join(index_path, MANIFEST_FILENAME)
+    vectors_path = os.path.join(index_path, VECTORS_FILENAME)
+    if not (os.path.exists(manifest_path) and os.path.exists(vectors_path)):
+        return None, None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        print(f"Warning: Ignoring unreadable build manifest in {index_path}: {e}")
+        return None, None
+    if manifest.get("version") != MANIFEST_VERSION or len(manifest.get("hashes", [])) != len(vectors):
+        print(f"Warning: Ignoring incompatible build manifest in {index_path}")
+        return None, None
+    return manifest, vectors
+
+
+def write_manifest(
+    index_path: str,
+    model_id: str,
+    hashes: List[str],
+    vectors: np.ndarray,
+    failed: Optional[Dict[str, str]] = None
+) -> None:
+    """Persist the chunk hashes and vectors of a build, plus the hashes that failed to embed."""
+    os.makedirs(index_path, exist_ok=True)
+    np.save(os.path.join(index_path, VECTORS_FILENAME), vectors)
+    with open(os.path.join(index_path, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "embedding_model": model_id,
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "count": len(hashes),
+            "hashes": hashes,
+            "failed": failed or {}
+        }, f)
+
+
+def embed_texts(embedding_model, texts: List[str],
+                batch_size: int = 500) -> Tuple[Dict[int, np.ndarray], Dict[int, str]]:
+    """
+    Embed ``texts`` for an index build.
+
+    Returns:
+        The vector of each embedded row and the error of each row that could
+        not be embedded (only the OpenAI scheduler reports those; other models
+        raise)
+    """
+    vectors: Dict[int, np.ndarray] = {}
+    failed: Dict[int, str] = {}
+    if texts and hasattr(embedding_model, "embed_documents_run"):
+        # The OpenAI scheduler batches and parallelizes on its own and reports failed rows
+        run = embedding_model.embed_documents_run(texts)
+        for row in range(len(texts)):
+            if row in run.failed:
+                failed[row] = run.failed[row]
+            else:
+                vectors[row] = run.vectors[row]
+    else:
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            print(f"Embedding changed texts {i} to {i + len(batch)} of {len(texts)}")
+            for row, vector in enumerate(embed_documents_array(embedding_model, batch), start=i):
+                vectors[row] = vector  # Row view, no copy
+    return vectors, failed
+
+
+def build_incremental_index(
+    documents: List[Dict[str, Any]],
+    index_path: str,
+    embedding_model,
+    batch_size: int = 500,
+    full_rebuild: bool = False,
+    index_factory: str = FAISS_INDEX_FACTORY,
+    sentence_index: bool = SENTENCE_INDEX_ENABLED
+) -> Tuple[PrefilteredFAISS, Dict[str, Any]]:
+    """
+    Build the FAISS index for ``documents``, embedding only what changed.
+
+    Args:
+        documents: ``{'content', 'metadata'}`` chunks in index order
+        index_path: Directory of the FAISS index (manifest and vectors live there too)
+        embedding_model: LangChain embeddings used for new or changed chunks
+        batch_size: Number of texts per ``embed_documents`` call
+        full_rebuild: Ignore the previous manifest and embed everything
+        index_factory: FAISS index type (see ``backend.core.ann_index``)
+        sentence_index: Also embed the sentences of every chunk for context
+            compression (see ``backend.core.sentence_index``)
+
+    Returns:
+        The saved vector store and build statistics (reused / embedded /
+        failed / removed chunk counts and timings)
+    """
+    start_time = time.time()
+    model_id = embedding_model_id(embedding_model)
+    texts = [doc['content'] for doc in documents]
+    metadatas = [doc['metadata'] for doc in documents]
+    hashes = [content_hash(text) for text in texts]
+
+    # Vectors of the previous build, by content hash
+    previous_rows: Dict[str, int] = {}
+    manifest, previous_vectors = (None, None) if full_rebuild else load_manifest(index_path)
+    if manifest is not None and manifest.get("embedding_model") == model_id:
+        previous_rows = {chunk_hash: row for row, chunk_hash in enumerate(manifest["hashes"])}
+    elif manifest is not None:
+        print(f"Embedding model changed ({manifest.get('embedding_model')} -> {model_id}), re-embedding everything")
+
+    # Embed each new or changed text once, even if it appears in several chunks
+    missing: Dict[str, str] = {}
+    for chunk_hash, text in zip(hashes, texts):
+        if chunk_hash not in previous_rows and chunk_hash not in missing:
+            missing[chunk_hash] = text
+    missing_hashes = list(missing)
+    missing_texts = list(missing.values())
+
+    embed_start = time.time()
+    vectors_by_row, failed_by_row = embed_texts(embedding_model, missing_texts, batch_size)
+    new_vectors: Dict[str, np.ndarray] = {missing_hashes[row]: vector for row, vector in vectors_by_row.items()}
+    failed: Dict[str, str] = {missing_hashes[row]: error for row, error in failed_by_row.items()}
+    embed_seconds = time.time() - embed_start
+
+    if failed:
+        print(f"Warning: {len(failed)} chunks could not be embedded; they are left out and retried on the next build")
+        kept = [row for row, chunk_hash in enumerate(hashes) if chunk_hash not in failed]
+        texts = [texts[row] for row in kept]
+        metadatas = [metadatas[row] for row in kept]
+        hashes = [hashes[row] for row in kept]
+
+    # Assemble the vectors in document order
+    dim = None
+    if new_vectors:
+        dim = len(next(iter(new_vectors.values())))
+    elif previous_rows:
+        dim = previous_vectors.shape[1]
+    vectors = np.empty((len(texts), dim or 0), dtype=np.float32)
+    for row, chunk_hash in enumerate(hashes):
+        if chunk_hash in new_vectors:
+            vectors[row] = new_vectors[chunk_hash]
+        else:
+            vectors[row] = previous_vectors[previous_rows[chunk_hash]]
+    previous_vectors = None  # Release the memory map before vectors.npy is rewritten
+
+    # Loading (or training on) the stored vectors is cheap next to embedding
+    # them, so switching the index type does not re-embed anything
+    vector_store = PrefilteredFAISS.from_arrays(texts, vectors, embedding_model, metadatas, index_factory=index_factory)
+    vector_store.save_local(index_path)
+    convert_langchain_index(index_path)
+    write_manifest(index_path, model_id, hashes, vectors, failed)
+    from backend.core.context_packing import write_token_counts
+    token_counts = write_token_counts(index_path, texts)
+    sentence_stats = None
+    if sentence_index:
+        from backend.core.sentence_index import build_sentence_index
+        sentence_stats = build_sentence_index(texts, index_path, embedding_model, batch_size, full_rebuild,
+                                              chunk_vectors=vectors)
+
+    reused = sum(1 for chunk_hash in hashes if chunk_hash in previous_rows)
+    kept_hashes = set(hashes)
+    stats = {
+        "embedding_model": model_id,
+        "index": describe_index(vector_store.index),
+        "chunks": len(texts),
+        "reused": reused,
+        "embedded": len(missing) - len(failed),
+        "failed": len(failed),
+        "removed": sum(1 for chunk_hash in previous_rows if chunk_hash not in kept_hashes),
+        "embed_seconds": embed_seconds,
+        "sentences": sentence_stats,
+        "tokens": int(token_counts.sum()),
+        "total_seconds": time.time() - start_time
+    }
+    print(
+        f"Index build: {stats['reused']} chunks reused, {stats['embedded']} embedded, "
+        f"{stats['removed']} removed, {stats['failed']} failed in {stats['total_seconds']:.1f}s"
+    )
+    return vector_store, stats
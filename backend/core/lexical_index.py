@@ -0,0 +1,233 @@
+# backend/core/lexical_index.py
+"""
+BM25 keyword retrieval over the docstore with Arabic-aware tokens.
+
+Verse and tafsir texts are normalized before tokenizing: diacritics,
+Quranic annotation marks and tatweel are removed, alef / ya / ta marbuta
+variants are unified and a leading definite article (with its attached
+conjunction or preposition) is stripped, so ``الرَّحْمَـٰنِ`` and ``رحمن``
+meet on the same token.
+
+The postings are precomputed once into CSR arrays (``indptr`` per term,
+``doc_ids`` and final BM25 ``weights`` per posting) and cached next to the
+docstore in ``bm25.npz``. A query gathers the postings of its terms and sums
+them with one ``bincount``, so its cost grows with the postings touched
+rather than with corpus size x query terms. :func:`reciprocal_rank_fusion`
+merges the keyword ranking with the FAISS ranking.
+"""
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.config import BM25_B, BM25_K1, RRF_K
+
+LEXICAL_INDEX_FILENAME = "bm25.npz"
+LEXICAL_INDEX_FORMAT_VERSION = 1
+
+# Tashkeel, Quranic annotation marks and tatweel
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_LETTER_FORMS = str.maketrans("\u0623\u0625\u0622\u0671\u0649\u0629\u0624\u0626", "\u0627\u0627\u0627\u0627\u064a\u0647\u0648\u064a")
+_WORD = re.compile(r"\w+")
+# Definite article, alone or after wa- / fa- / bi- / ka- / li-; longest first
+_ARTICLE_PREFIXES = ("وال", "فال", "بال", "كال",
+                     "ال", "لل")
+# Words whose leading alef-lam is part of the word
+_KEEP_ARTICLE = {"الله", "اللهم", "الذي",
+                 "الذين", "التي"}
+
+
+def normalize_arabic(text: str) -> str:
+    """Lower-case, strip Arabic diacritics and unify letter variants."""
+    return _DIACRITICS.sub("", text).translate(_LETTER_FORMS).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized tokens of a text, with the Arabic definite article removed."""
+    tokens = []
+    for word in _WORD.findall(normalize_arabic(text)):
+        if word not in _KEEP_ARTICLE:
+            for prefix in _ARTICLE_PREFIXES:
+                if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+                    word = word[len(prefix):]
+                    break
+        tokens.append(word)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = RRF_K,
+                           limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge ranked row-id lists by reciprocal rank fusion.
+
+    Each row scores ``sum(1 / (k + rank))`` over the rankings it appears in
+    (ranks start at 1).
+
+    Args:
+        rankings: Row ids per ranking, best first
+        k: Rank offset damping the weight of the top ranks
+        limit: Number of fused rows to return (all by default)
+
+    Returns:
+        ``(rows, scores)`` ordered by decreasing score, ties by row id
+    """
+    rankings = [np.asarray(ranking, dtype=np.int64) for ranking in rankings]
+    rows = np.concatenate(rankings) if rankings else np.empty(0, dtype=np.int64)
+    if len(rows) == 0:
+        return rows, np.empty(0, dtype=np.float64)
+    ranks = np.concatenate([np.arange(1, len(ranking) + 1) for ranking in rankings])
+    unique_rows, positions = np.unique(rows, return_inverse=True)
+    scores = np.bincount(positions, weights=1.0 / (k + ranks))
+    order = np.lexsort((unique_rows, -scores))[:limit]
+    return unique_rows[order], scores[order]
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25 posting weights."""
+
+    def __init__(self, vocabulary: Dict[str, int], indptr: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, num_docs: int):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        """Tokenize ``texts`` (one per docstore row) and precompute the postings."""
+        vocabulary: Dict[str, int] = {}
+        terms: List[int] = []
+        docs: List[int] = []
+        frequencies: List[int] = []
+        lengths: List[int] = []
+
+        for row, text in enumerate(texts):
+            counts: Dict[int, int] = {}
+            tokens = tokenize(text or "")
+            for token in tokens:
+                term = vocabulary.setdefault(token, len(vocabulary))
+                counts[term] = counts.get(term, 0) + 1
+            terms.extend(counts)
+            frequencies.extend(counts.values())
+            docs.extend([row] * len(counts))
+            lengths.append(len(tokens))
+
+        num_docs = len(lengths)
+        terms = np.asarray(terms, dtype=np.int64)
+        docs = np.asarray(docs, dtype=np.int32)
+        tf = np.asarray(frequencies, dtype=np.float32)
+        doc_lengths = np.asarray(lengths, dtype=np.float32)
+
+        # Group the postings by term, keeping row order within each term
+        order = np.argsort(terms, kind="stable")
+        terms, docs, tf = terms[order], docs[order], tf[order]
+        df = np.bincount(terms, minlength=len(vocabulary))
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(df, out=indptr[1:])
+
+        idf = np.log1p((num_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        average_length = doc_lengths.mean() if num_docs else 0.0
+        length_norm = k1 * (1 - b + b * doc_lengths / max(average_length, 1e-9))
+        weights = idf[terms] * tf * (k1 + 1) / (tf + length_norm[docs])
+
+        return cls(vocabulary, indptr, docs, weights.astype(np.float32), num_docs)
+
+    def search(self, query: str, k: int = 15, row_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rank documents for a query by BM25.
+
+        Args:
+            query: Question text
+            k: Number of rows to return
+            row_ids: Optional candidate rows (see ``MetadataIndex.rows_for``)
+
+        Returns:
+            ``(rows, scores)`` ordered by decreasing score; only rows matching
+            at least one query term are returned
+        """
+        terms = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not terms:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        docs = np.concatenate([self.doc_ids[self.indptr[term]:self.indptr[term + 1]] for term in terms])
+        weights = np.concatenate([self.weights[self.indptr[term]:self.indptr[term + 1]] for term in terms])
+        rows, positions = np.unique(docs, return_inverse=True)
+        scores = np.bincount(positions, weights=weights)
+
+        if row_ids is not None:
+            keep = np.isin(rows, row_ids)
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.lexsort((rows, -scores))
+        return rows[order].astype(np.int64), scores[order].astype(np.float32)
+
+    def save(self, path: str, fingerprint: Sequence[float] = ()) -> str:
+        """Write the postings to an ``.npz`` file, stamped with ``fingerprint``."""
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(
+            path,
+            version=LEXICAL_INDEX_FORMAT_VERSION,
+            fingerprint=np.asarray(fingerprint, dtype=np.float64),
+            terms=np.asarray(terms, dtype=str),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            num_docs=self.num_docs
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["BM25Index", np.ndarray]:
+        """Read an index written by :meth:`save`; returns it with its fingerprint."""
+        with np.load(path) as data:
+            if int(data["version"]) != LEXICAL_INDEX_FORMAT_VERSION:
+                raise ValueError(f"Unsupported lexical index version in {path}")
+            vocabulary = {term: i for i, term in enumerate(data["terms"].tolist())}
+            index = cls(vocabulary, data["indptr"], data["doc_ids"], data["weights"], int(data["num_docs"]))
+            return index, data["fingerprint"]
+
+
+def _docstore_fingerprint(docstore, k1: float, b: float) -> List[float]:
+    # Any rewrite of the docstore changes the size or mtime of its text file
+    text_stat = os.stat(os.path.join(docstore.path, "text.bin"))
+    return [float(len(docstore)), float(text_stat.st_size), text_stat.st_mtime, k1, b]
+
+
+def load_lexical_index(docstore, build_if_missing: bool = True, k1: float = BM25_K1,
+                       b: float = BM25_B) -> BM25Index:
+    """
+    Open the BM25 index cached in the docstore directory, building it when it
+    is missing or the docstore (or ``k1`` / ``b``) changed since it was written.
+
+    Args:
+        docstore: The :class:`~backend.core.docstore.MmapDocStore` to index
+        build_if_missing: Build and cache the index instead of raising when needed
+
+    Returns:
+        The BM25 index, row-aligned with the docstore
+    """
+    path = os.path.join(docstore.path, LEXICAL_INDEX_FILENAME)
+    fingerprint = _docstore_fingerprint(docstore, k1, b)
+    if os.path.exists(path):
+        try:
+            index, stored = BM25Index.load(path)
+            if stored.tolist() == fingerprint:
+                return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring unreadable lexical index {path}: {e}")
+    if not build_if_missing:
+        raise FileNotFoundError(f"No up-to-date lexical index at {path}")
+
+    index = BM25Index.build((docstore.text(row) for row in range(len(docstore))), k1=k1, b=b)
+    try:
+        index.save(path, fingerprint)
+    except OSError as e:
+        print(f"Warning: could not cache lexical index at {path}: {e}")
+    return index
@@ -2,15 +2,16 @@
 LLM client module to ensure consistent API access across the application.
 """
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator
 import openai
 import httpx
 from dotenv import load_dotenv
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
-from langchain_core.outputs import LLMResult, Generation
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, AIMessageChunk, SystemMessage
+from langchain_core.outputs import LLMResult, Generation, ChatGenerationChunk
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
 from backend.core.api_key_manager import load_api_key
+from backend.core.client_registry import get_client_registry
 
 load_dotenv()
 
@@ -27,12 +28,8 @@ class OpenAIClient:
                 raise ValueError("OPENAI_API_KEY is not available")
             
             try:
-                # Initialize with default client
-                cls._client = openai.OpenAI(
-                    api_key=api_key,
-                    timeout=30.0,  # Add timeout
-                    max_retries=3  # Add retries
-                )
+                # Shared pooled client from the process-wide registry
+                cls._client = get_client_registry().sync_client(api_key)
             except Exception as e:
                 print(f"Warning: Could not create OpenAI client: {e}")
                 print("Falling back to legacy client initialization")
@@ -49,6 +46,11 @@ class OpenAIClient:
     def client(self):
         return self._client
 
+    @property
+    def async_client(self):
+        """Shared async client for the same API key"""
+        return get_client_registry().async_client()
+
     def is_legacy_client(self):
         return not hasattr(self._client, 'chat')
 
@@ -157,6 +159,72 @@ class UnifiedLLMChat(BaseChatModel):
             )
             return LLMResult(generations=[[generation]])
     
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream tokens from the OpenAI API as they arrive."""
+        if not self.openai_client:
+            raise ValueError("OpenAI client not initialized")
+
+        stream = self.openai_client.client.chat.completions.create(
+            model=self.model_name,
+            messages=self._convert_messages_to_openai_format(messages),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stop=stop,
+            stream=True
+        )
+        for chunk in stream:
+            generation_chunk = self._to_generation_chunk(chunk)
+            if generation_chunk is None:
+                continue
+            if run_manager:
+                run_manager.on_llm_new_token(generation_chunk.text, chunk=generation_chunk)
+            yield generation_chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Async version of ``_stream`` using the shared async client."""
+        if not self.openai_client:
+            raise ValueError("OpenAI client not initialized")
+
+        stream = await self.openai_client.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=self._convert_messages_to_openai_format(messages),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stop=stop,
+            stream=True
+        )
+        async for chunk in stream:
+            generation_chunk = self._to_generation_chunk(chunk)
+            if generation_chunk is None:
+                continue
+            if run_manager:
+                await run_manager.on_llm_new_token(generation_chunk.text, chunk=generation_chunk)
+            yield generation_chunk
+
+    @staticmethod
+    def _to_generation_chunk(chunk) -> Optional[ChatGenerationChunk]:
+        """Convert an OpenAI stream chunk, skipping empty keep-alive deltas."""
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        content = choice.delta.content or ""
+        if not content and not choice.finish_reason:
+            return None
+        generation_info = {"finish_reason": choice.finish_reason} if choice.finish_reason else None
+        return ChatGenerationChunk(message=AIMessageChunk(content=content), generation_info=generation_info)
+
     def _llm_type(self) -> str:
         return "unified_openai_chat"
         
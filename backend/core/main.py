@@ -5,13 +5,17 @@ from backend.core.embeddings import create_vector_store, load_vector_store, get_
 from backend.core.retriever import create_enhanced_retriever
 from backend.core.generator import create_answer_generator, process_query
 
-def initialize_data_and_models(rebuild_vector_db=False, sample_size=None):
+def initialize_data_and_models(rebuild_vector_db=False, sample_size=None, full_rebuild=False, index_factory=None):
     """
     Initialize the RAG components
     
     Args:
-        rebuild_vector_db (bool): Whether to rebuild the vector DB
+        rebuild_vector_db (bool): Whether to rebuild the vector DB. Only new or
+            changed chunks are embedded; unchanged ones reuse stored vectors
         sample_size (int, optional): If set, only use a sample of documents for testing
+        full_rebuild (bool): Re-embed every chunk when rebuilding
+        index_factory (str, optional): FAISS index type to build (defaults to
+            config.FAISS_INDEX_FACTORY)
     """
     # Create directories if they don't exist
     os.makedirs(config.VECTOR_DB_PATH, exist_ok=True)
@@ -54,7 +58,9 @@ def initialize_data_and_models(rebuild_vector_db=False, sample_size=None):
             vector_store = create_vector_store(
                 chunked_docs, 
                 config.VECTOR_DB_PATH,
-                "huggingface"
+                "huggingface",
+                full_rebuild=full_rebuild,
+                index_factory=index_factory or config.FAISS_INDEX_FACTORY
             )
         else:
             print("Loading existing vector database...")
@@ -126,6 +132,22 @@ def quran_rag_query(question, surah_filter=None, verse_filter=None):
         return "I encountered an error processing your query. Please check the system logs or try again later."
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build the vector database and/or run an example query")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rebuild the vector database, embedding only new or changed chunks")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="Rebuild the vector database re-embedding every chunk")
+    parser.add_argument("--index-factory",
+                        help="FAISS index type to build, e.g. Flat, HNSW32 or 'IVF{nlist},SQ8' "
+                             "(reuses stored vectors; see python -m backend.benchmarks.ann_index)")
+    args = parser.parse_args()
+    
+    if args.rebuild or args.full_rebuild or args.index_factory:
+        initialize_data_and_models(rebuild_vector_db=True, full_rebuild=args.full_rebuild,
+                                   index_factory=args.index_factory)
+    
     # Example usage
     question = "What does the Quran say about patience?"
     answer = quran_rag_query(question)
@@ -0,0 +1,277 @@
+# backend/core/metrics.py
+"""
+Latency histograms and counters in the Prometheus text format.
+
+A small in-process registry (no ``prometheus_client`` dependency) holds the
+pipeline metrics; ``GET /metrics`` serves ``REGISTRY.render()``. Stages are
+timed with :func:`stage_timer`, which also records the duration for the
+``Server-Timing`` header of the current request when
+:class:`ServerTimingMiddleware` wraps the app. The per-request collector
+lives in a context variable, so stages that run on the blocking thread pool
+(``run_blocking`` copies the context) are reported too.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (+Inf last)], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[position] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of the process, rendered together for ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "quran_rag_stage_seconds",
+    "Duration of answer pipeline stages (embedding, faiss_search, docstore, context_format, llm_first_token, ...)",
+    ["stage"]
+)
+FALLBACK_TOTAL = REGISTRY.counter(
+    "quran_rag_fallback_total",
+    "Requests served by a fallback path (langchain_generator, keyword_retrieval, generation_error)",
+    ["path"]
+)
+ORCHESTRATOR_STEP_SECONDS = REGISTRY.histogram(
+    "quran_rag_orchestrator_step_seconds",
+    "Duration of A2AOrchestrator.process_query steps",
+    ["step"]
+)
+ORCHESTRATOR_STEP_FAILURES_TOTAL = REGISTRY.counter(
+    "quran_rag_orchestrator_step_failures_total",
+    "A2AOrchestrator context steps left out of the answer (reason: timeout, error)",
+    ["step", "reason"]
+)
+SINGLEFLIGHT_TOTAL = REGISTRY.counter(
+    "quran_rag_singleflight_total",
+    "Requests that started a computation (leader) or joined an identical one in flight (coalesced)",
+    ["name", "result"]
+)
+GENERATOR_CHAINS_TOTAL = REGISTRY.counter(
+    "quran_rag_generator_chains_total",
+    "Generator chain registry lookups by result (hit, build, evict)",
+    ["result"]
+)
+MCP_TOOL_SECONDS = REGISTRY.histogram(
+    "quran_rag_mcp_tool_seconds",
+    "Duration of MCP tool executions",
+    ["server", "tool", "status"]
+)
+
+
+class ServerTiming:
+    """Stage durations of one request, summed per stage, for the ``Server-Timing`` header."""
+
+    def __init__(self):
+        self._durations: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+
+    def items(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._durations.items())
+
+    def header(self) -> str:
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.items())
+
+
+_server_timing: ContextVar[Optional[ServerTiming]] = ContextVar("server_timing", default=None)
+
+
+def current_server_timing() -> Optional[ServerTiming]:
+    return _server_timing.get()
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration measured by the caller."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timing = _server_timing.get()
+    if timing is not None:
+        timing.add(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the ``with`` block as a pipeline stage (histogram and Server-Timing)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def step_timer(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Time the ``with`` block into ``histogram`` (no Server-Timing entry)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects the stage timings of each HTTP request and
+    sends them as a ``Server-Timing`` header (plus a ``total`` entry).
+
+    For streamed responses only the stages finished before the first byte
+    are included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = ServerTiming()
+        token = _server_timing.set(timing)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing.add("total", time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _server_timing.reset(token)
@@ -0,0 +1,87 @@
+# backend/core/reference_index.py
+"""
+Exact (surah, verse) lookups over the Quran text and every loaded tafsir.
+
+When a request names both a surah and a verse there is nothing to search
+for: the context is the verse itself plus its tafsir explanations. This index
+maps each reference to its document rows once at startup so those requests
+skip the embedding model and the vector search entirely.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import QURAN_DATA_PATH, TAFSIR_DIR_PATH
+from backend.core.data_processing import load_quran_data, load_tafsir_data
+
+
+class ReferenceIndex:
+    """In-memory map from (surah, verse) to the documents that cover it."""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        """
+        Args:
+            documents: ``{'content', 'metadata'}`` dictionaries as produced by
+                ``load_quran_data`` / ``load_tafsir_data``
+        """
+        self.documents = documents
+        self._rows: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+        for row, doc in enumerate(documents):
+            metadata = doc['metadata']
+            if 'surah_num' in metadata and 'verse_num' in metadata:
+                self._rows[(int(metadata['surah_num']), int(metadata['verse_num']))].append(row)
+
+        # Quran text first, then tafsirs in load order
+        for rows in self._rows.values():
+            rows.sort(key=lambda row: documents[row]['metadata'].get('source') != 'quran')
+
+        self.sources = sorted({doc['metadata'].get('source', 'unknown') for doc in documents})
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, reference: Tuple[int, int]) -> bool:
+        return reference in self._rows
+
+    def rows_for(self, surah: int, verse: int) -> List[int]:
+        """Return the document rows for a reference (empty if unknown)."""
+        return self._rows.get((int(surah), int(verse)), [])
+
+    def lookup(self, surah: int, verse: int, sources: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Return the documents for a reference.
+
+        Args:
+            surah: Surah number
+            verse: Verse number
+            sources: Optional list of sources to keep (e.g. ``['quran']``)
+
+        Returns:
+            ``{'content', 'metadata', 'score'}`` dictionaries, Quran text first
+        """
+        results = []
+        for row in self.rows_for(surah, verse):
+            doc = self.documents[row]
+            if sources and doc['metadata'].get('source') not in sources:
+                continue
+            results.append({
+                'content': doc['content'],
+                'metadata': doc['metadata'],
+                'score': 0.0  # Exact match
+            })
+        return results
+
+
+def build_reference_index(quran_path: str = QURAN_DATA_PATH, tafsir_dir: str = TAFSIR_DIR_PATH) -> ReferenceIndex:
+    """Load the Quran and tafsir data and index it by reference."""
+    documents = load_quran_data(quran_path) + load_tafsir_data(tafsir_dir)
+    return ReferenceIndex(documents)
+
+
+@lru_cache(maxsize=4)
+def get_reference_index(quran_path: str = QURAN_DATA_PATH, tafsir_dir: str = TAFSIR_DIR_PATH) -> ReferenceIndex:
+    """Process-wide reference index, built on first use."""
+    reference_index = build_reference_index(quran_path, tafsir_dir)
+    print(f"Built reference index with {len(reference_index)} references from {len(reference_index.sources)} sources")
+    return reference_index
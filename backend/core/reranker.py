@@ -0,0 +1,196 @@
+# backend/core/reranker.py
+"""
+Cross-encoder reranking of retrieved candidates on CPU.
+
+The retriever agent fetches ``k * 3`` candidates and keeps the best ``k``.
+Instead of asking the chat model to extract from every candidate (one
+sequential LLM round trip per document), a small cross-encoder scores all
+(question, passage) pairs in one batched forward pass.
+
+The model runs with onnxruntime when an exported ONNX file exists at
+``RERANKER_ONNX_PATH`` and with torch otherwise. Export one with:
+
+    python -m backend.core.reranker --export   # needs the optional `onnx` package
+"""
+import os
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.callbacks.manager import Callbacks
+from langchain.retrievers.document_compressors.base import BaseDocumentCompressor
+from langchain_core.documents import Document
+
+from backend.core.config import EMBEDDING_TORCH_THREADS, RERANKER_MAX_LENGTH, RERANKER_MODEL, RERANKER_ONNX_PATH
+from backend.core.metrics import stage_timer
+
+_ONNX_INPUTS = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+class CrossEncoderReranker:
+    """Scores (query, passage) pairs with a sequence-classification cross-encoder."""
+
+    def __init__(
+        self,
+        model_name: str = RERANKER_MODEL,
+        onnx_path: Optional[str] = RERANKER_ONNX_PATH,
+        max_length: int = RERANKER_MAX_LENGTH,
+        tokenizer=None,
+        model=None
+    ):
+        """
+        Args:
+            model_name: Hugging Face model id or local directory
+            onnx_path: Exported ONNX model, used when the file exists and onnxruntime is installed
+            max_length: Tokens per (query, passage) pair
+            tokenizer: Preloaded tokenizer (loaded from ``model_name`` if omitted)
+            model: Preloaded torch model (loaded from ``model_name`` if omitted)
+        """
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.max_length = max_length
+        self.tokenizer = tokenizer or AutoTokenizer.from_pretrained(model_name)
+        # Fast tokenizers reconfigure padding / truncation on every call and
+        # raise "Already borrowed" when two threads do so at once
+        self._tokenizer_lock = threading.Lock()
+        self.session = None
+        self.model = model
+
+        if model is None and onnx_path and os.path.exists(onnx_path):
+            try:
+                import onnxruntime
+
+                options = onnxruntime.SessionOptions()
+                if EMBEDDING_TORCH_THREADS > 0:
+                    options.intra_op_num_threads = EMBEDDING_TORCH_THREADS
+                self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+                self.backend = "onnx"
+            except ImportError:
+                print("Warning: onnxruntime is not installed, running the reranker with torch")
+
+        if self.session is None:
+            from backend.core.embeddings import configure_torch_threads
+
+            configure_torch_threads()
+            if self.model is None:
+                from transformers import AutoModelForSequenceClassification
+
+                self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+            self.model.eval()
+            self.backend = "torch"
+
+    def score(self, query: str, texts: Sequence[str]) -> np.ndarray:
+        """Relevance logits of ``texts`` for ``query``, one forward pass for all pairs."""
+        if not texts:
+            return np.empty(0, dtype=np.float32)
+        with self._tokenizer_lock:
+            features = self.tokenizer(
+                [query] * len(texts),
+                list(texts),
+                padding=True,
+                truncation="longest_first",
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+
+        if self.session is not None:
+            names = {node.name for node in self.session.get_inputs()}
+            inputs = {name: features[name].astype(np.int64) for name in _ONNX_INPUTS if name in names}
+            logits = self.session.run(None, inputs)[0]
+        else:
+            import torch
+
+            with torch.inference_mode():
+                logits = self.model(**{name: torch.from_numpy(np.asarray(value, dtype=np.int64))
+                                       for name, value in features.items()}).logits.numpy()
+        # Single-logit models score directly; two-class models use the "relevant" column
+        return np.ascontiguousarray(logits[:, -1], dtype=np.float32)
+
+    def rerank(self, query: str, documents: Sequence[Document], top_n: int) -> List[Tuple[Document, float]]:
+        """The ``top_n`` documents by cross-encoder score, best first."""
+        scores = self.score(query, [doc.page_content for doc in documents])
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        return [(documents[i], float(scores[i])) for i in order]
+
+
+class CrossEncoderCompressor(BaseDocumentCompressor):
+    """Document compressor keeping the ``top_n`` candidates ranked by a cross-encoder."""
+
+    reranker: Any
+    top_n: int = 5
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        with stage_timer("rerank"):
+            ranked = self.reranker.rerank(query, documents, self.top_n)
+        reranked = []
+        for doc, score in ranked:
+            reranked.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "rerank_score": score}))
+        return reranked
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_error: Optional[str] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Process-wide reranker, or None when the model cannot be loaded (not retried)."""
+    global _reranker, _reranker_error
+    with _reranker_lock:
+        if _reranker is None and _reranker_error is None:
+            try:
+                _reranker = CrossEncoderReranker()
+                print(f"Loaded reranker {_reranker.model_name} ({_reranker.backend})")
+            except Exception as e:
+                _reranker_error = str(e)
+                print(f"Warning: Could not load reranker {RERANKER_MODEL}: {e}")
+        return _reranker
+
+
+def export_onnx(model_name: str = RERANKER_MODEL, output_path: str = RERANKER_ONNX_PATH, opset: int = 14) -> str:
+    """Export a cross-encoder to ONNX with dynamic batch and sequence axes."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["question"], ["passage"], return_tensors="pt")
+    names = [name for name in _ONNX_INPUTS if name in sample]
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in names),
+        output_path,
+        input_names=names,
+        output_names=["logits"],
+        dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names}, "logits": {0: "batch"}},
+        opset_version=opset
+    )
+    return output_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cross-encoder reranker utilities")
+    parser.add_argument("--export", action="store_true", help="Export the model to ONNX")
+    parser.add_argument("--model", default=RERANKER_MODEL)
+    parser.add_argument("--output", default=RERANKER_ONNX_PATH)
+    args = parser.parse_args()
+
+    if args.export:
+        print(f"ONNX model written to {export_onnx(args.model, args.output)}")
+    else:
+        parser.print_help()
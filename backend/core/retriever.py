@@ -1,12 +1,18 @@
 # backend/core/retriever.py
 import os
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import LLMChainExtractor
+from langchain_core.documents import Document
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.retrievers import BaseRetriever
 from langchain_community.vectorstores import FAISS
 from dotenv import load_dotenv
+from backend.core.config import RETRIEVER_COMPRESSOR
 from backend.core.llm_client import get_chat_model, UnifiedLLMChat
+from backend.core.reranker import CrossEncoderCompressor, get_reranker
 
 load_dotenv()
 
@@ -19,9 +25,14 @@ def create_basic_retriever(vector_store, k=5):
         search_kwargs={"k": k}
     )
 
-def create_enhanced_retriever(vector_store, k=5, use_compression=True):
+def create_enhanced_retriever(vector_store, k=5, use_compression=True, compressor=RETRIEVER_COMPRESSOR):
     """
     Create an advanced retriever with optional contextual compression
+
+    With ``compressor="cross_encoder"`` (the default) the ``k * 3``
+    candidates are reranked by a local cross-encoder in one batched pass and
+    the best ``k`` are kept. ``compressor="llm"`` uses ``LLMChainExtractor``,
+    which makes one chat-completion call per candidate.
     """
     # Create a more robust base retriever with much lower threshold
     base_retriever = vector_store.as_retriever(
@@ -33,6 +44,17 @@ def create_enhanced_retriever(vector_store, k=5, use_compression=True):
     
     if not use_compression:
         return base_retriever
+    
+    if compressor == "cross_encoder":
+        reranker = get_reranker()
+        if reranker is None:
+            # Vector order is the best ranking left; keep only the top k
+            print("Warning: Reranker unavailable, using the top vector search results")
+            return create_basic_retriever(vector_store, k=k)
+        return ContextualCompressionRetriever(
+            base_compressor=CrossEncoderCompressor(reranker=reranker, top_n=k),
+            base_retriever=base_retriever
+        )
         
     # Add contextual compression for more focused results
     try:
@@ -55,9 +77,91 @@ def create_enhanced_retriever(vector_store, k=5, use_compression=True):
         print(f"Warning: Could not create LLM compressor: {e}")
         return base_retriever  # Fall back to base retriever if compression fails
 
+class RetrieverPool:
+    """
+    Prebuilt retrieval pipelines keyed by ``(k, use_compression, compressor)``.
+
+    Pipelines are never modified once built: per-call filters go through
+    :func:`with_search_kwargs`, which returns a shallow copy. One pipeline can
+    therefore serve any number of concurrent requests, and a request with a
+    new ``k`` builds its pipeline once instead of on every call. The least
+    recently used pipeline is dropped beyond ``max_size`` keys.
+
+    Pipelines are built outside the pool lock, so a slow first build (the
+    ``"llm"`` compressor creates a chat model) does not hold up lookups of
+    other keys; concurrent requests for the same new key wait on that key's
+    build instead of repeating it.
+    """
+
+    def __init__(self, vector_store, max_size: int = 16, prebuild: Tuple[Tuple[int, bool], ...] = ((5, True),)):
+        self.vector_store = vector_store
+        self.max_size = max_size
+        self._pipelines: "OrderedDict[Tuple[int, bool, str], BaseRetriever]" = OrderedDict()
+        self._building: Dict[Tuple[int, bool, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        for k, use_compression in prebuild:
+            self.get(k, use_compression)
+
+    def _lookup(self, key: Tuple[int, bool, str]) -> Optional[BaseRetriever]:
+        """The pipeline for ``key`` marked as most recently used, or None; call with the lock held."""
+        pipeline = self._pipelines.get(key)
+        if pipeline is not None:
+            self._pipelines.move_to_end(key)
+        return pipeline
+
+    def get(self, k: int = 5, use_compression: bool = True, compressor: str = RETRIEVER_COMPRESSOR) -> BaseRetriever:
+        """The shared pipeline for these options, built on first use."""
+        key = (int(k), bool(use_compression), compressor if use_compression else "")
+        with self._lock:
+            pipeline = self._lookup(key)
+            if pipeline is not None:
+                return pipeline
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                # Built by another caller while this one waited
+                pipeline = self._lookup(key)
+                if pipeline is not None:
+                    return pipeline
+            try:
+                pipeline = create_enhanced_retriever(self.vector_store, k=key[0], use_compression=key[1],
+                                                     compressor=compressor)
+                with self._lock:
+                    self._pipelines[key] = pipeline
+                    if len(self._pipelines) > self.max_size:
+                        self._pipelines.popitem(last=False)
+                return pipeline
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._pipelines)
+
+
+def with_search_kwargs(retriever, search_kwargs: Dict[str, Any]):
+    """
+    Copy of ``retriever`` whose vector store search also gets ``search_kwargs``.
+
+    Vector store retrievers are copied with the merged kwargs; compression
+    retrievers get a copy of their base retriever. The original is left
+    untouched, so this is safe on a retriever shared between threads.
+    """
+    if not search_kwargs:
+        return retriever
+    if hasattr(retriever, 'search_kwargs'):
+        return retriever.copy(update={"search_kwargs": {**retriever.search_kwargs, **search_kwargs}})
+    if hasattr(retriever, 'base_retriever'):
+        return retriever.copy(update={"base_retriever": with_search_kwargs(retriever.base_retriever, search_kwargs)})
+    print(f"Warning: {type(retriever).__name__} does not take search kwargs, ignoring {search_kwargs}")
+    return retriever
+
 def retrieve_relevant_context(retriever, query: str, filter_criteria: Dict = None):
     """
     Retrieve relevant documents for a query with optional filtering
+
+    The retriever is not modified, so concurrent calls may share it.
     """
     try:
         print(f"Retrieving documents for query: {query[:50]}...")
@@ -68,40 +172,35 @@ def retrieve_relevant_context(retriever, query: str, filter_criteria: Dict = Non
         if filter_criteria:
             search_kwargs["filter"] = filter_criteria
         
-        # Handle different retriever types
-        original_kwargs = None
-        if hasattr(retriever, 'search_kwargs'):
-            original_kwargs = retriever.search_kwargs.copy()
-            if filter_criteria:
-                retriever.search_kwargs.update(search_kwargs)
-        
-        # Execute the retrieval
-        documents = retriever.get_relevant_documents(query)
-        
-        # Reset search_kwargs if modified
-        if hasattr(retriever, 'search_kwargs') and original_kwargs and filter_criteria:
-            retriever.search_kwargs = original_kwargs
+        # Execute the retrieval on a per-call copy carrying the filters
+        documents = with_search_kwargs(retriever, search_kwargs).get_relevant_documents(query)
         
-        # Add query to metadata for tracing
-        for doc in documents:
-            if not hasattr(doc, 'metadata'):
-                doc.metadata = {}
-            doc.metadata['query'] = query
-        
-        return documents
+        # Add query to metadata for tracing; the vector store hands out its
+        # stored documents, so copy them instead of writing into the shared ones
+        return [
+            Document(page_content=doc.page_content, metadata={**(getattr(doc, 'metadata', None) or {}), 'query': query})
+            for doc in documents
+        ]
     except Exception as e:
         print(f"Error retrieving documents: {e}")
         return []
 
-def format_context_from_docs(documents: List[Any]) -> str:
+def format_context_from_docs(documents: List[Any], token_budget: Optional[int] = None) -> str:
     """
     Format retrieved documents into a context string
+
+    With ``token_budget``, documents (best first) that no longer fit the
+    remaining tokens are left out.
     """
     if not documents:
         return "No relevant information found."
         
     context_parts = []
     seen_refs = set()  # Track seen references to avoid duplicates
+    if token_budget is not None:
+        from backend.core.context_packing import PASSAGE_OVERHEAD_TOKENS, TOKEN_COUNT_MODEL
+        from backend.core.embedding_scheduler import get_token_counter
+        count_tokens = get_token_counter(TOKEN_COUNT_MODEL)
     
     for doc in documents:
         source = doc.metadata.get("source", "unknown")
@@ -113,6 +212,12 @@ def format_context_from_docs(documents: List[Any]) -> str:
             continue
         seen_refs.add(ref_key)
         
+        if token_budget is not None:
+            tokens = count_tokens(doc.page_content) + PASSAGE_OVERHEAD_TOKENS
+            if tokens > token_budget:
+                continue
+            token_budget -= tokens
+        
         # Format differently based on source
         if source == "quran":
             context_parts.append(f"[Quran {ref}]: {doc.page_content}")
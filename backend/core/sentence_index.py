@@ -0,0 +1,278 @@
+# backend/core/sentence_index.py
+"""
+Sentence-level extractive compression of retrieved passages.
+
+Long tafsir passages dominate the prompt although only a few of their
+sentences bear on the question. At index-build time every chunk is split
+into sentences and each sentence is embedded with the index's embedding
+model. The result is stored in a ``sentences/`` directory next to the FAISS
+index, row-aligned with the docstore:
+
+    vectors.npy   float32[s, d]  L2-normalized sentence embeddings
+    spans.npy     int32[s, 2]    character span of each sentence in its chunk
+    indptr.npy    int64[n + 1]   sentences of chunk i are indptr[i]:indptr[i + 1]
+    lengths.npy   int32[n]       character length of each chunk (staleness check)
+    meta.json                    format version, embedding model, sentence hashes
+
+At query time :meth:`SentenceIndex.compress` scores all sentences of the
+retrieved passages against the question with one matrix product. It keeps
+the best sentence of every passage plus the best sentences overall, in
+their original order. Metadata (and so the verse references) is left
+untouched. Sentence vectors are reused across builds by content hash, like
+the chunk vectors.
+"""
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.core.config import SENTENCE_COMPRESSION_MAX_SENTENCES, SENTENCE_MIN_CHARS
+from backend.core.docstore import replace_directory, staging_directory
+
+SENTENCES_DIRNAME = "sentences"
+SENTENCE_INDEX_VERSION = 1
+
+# Full stop, question / exclamation marks (Latin and Arabic), Arabic semicolon, Urdu full stop, newlines
+_SENTENCE_END = re.compile("[.!?؟؛۔\n]+")
+# Marks the text left out between two kept sentences
+GAP_MARKER = "…"
+
+
+def split_sentences(text: str, min_chars: int = SENTENCE_MIN_CHARS) -> List[Tuple[int, int]]:
+    """
+    Character spans of the sentences of ``text``.
+
+    Fragments shorter than ``min_chars`` are merged into the previous
+    sentence so that headings and verse numbers do not stand alone.
+    """
+    boundaries = [match.end() for match in _SENTENCE_END.finditer(text)]
+    if not boundaries or boundaries[-1] < len(text):
+        boundaries.append(len(text))
+
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    for end in boundaries:
+        piece = text[start:end]
+        stripped_start = start + len(piece) - len(piece.lstrip())
+        stripped_end = end - (len(piece) - len(piece.rstrip()))
+        start = end
+        if stripped_end <= stripped_start:
+            continue
+        if spans and (stripped_end - stripped_start < min_chars or spans[-1][1] - spans[-1][0] < min_chars):
+            spans[-1] = (spans[-1][0], stripped_end)
+        else:
+            spans.append((stripped_start, stripped_end))
+    return spans
+
+
+class SentenceIndex:
+    """Memory-mapped sentence embeddings of the indexed chunks."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SENTENCE_INDEX_VERSION:
+            raise ValueError(f"Unsupported sentence index version: {meta.get('version')}")
+        self.model_id: str = meta["embedding_model"]
+        self.hashes: List[str] = meta["hashes"]
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.spans = np.load(os.path.join(path, "spans.npy"), mmap_mode="r")
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        """Number of chunks covered."""
+        return len(self.indptr) - 1
+
+    @property
+    def num_sentences(self) -> int:
+        return len(self.vectors)
+
+    def compress(
+        self,
+        query_vector: np.ndarray,
+        documents: Sequence[Dict[str, Any]],
+        max_sentences: int = SENTENCE_COMPRESSION_MAX_SENTENCES
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep the sentences of ``documents`` closest to the question.
+
+        Args:
+            query_vector: Question embedding from the model the index was built with
+            documents: Retrieved ``{'content', 'metadata', 'row', ...}`` dictionaries;
+                documents without a known ``row`` are returned unchanged
+            max_sentences: Sentences kept across all passages in addition to
+                the best sentence of each passage
+
+        Returns:
+            The documents in the same order, with ``content`` reduced to the
+            kept sentences (gaps marked with an ellipsis)
+        """
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        positions = [
+            position for position, doc in enumerate(documents)
+            if 0 <= doc.get("row", -1) < len(self) and len(doc["content"]) == self.lengths[doc["row"]]
+        ]
+        if not positions or norm == 0:
+            return list(documents)
+
+        rows = np.array([documents[position]["row"] for position in positions], dtype=np.int64)
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return list(documents)
+        owner = np.repeat(np.arange(len(rows)), counts)
+        first = np.cumsum(counts) - counts
+        sentence_ids = starts[owner] + (np.arange(total) - first[owner])
+
+        # One (total, d) @ (d,) product scores every candidate sentence
+        similarities = self.vectors[sentence_ids] @ (query / norm)
+
+        keep = np.zeros(total, dtype=bool)
+        by_passage = np.lexsort((-similarities, owner))
+        keep[by_passage[first[counts > 0]]] = True
+        keep[np.argsort(-similarities, kind="stable")[:max_sentences]] = True
+        spans = self.spans[sentence_ids]
+
+        compressed = list(documents)
+        for passage, position in enumerate(positions):
+            begin, count = int(first[passage]), int(counts[passage])
+            kept = np.flatnonzero(keep[begin:begin + count])
+            if count <= 1 or len(kept) == count:
+                continue
+            content = documents[position]["content"]
+            parts = []
+            for i, sentence in enumerate(kept):
+                if (i == 0 and sentence > 0) or (i > 0 and sentence != kept[i - 1] + 1):
+                    parts.append(GAP_MARKER)
+                start, end = spans[begin + sentence]
+                parts.append(content[start:end])
+            if kept[-1] < count - 1:
+                parts.append(GAP_MARKER)
+            compressed[position] = {**documents[position], "content": " ".join(parts)}
+        return compressed
+
+
+def load_sentence_index(index_path: str) -> Optional[SentenceIndex]:
+    """Open the sentence index stored alongside a FAISS index, or None if there is none."""
+    path = os.path.join(index_path, SENTENCES_DIRNAME)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return SentenceIndex(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Ignoring unreadable sentence index in {path}: {e}")
+        return None
+
+
+def build_sentence_index(
+    texts: Sequence[str],
+    index_path: str,
+    embedding_model,
+    batch_size: int = 500,
+    full_rebuild: bool = False,
+    min_chars: int = SENTENCE_MIN_CHARS,
+    chunk_vectors: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Split ``texts`` (the chunks in docstore row order) into sentences and
+    store their embeddings, embedding only sentences not seen in the previous
+    build with the same model.
+
+    A chunk that is a single sentence (most verses) takes its vector from
+    ``chunk_vectors``, the chunk embeddings in the same row order, when given.
+
+    Sentences that fail to embed are left out of the index; they are never
+    selected and are embedded again on the next build.
+
+    Returns:
+        Build statistics (sentence counts and timings)
+    """
+    from backend.core.incremental_index import content_hash, embed_texts, embedding_model_id
+
+    start_time = time.time()
+    path = os.path.join(index_path, SENTENCES_DIRNAME)
+    model_id = embedding_model_id(embedding_model)
+
+    spans_per_text = [split_sentences(text, min_chars) for text in texts]
+    sentences = [text[start:end] for text, spans in zip(texts, spans_per_text) for start, end in spans]
+    hashes = [content_hash(sentence) for sentence in sentences]
+
+    previous_rows: Dict[str, int] = {}
+    previous = None if full_rebuild else load_sentence_index(index_path)
+    if previous is not None and previous.model_id == model_id:
+        previous_rows = {sentence_hash: row for row, sentence_hash in enumerate(previous.hashes)}
+
+    new_vectors: Dict[str, np.ndarray] = {}
+    if chunk_vectors is not None:
+        for row, (text, spans) in enumerate(zip(texts, spans_per_text)):
+            if len(spans) == 1 and spans[0] == (0, len(text)):
+                new_vectors[content_hash(text)] = chunk_vectors[row]
+    chunk_reused = len(new_vectors)
+
+    missing: Dict[str, str] = {}
+    for sentence_hash, sentence in zip(hashes, sentences):
+        if sentence_hash not in previous_rows and sentence_hash not in new_vectors and sentence_hash not in missing:
+            missing[sentence_hash] = sentence
+    missing_hashes = list(missing)
+    vectors_by_row, failed_by_row = embed_texts(embedding_model, list(missing.values()), batch_size)
+    new_vectors.update((missing_hashes[row], vector) for row, vector in vectors_by_row.items())
+    failed = {missing_hashes[row] for row in failed_by_row}
+
+    owners = np.repeat(np.arange(len(texts)), [len(spans) for spans in spans_per_text])
+    keep = np.array([sentence_hash not in failed for sentence_hash in hashes], dtype=bool)
+    kept_rows = np.flatnonzero(keep)
+
+    dim = None
+    if new_vectors:
+        dim = len(next(iter(new_vectors.values())))
+    elif previous_rows:
+        dim = previous.vectors.shape[1]
+    vectors = np.empty((len(kept_rows), dim or 0), dtype=np.float32)
+    for out_row, row in enumerate(kept_rows):
+        sentence_hash = hashes[row]
+        if sentence_hash in new_vectors:  # Checked first: a chunk vector beats a stale sentence vector
+            vectors[out_row] = new_vectors[sentence_hash]
+        else:
+            vectors[out_row] = previous.vectors[previous_rows[sentence_hash]]
+    previous = None
+    if len(vectors):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, np.where(norms > 0, norms, 1), out=vectors)
+
+    spans = np.array([span for spans in spans_per_text for span in spans], dtype=np.int32).reshape(-1, 2)
+    indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners[keep], minlength=len(texts)), out=indptr[1:])
+
+    # Readers of the previous index keep their memory maps (see replace_directory)
+    staging = staging_directory(path)
+    np.save(os.path.join(staging, "vectors.npy"), vectors)
+    np.save(os.path.join(staging, "spans.npy"), spans[keep])
+    np.save(os.path.join(staging, "indptr.npy"), indptr)
+    np.save(os.path.join(staging, "lengths.npy"), np.array([len(text) for text in texts], dtype=np.int32))
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": SENTENCE_INDEX_VERSION,
+            "embedding_model": model_id,
+            "count": int(len(kept_rows)),
+            "hashes": [hashes[row] for row in kept_rows]
+        }, f)
+    replace_directory(staging, path)
+
+    stats = {
+        "sentences": int(len(kept_rows)),
+        "reused": sum(1 for row in kept_rows if hashes[row] in previous_rows and hashes[row] not in new_vectors),
+        "from_chunks": chunk_reused,
+        "embedded": len(vectors_by_row),
+        "failed": len(failed),
+        "total_seconds": time.time() - start_time
+    }
+    print(f"Sentence index: {stats['sentences']} sentences, {stats['reused']} reused, "
+          f"{stats['from_chunks']} from chunk vectors, {stats['embedded']} embedded, {stats['failed']} failed in {stats['total_seconds']:.1f}s")
+    return stats
@@ -0,0 +1,84 @@
+# backend/core/singleflight.py
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When a question is trending, many identical requests arrive while the first
+one is still embedding, searching and generating. :class:`SingleFlight`
+runs the computation once per key: the first caller starts it as a task and
+callers with the same key that arrive before it finishes await that task
+and receive the same result (or the same exception). Nothing is cached
+once the task is done; that is the answer cache's job.
+
+The shared task outlives a cancelled caller (e.g. a client that
+disconnected) as long as another caller still waits for it. Tasks belong
+to the event loop that started them, so calls only coalesce with calls on
+the same loop; an instance may be shared by several loops (threads). Calls
+are counted in ``quran_rag_singleflight_total{name, result=leader|coalesced}``.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from backend.core.metrics import SINGLEFLIGHT_TOTAL
+
+T = TypeVar("T")
+
+
+def normalize_question(text: str) -> str:
+    """Case- and whitespace-insensitive form of a question for coalescing keys."""
+    return " ".join(text.casefold().split())
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one task, per running event loop."""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label of the ``quran_rag_singleflight_total`` series
+        """
+        self.name = name
+        # Keyed by (event loop, key): a task can only be awaited from its own loop
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Call] = {}
+
+    def __len__(self) -> int:
+        """Number of keys in flight."""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Await ``fn()``, or the call already in flight for ``key``.
+
+        Returns:
+            The result and whether it was shared with an earlier caller
+        """
+        key = (asyncio.get_running_loop(), key)
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        SINGLEFLIGHT_TOTAL.inc(name=self.name, result="coalesced" if shared else "leader")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            # Nobody else is waiting: stop the work instead of finishing it for no one
+            if call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Tuple[asyncio.AbstractEventLoop, Hashable], call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
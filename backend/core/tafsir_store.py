@@ -0,0 +1,86 @@
+# backend/core/tafsir_store.py
+"""
+Preloaded tafsir texts with constant-time (tafsir, surah, verse) lookups.
+
+The tafsir files are parsed once per process with ``load_tafsir_data`` (which
+also numbers the ``"surah:None"`` records of the downloaded editions) and kept
+in per-tafsir dictionaries. The tafsir tool agent, the tafsir MCP server and
+the CLI ``tafsir`` command all share the store returned by
+``get_tafsir_store``.
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import TAFSIR_DIR_PATH
+from backend.core.data_processing import load_tafsir_data
+
+
+def readable_tafsir_name(tafsir_id: str) -> str:
+    """Human readable name for a tafsir id, e.g. ``ar-tafsir-muyassar`` -> ``Tafsir Muyassar``."""
+    if '-' in tafsir_id:
+        _, tafsir_id = tafsir_id.split('-', 1)
+    return tafsir_id.replace('-', ' ').title()
+
+
+class TafsirStore:
+    """In-memory map from (tafsir, surah, verse) to the explanation text."""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        """
+        Args:
+            documents: ``{'content', 'metadata'}`` dictionaries as produced by
+                ``load_tafsir_data``
+        """
+        self._texts: Dict[str, Dict[Tuple[int, int], str]] = {}
+        for doc in documents:
+            metadata = doc['metadata']
+            tafsir_id = metadata['source'].replace('tafsir_', '', 1)
+            key = (int(metadata['surah_num']), int(metadata['verse_num']))
+            self._texts.setdefault(tafsir_id, {})[key] = doc['content']
+
+    @property
+    def tafsir_ids(self) -> List[str]:
+        return sorted(self._texts)
+
+    def __contains__(self, tafsir_id: str) -> bool:
+        return tafsir_id in self._texts
+
+    def __len__(self) -> int:
+        return sum(len(texts) for texts in self._texts.values())
+
+    def get(self, tafsir_id: str, surah: int, verse: int) -> Optional[str]:
+        """Explanation of one verse, or None if the tafsir does not cover it."""
+        texts = self._texts.get(tafsir_id)
+        if texts is None:
+            return None
+        return texts.get((int(surah), int(verse)))
+
+    def get_range(self, tafsir_id: str, surah: int, start_verse: int, end_verse: int) -> List[Tuple[int, str]]:
+        """``(verse, explanation)`` pairs for verses ``start_verse..end_verse`` of a surah (inclusive)."""
+        texts = self._texts.get(tafsir_id)
+        if texts is None:
+            return []
+        results = []
+        for verse in range(int(start_verse), int(end_verse) + 1):
+            text = texts.get((int(surah), verse))
+            if text is not None:
+                results.append((verse, text))
+        return results
+
+
+def load_tafsir_store(tafsir_dir: str = TAFSIR_DIR_PATH) -> TafsirStore:
+    """Parse every tafsir file in a directory into a store."""
+    return TafsirStore(load_tafsir_data(tafsir_dir))
+
+
+@lru_cache(maxsize=4)
+def _cached_store(tafsir_dir: str) -> TafsirStore:
+    store = load_tafsir_store(tafsir_dir)
+    print(f"Loaded tafsir store with {len(store)} explanations from {len(store.tafsir_ids)} tafsirs")
+    return store
+
+
+def get_tafsir_store(tafsir_dir: str = TAFSIR_DIR_PATH) -> TafsirStore:
+    """Process-wide tafsir store for a directory, loaded on first use."""
+    return _cached_store(os.path.abspath(tafsir_dir))
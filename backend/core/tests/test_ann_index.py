@@ -0,0 +1,77 @@
+import faiss
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.core.ann_index import apply_search_params, create_index, default_nlist, describe_index, resolve_factory
+from backend.core.vector_search import PrefilteredFAISS
+
+
+class ListEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        raise AssertionError("vectors are precomputed")
+
+    def embed_query(self, text):
+        raise AssertionError("vectors are precomputed")
+
+
+def _vectors(n=2000, d=16):
+    vectors = np.random.default_rng(0).standard_normal((n, d)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def test_nlist_placeholder_scales_with_the_corpus():
+    assert resolve_factory("IVF{nlist},Flat", 2000) == f"IVF{default_nlist(2000)},Flat"
+    assert default_nlist(2000) == 51
+    assert default_nlist(10) == 1
+
+
+def test_ivf_index_is_trained_and_search_params_are_applied():
+    vectors = _vectors()
+    index = create_index(vectors, "IVF{nlist},Flat", train_sample=500)
+    index.add(vectors)
+
+    apply_search_params(index, nprobe=default_nlist(len(vectors)))
+    _, found = index.search(vectors[:20], 1)
+
+    assert index.is_trained
+    assert found[:, 0].tolist() == list(range(20))  # Probing every list is exact
+    assert describe_index(index)["nprobe"] == default_nlist(len(vectors))
+
+    hnsw = apply_search_params(create_index(vectors, "HNSW16"), ef_search=123)
+    assert describe_index(hnsw)["efSearch"] == 123
+
+
+def test_store_with_ann_index_supports_prefiltered_search():
+    vectors = _vectors(500)
+    metadatas = [{"source": "quran", "surah_num": i % 5 + 1, "verse_num": i + 1} for i in range(500)]
+    store = PrefilteredFAISS.from_arrays(
+        [f"text {i}" for i in range(500)], vectors, ListEmbeddings(), metadatas, index_factory="IVF{nlist},SQ8"
+    )
+
+    results = store.similarity_search_with_score_by_vector(vectors[7], k=3, filter={"surah_num": 3})
+
+    assert describe_index(store.index)["type"] == "IndexIVFScalarQuantizer"
+    assert len(results) == 3
+    assert all(doc.metadata["surah_num"] == 3 for doc, _ in results)
+    assert results[0][0].page_content == "text 7"
+
+
+def test_loaded_ivf_store_is_not_modified_by_filtered_searches(tmp_path):
+    vectors = _vectors(500)
+    metadatas = [{"source": "quran", "surah_num": i % 5 + 1, "verse_num": i + 1} for i in range(500)]
+    built = PrefilteredFAISS.from_arrays(
+        [f"text {i}" for i in range(500)], vectors, ListEmbeddings(), metadatas, index_factory="IVF{nlist},Flat"
+    )
+    faiss.extract_index_ivf(built.index).set_direct_map_type(faiss.DirectMap.NoMap)  # As in older index files
+    built.save_local(str(tmp_path))
+
+    store = PrefilteredFAISS.load_local(str(tmp_path), ListEmbeddings())
+    ivf = faiss.extract_index_ivf(store.index)
+    assert ivf.direct_map.type != faiss.DirectMap.NoMap
+    before = faiss.serialize_index(store.index)
+
+    results = store.similarity_search_with_score_by_vector(vectors[7], k=3, filter={"surah_num": 3})
+
+    assert results[0][0].page_content == "text 7"
+    assert np.array_equal(faiss.serialize_index(store.index), before)
@@ -0,0 +1,143 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi import Response
+
+from backend.core.answer_cache import SemanticAnswerCache, make_cache_key
+
+
+def _vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_similar_question_with_same_filters_hits():
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    key = make_cache_key({"surah": 2})
+    cache.store(_vector(1, 0, 0), key, "answer", [{"content": "c"}])
+
+    hit = cache.lookup(_vector(0.99, 0.05, 0), key)
+
+    assert hit["answer"] == "answer"
+    assert hit["sources"] == [{"content": "c"}]
+    assert hit["similarity"] > 0.95
+    assert cache.lookup(_vector(0, 1, 0), key) is None
+    assert cache.lookup(_vector(1, 0, 0), make_cache_key({"surah": 3})) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_lru_eviction_and_ttl():
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2)
+    key = make_cache_key(None)
+    cache.store(_vector(1, 0, 0), key, "a", [])
+    cache.store(_vector(0, 1, 0), key, "b", [])
+    assert cache.lookup(_vector(1, 0, 0), key)["answer"] == "a"  # "b" is now least recent
+    cache.store(_vector(0, 0, 1), key, "c", [])
+
+    assert cache.lookup(_vector(0, 1, 0), key) is None
+    assert len(cache) == 2
+
+    cache.ttl_seconds = 1e-9
+    assert cache.lookup(_vector(1, 0, 0), key) is None
+    assert len(cache) == 0
+
+
+class WordEmbeddings:
+    def embed_query(self, text):
+        return [float("patience" in text.lower()), float("prayer" in text.lower()), 0.1]
+
+
+class FailingChain:
+    def invoke(self, inputs):
+        raise ConnectionError("LLM unavailable")
+
+
+def _api_with_cache(monkeypatch):
+    from backend.api import routes
+
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    documents = [{"content": "Seek help through patience and prayer",
+                  "metadata": {"source": "quran", "reference": "2:45"}}]
+    monkeypatch.setattr(routes, "answer_cache", cache)
+    monkeypatch.setattr(routes, "embeddings", WordEmbeddings())
+    monkeypatch.setattr(routes, "ensure_rag_ready", lambda needs_vector_search: None)
+    monkeypatch.setattr(routes, "retrieve_documents", lambda question, filters: documents)
+    monkeypatch.setattr(routes, "select_context", lambda question, results, question_vector=None: results)
+    monkeypatch.setattr(routes, "load_api_key", lambda: "test-key")
+    return routes, cache
+
+
+def test_failed_generation_is_not_cached(monkeypatch):
+    routes, cache = _api_with_cache(monkeypatch)
+
+    async def direct_failure(context, question):
+        raise ConnectionError("OpenAI unavailable")
+
+    monkeypatch.setattr(routes, "agenerate_answer_with_openai", direct_failure)
+    monkeypatch.setattr(routes, "get_answer_generator", lambda: FailingChain())
+    request = routes.QuestionRequest(question="What is patience?")
+
+    answer = asyncio.run(routes.answer_question(request, Response()))
+
+    assert answer.answer.startswith("Error:")
+    assert cache.lookup(np.array(WordEmbeddings().embed_query(request.question), dtype=np.float32),
+                        make_cache_key({}, include_supplementary=False)) is None
+
+
+def _chunk(content, finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content), finish_reason=finish_reason)])
+
+
+def test_interrupted_stream_is_not_cached(monkeypatch):
+    from backend.core import direct_openai
+
+    routes, cache = _api_with_cache(monkeypatch)
+
+    def client(chunks):
+        async def create(**kwargs):
+            async def stream():
+                for chunk in chunks:
+                    yield chunk
+            return stream()
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def events(request):
+        return [event async for event in routes.stream_answer_events(request, {}, False)]
+
+    request = routes.QuestionRequest(question="What is patience?")
+    vector = np.array(WordEmbeddings().embed_query(request.question), dtype=np.float32)
+    key = make_cache_key({}, include_supplementary=False)
+
+    monkeypatch.setattr(direct_openai, "get_async_openai_client", lambda: client([_chunk("Patience is")]))
+    dropped = asyncio.run(events(request))
+    assert dropped[-1].startswith("event: error")
+    assert cache.lookup(vector, key) is None
+
+    monkeypatch.setattr(direct_openai, "get_async_openai_client",
+                        lambda: client([_chunk("Patience is"), _chunk(" rewarded"), _chunk(None, "stop")]))
+    finished = asyncio.run(events(request))
+    assert finished[-1].startswith("event: done")
+    assert cache.lookup(vector, key)["answer"] == "Patience is rewarded"
+
+
+class FailingEmbeddings:
+    def embed_query(self, text):
+        raise ConnectionError("embedding service unavailable")
+
+
+def test_questions_that_cannot_be_embedded_bypass_the_cache(monkeypatch):
+    routes, cache = _api_with_cache(monkeypatch)
+    monkeypatch.setattr(routes, "embeddings", FailingEmbeddings())
+
+    async def generate(context, question):
+        return f"answer to {question}"
+
+    monkeypatch.setattr(routes, "agenerate_answer_with_openai", generate)
+
+    for question in ["What is patience?", "Who was Musa?"]:
+        response = Response()
+        answer = asyncio.run(routes.answer_question(routes.QuestionRequest(question=question), response))
+        assert answer.answer == f"answer to {question}"
+        assert response.headers["X-Answer-Cache"] == "bypass"
+    assert len(cache) == 0
@@ -0,0 +1,18 @@
+import asyncio
+
+from backend.core.client_registry import LLMClientRegistry, http2_available
+
+
+def test_clients_are_shared_per_api_key():
+    registry = LLMClientRegistry(max_connections=5, max_keepalive_connections=2)
+
+    first = registry.sync_client("sk-one")
+
+    assert registry.sync_client("sk-one") is first
+    assert registry.sync_client("sk-two") is not first
+    assert registry.async_client("sk-one") is registry.async_client("sk-one")
+    assert registry.clients_created == 3
+    assert registry.http2 == http2_available()
+
+    asyncio.run(registry.aclose())
+    assert registry.sync_client("sk-one") is not first
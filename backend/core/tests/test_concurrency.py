@@ -0,0 +1,22 @@
+import asyncio
+import threading
+import time
+
+from backend.core.concurrency import run_blocking
+
+
+def test_run_blocking_keeps_event_loop_free():
+    def slow(value, delay=0.2):
+        time.sleep(delay)
+        return value, threading.current_thread().name
+
+    async def main():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run_blocking(slow, i) for i in range(4)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+
+    assert [value for value, _ in results] == [0, 1, 2, 3]
+    assert all(name.startswith("blocking") for _, name in results)
+    assert elapsed < 0.6
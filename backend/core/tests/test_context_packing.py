@@ -0,0 +1,104 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.core.context_packing import PASSAGE_OVERHEAD_TOKENS, ContextPacker, mmr_select
+from backend.core.incremental_index import build_incremental_index
+
+
+def test_mmr_skips_near_duplicates_and_passages_over_budget():
+    relevance = np.array([0.9, 0.89, 0.5, 0.4])
+    similarity = np.array([
+        [1.0, 0.99, 0.1, 0.1],
+        [0.99, 1.0, 0.1, 0.1],
+        [0.1, 0.1, 1.0, 0.1],
+        [0.1, 0.1, 0.1, 1.0]
+    ])
+
+    assert mmr_select(relevance, [10, 10, 10, 10], 100, similarity, mmr_lambda=0.5) == [0, 2, 3, 1]
+    assert mmr_select(relevance, [10, 10, 50, 10], 30, similarity, mmr_lambda=0.5) == [0, 3, 1]
+    assert mmr_select(relevance, [10, 10, 10, 10], 25) == [0, 1]
+
+
+class TopicEmbeddings(Embeddings):
+    """Embeds text by the topic word it mentions."""
+
+    model_name = "topics"
+    topics = ["patience", "prayer", "charity"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(topic in text) for topic in self.topics] + [0.01]
+
+
+def _docs(*texts):
+    return [{"content": text, "metadata": {"source": "quran", "surah_num": 2, "verse_num": i + 1, "reference": f"2:{i + 1}"}}
+            for i, text in enumerate(texts)]
+
+
+def test_packer_keeps_pinned_documents_and_fits_the_budget(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    texts = ["patience is rewarded " * 3, "patience in hardship " * 3, "prayer at dawn " * 3, "charity " * 30]
+    build_incremental_index(_docs(*texts), index_path, TopicEmbeddings(), sentence_index=False)
+    packer = ContextPacker.load(index_path, "topics")
+    assert packer.has_vectors and len(packer) == 4
+
+    retrieved = [{"content": text, "metadata": {}, "row": row} for row, text in enumerate(texts)]
+    reference = {"content": "exact verse", "metadata": {"reference": "2:153"}}
+    budget = int(packer.token_counts[:3].sum()) + 4 * PASSAGE_OVERHEAD_TOKENS + 5
+    packed = packer.select([reference] + retrieved, budget, TopicEmbeddings().embed_query("patience"), mmr_lambda=0.3)
+
+    # The second patience passage is redundant; charity no longer fits
+    assert [doc.get("row") for doc in packed] == [None, 0, 2, 1]
+
+    without_vectors = ContextPacker.load(index_path, "other-model")
+    assert not without_vectors.has_vectors
+    assert [doc["row"] for doc in without_vectors.select(retrieved, budget)] == [0, 1, 2]
+
+
+def test_agent_packs_reference_and_retrieved_passages_into_the_model_budget(tmp_path, monkeypatch):
+    from backend.agents.orchestrator import A2AOrchestrator, QuranQueryRequest
+    from backend.agents.retriever import RetrieverAgent, RetrieverAgentRequest
+    from backend.core import context_packing
+    from backend.core.singleflight import SingleFlight
+    from backend.core.vector_search import PrefilteredFAISS
+
+    index_path = str(tmp_path / "faiss_index")
+    texts = ["patience is rewarded " * 3, "patience in hardship " * 3, "prayer at dawn " * 2, "charity " * 30]
+    build_incremental_index(_docs(*texts), index_path, TopicEmbeddings(), sentence_index=False)
+
+    agent = RetrieverAgent.__new__(RetrieverAgent)
+    agent.vector_store_path = index_path
+    agent.embeddings = TopicEmbeddings()
+    agent.vector_store = PrefilteredFAISS.load_local(index_path, agent.embeddings, allow_dangerous_deserialization=True)
+    agent._initialize_context_packer()
+    agent.retriever_pool = SimpleNamespace(get=lambda k, use_compression: agent.vector_store.as_retriever(search_kwargs={"k": 4}))
+
+    counts = agent.context_packer.token_counts
+    # After the best passage only the shorter prayer passage still fits
+    budget = int(counts[0] + counts[2]) + 2 * PASSAGE_OVERHEAD_TOKENS + 5
+    assert counts[1] > counts[2] + 5
+    monkeypatch.setitem(context_packing.CONTEXT_TOKEN_BUDGETS, "small-model", budget)
+
+    response = asyncio.run(agent.process(RetrieverAgentRequest(query="patience", model_name="small-model")))
+    assert sorted(doc["row"] for doc in response.documents) == [0, 1, 2, 3]
+    assert all("row" not in doc["metadata"] for doc in response.documents)
+    assert response.formatted_context.split("\n\n") == [f"[Quran 2:{row + 1}]: {texts[row]}" for row in (0, 2)]
+
+    # The orchestrator packs the exact reference and the retrieved passages together
+    orchestrator = A2AOrchestrator.__new__(A2AOrchestrator)
+    orchestrator.step_timeouts = {}
+    orchestrator.retriever_agent = agent
+    orchestrator.reference_index = SimpleNamespace(lookup=lambda surah, verse: [
+        {"content": "exact verse", "metadata": {"source": "quran", "reference": f"{surah}:{verse}"}}])
+    orchestrator.generator_agent = SimpleNamespace(process=lambda request: asyncio.sleep(0, SimpleNamespace(answer=request.context)))
+    orchestrator.single_flight = SingleFlight("test_packing")
+    request = QuranQueryRequest(query="patience", surah_filter=2, verse_filter=153,
+                                model_name="small-model", include_supplementary=True)
+
+    answer = asyncio.run(orchestrator.process_query(request)).answer
+    assert answer.split("\n\n") == ["[Quran 2:153]: exact verse", f"[Quran 2:1]: {texts[0]}"]
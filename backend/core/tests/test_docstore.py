@@ -0,0 +1,90 @@
+import json
+import pickle
+
+import pytest
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+
+from backend.core.docstore import (
+    MmapDocStore,
+    convert_langchain_index,
+    load_docstore,
+    write_docstore
+)
+
+DOCUMENTS = [
+    {
+        "content": "بِسْمِ اللَّهِ الرَّحْمَـٰنِ الرَّحِيمِ",
+        "metadata": {"source": "quran", "surah_num": 1, "surah_name": "الفاتحة", "verse_num": 1, "reference": "1:1"}
+    },
+    {
+        "content": "",
+        "metadata": {"source": "tafsir_ar-tafsir-muyassar", "surah_num": 2, "verse_num": 255, "reference": "2:255"}
+    },
+    {
+        "content": "No reference",
+        "metadata": {"source": "debug"}
+    }
+]
+
+
+def test_write_and_read_roundtrip(tmp_path):
+    store = MmapDocStore(write_docstore(DOCUMENTS, str(tmp_path / "docstore")))
+
+    assert len(store) == 3
+    assert store.get(0) == DOCUMENTS[0]
+    assert store.get(1) == DOCUMENTS[1]
+    assert store.get(2) == {"content": "No reference", "metadata": {"source": "debug", "reference": ""}}
+    assert store.get(3) is None
+    assert store.get(-1) is None
+    assert [doc["content"] for doc in store.get_many([2, 0])] == ["No reference", DOCUMENTS[0]["content"]]
+
+
+def test_empty_store(tmp_path):
+    store = MmapDocStore(write_docstore([], str(tmp_path / "docstore")))
+    assert len(store) == 0
+    assert list(store.iter_documents()) == []
+
+
+def test_convert_langchain_pickle(tmp_path):
+    ids = {0: "a", 1: "b"}
+    docstore = InMemoryDocstore({
+        "a": Document(page_content=DOCUMENTS[0]["content"], metadata=DOCUMENTS[0]["metadata"]),
+        "b": Document(page_content="second", metadata=DOCUMENTS[1]["metadata"]),
+    })
+    with open(tmp_path / "index.pkl", "wb") as f:
+        pickle.dump((docstore, ids), f)
+
+    store = load_docstore(str(tmp_path))
+    assert len(store) == 2
+    assert store.text(1) == "second"
+    assert store.metadata(0)["surah_name"] == "الفاتحة"
+
+
+def test_convert_legacy_docstore_json(tmp_path):
+    legacy = {"docstore": {"_dict": {
+        "1": {"text": "second", "metadata": {"source": "quran", "surah_number": 2, "verse": 3}},
+        "0": {"text": "first", "metadata": {"source": "quran", "surah_num": 1, "verse_num": 1}},
+    }}}
+    (tmp_path / "docstore.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    store = MmapDocStore(convert_langchain_index(str(tmp_path)))
+    assert [doc["content"] for doc in store.iter_documents()] == ["first", "second"]
+    assert store.metadata(1)["reference"] == "2:3"
+
+
+def test_missing_sources_raise(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_docstore(str(tmp_path))
+
+
+def test_rewrite_leaves_open_stores_readable(tmp_path):
+    path = str(tmp_path / "docstore")
+    old = MmapDocStore(write_docstore(DOCUMENTS, path))
+    old_text = old.text(0)
+
+    new = MmapDocStore(write_docstore([{"content": "x" * 10000, "metadata": {"source": "quran"}}], path))
+
+    assert old.text(0) == old_text and len(old) == 3
+    assert new.text(0) == "x" * 10000 and len(new) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["docstore"]
@@ -0,0 +1,54 @@
+import numpy as np
+import torch
+
+from backend.core.embeddings import CustomHuggingFaceEmbeddings, plan_length_batches
+
+
+def test_batches_respect_token_budget_and_cover_every_row():
+    lengths = [5, 50, 3, 40, 7, 100, 4]
+
+    batches = plan_length_batches(lengths, token_budget=100, max_batch_size=3)
+
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or len(batch) * max(lengths[row] for row in batch) <= 100
+    assert [lengths[row] for row in batches[0]] == [3, 4, 5]
+
+
+class WordTokenizer:
+    """One token per word; pads with zeros like a Hugging Face tokenizer."""
+
+    def __call__(self, texts, truncation=True, max_length=512):
+        ids = [[len(word) for word in text.split()][:max_length] for text in texts]
+        return {"input_ids": ids, "attention_mask": [[1] * len(row) for row in ids]}
+
+    def pad(self, encoded, return_tensors="pt"):
+        width = max(len(row) for row in encoded["input_ids"])
+        return {key: torch.tensor([row + [0] * (width - len(row)) for row in rows])
+                for key, rows in encoded.items()}
+
+
+class WidthModel:
+    """Token embedding = [word length, 1], so the mean depends on the words."""
+
+    def __init__(self):
+        self.widths = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.widths.append(input_ids.shape[1])
+        return (torch.stack([input_ids.float(), torch.ones_like(input_ids, dtype=torch.float)], dim=-1),)
+
+
+def test_embed_with_transformers_restores_input_order():
+    embeddings = CustomHuggingFaceEmbeddings.__new__(CustomHuggingFaceEmbeddings)
+    embeddings.tokenizer = WordTokenizer()
+    embeddings.model = WidthModel()
+    texts = ["a " * 30, "bb", "ccc ccc", "a " * 29]
+
+    vectors = embeddings.embed_with_transformers(texts, token_budget=64, max_batch_size=8)
+
+    expected = np.array([[1, 1], [2, 1], [3, 1], [1, 1]], dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    np.testing.assert_allclose(vectors, expected, rtol=1e-6)
+    assert embeddings.model.widths == [2, 30]  # {bb, ccc ccc} and the two long texts
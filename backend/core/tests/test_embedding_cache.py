@@ -0,0 +1,35 @@
+import numpy as np
+
+from backend.core.embedding_cache import EmbeddingCache, normalize_text
+
+
+def test_normalize_text_collapses_case_and_whitespace():
+    assert normalize_text("  What is  Surah\tAl-Fatiha? ") == "what is surah al-fatiha?"
+    assert EmbeddingCache.make_key("m", "A  b") == EmbeddingCache.make_key("m", "a b")
+    assert EmbeddingCache.make_key("m1", "a b") != EmbeddingCache.make_key("m2", "a b")
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path=path, max_memory_items=1)
+
+    assert cache.get("model", "question") is None
+    cache.put("model", "question", [0.5, 1.5])
+    np.testing.assert_array_equal(cache.get("model", "Question "), np.array([0.5, 1.5], dtype=np.float32))
+
+    # Evict from the LRU tier; the vector is still on disk
+    cache.put("model", "other", [1.0, 2.0])
+    assert cache.get("model", "question") is not None
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["disk_hits"] == 1
+    assert stats["hit_rate"] == 2 / 3
+    cache.close()
+
+    # A second process sees the persisted entries
+    reopened = EmbeddingCache(path=path)
+    assert reopened.get("model", "other").tolist() == [1.0, 2.0]
+    assert reopened.get("other-model", "other") is None
+    reopened.close()
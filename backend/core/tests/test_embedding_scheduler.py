@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+from backend.benchmarks.fake_embedding_server import FakeEmbeddingServer, fake_vector
+from backend.core.embedding_scheduler import EmbeddingRun, EmbeddingScheduler, RateLimiter, plan_token_batches
+from backend.core.incremental_index import build_incremental_index
+
+
+def _scheduler(server, **kwargs):
+    options = dict(concurrency=4, requests_per_minute=0, tokens_per_minute=0, max_batch_tokens=10,
+                   backoff_base=0.001, backoff_max=0.01)
+    options.update(kwargs)
+    return EmbeddingScheduler(
+        "text-embedding-3-small",
+        api_key="sk-test",
+        base_url="http://fake/v1",
+        http_client_factory=lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app)),
+        **options
+    )
+
+
+def test_token_batches_keep_order_and_limits():
+    assert plan_token_batches([4, 4, 4, 20, 1], max_batch_tokens=10, max_batch_size=8) == [[0, 1], [2], [3], [4]]
+    assert plan_token_batches([1] * 5, max_batch_tokens=100, max_batch_size=2) == [[0, 1], [2, 3], [4]]
+
+
+def test_scheduler_embeds_in_input_order_with_requests_in_flight():
+    server = FakeEmbeddingServer(dim=8, latency=0.05)
+    texts = [f"text number {i}" for i in range(20)]
+
+    run = _scheduler(server).embed(texts)
+
+    assert not run.failed
+    assert run.vectors.dtype == np.float32
+    np.testing.assert_allclose(run.vectors, np.vstack([fake_vector(text, 8) for text in texts]), rtol=1e-6)
+    assert run.requests == server.requests > 1
+    assert server.max_in_flight > 1
+
+
+def test_transient_errors_are_retried_and_persistent_ones_reported():
+    server = FakeEmbeddingServer(dim=8, error_rate=0.3, poison="broken", seed=1)
+    texts = [f"text number {i}" for i in range(20)] + ["broken text"]
+
+    run = _scheduler(server, max_retries=10).embed(texts)
+
+    assert run.retries > 0
+    assert list(run.failed) == [20]
+    assert run.succeeded.sum() == 20
+    np.testing.assert_allclose(run.vectors[0], fake_vector(texts[0], 8), rtol=1e-6)
+
+
+def test_rate_limit_responses_are_retried_after_the_server_delay():
+    server = FakeEmbeddingServer(dim=8, requests_per_minute=1)
+    server._accepted.append(time.monotonic() - 59.9)  # Budget used up for another 0.1s
+
+    run = _scheduler(server, concurrency=1).embed(["a"])
+
+    assert not run.failed
+    assert server.rate_limited == 1
+    assert (run.requests, run.retries) == (2, 1)
+
+
+def test_rate_limiter_spaces_requests_beyond_the_budget():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=0, period=0.2)
+
+    async def acquire_three():
+        start = asyncio.get_running_loop().time()
+        for _ in range(3):
+            await limiter.acquire(1)
+        return asyncio.get_running_loop().time() - start
+
+    assert asyncio.run(acquire_three()) >= 0.15
+
+
+class FlakyEmbeddings:
+    """Embeddings exposing ``embed_documents_run`` that fail chosen texts."""
+
+    model_name = "flaky"
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.embedded = []
+
+    def embed_documents_run(self, texts):
+        self.embedded.extend(texts)
+        vectors = np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+        failed = {row: "InternalServerError" for row, text in enumerate(texts) if text in self.failing}
+        return EmbeddingRun(vectors=vectors, failed=failed)
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def test_failed_chunks_are_left_out_and_retried_on_the_next_build(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    docs = [{"content": text, "metadata": {"source": "quran", "surah_num": 1, "verse_num": i + 1}}
+            for i, text in enumerate(["a", "bb", "ccc"])]
+
+    store, stats = build_incremental_index(docs, index_path, FlakyEmbeddings(failing=["bb"]))
+    assert (stats["embedded"], stats["failed"]) == (2, 1)
+    assert store.index.ntotal == 2
+
+    embeddings = FlakyEmbeddings(failing=[])
+    store, stats = build_incremental_index(docs, index_path, embeddings)
+    assert embeddings.embedded == ["bb"]
+    assert (stats["reused"], stats["embedded"], stats["failed"]) == (2, 1, 0)
+    assert store.index.ntotal == 3
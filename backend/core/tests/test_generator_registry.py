@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.agents.generator.agent import GeneratorAgent, GeneratorAgentRequest
+from backend.core import generator as generator_module
+from backend.core.generator import GeneratorRegistry
+from backend.core.metrics import GENERATOR_CHAINS_TOTAL
+
+
+def _count_builds(monkeypatch):
+    built = []
+
+    def create_answer_generator(model_name, temperature, max_tokens):
+        built.append(model_name)
+        return object()
+
+    monkeypatch.setattr(generator_module, "create_answer_generator", create_answer_generator)
+    return built
+
+
+def test_registry_reuses_chains_and_evicts_least_recently_used(monkeypatch):
+    built = _count_builds(monkeypatch)
+    hits, builds, evictions = (GENERATOR_CHAINS_TOTAL.value(result=r) for r in ("hit", "build", "evict"))
+    registry = GeneratorRegistry(max_size=2)
+
+    gpt35 = registry.get("gpt-3.5-turbo")
+    for _ in range(3):
+        assert registry.get("gpt-4-turbo") is registry.get("gpt-4-turbo")
+        assert registry.get("gpt-3.5-turbo", 0, 1000) is gpt35
+    registry.get("gpt-4o")
+
+    assert built == ["gpt-3.5-turbo", "gpt-4-turbo", "gpt-4o"]
+    assert len(registry) == 2
+    assert registry.get("gpt-3.5-turbo") is gpt35
+    assert GENERATOR_CHAINS_TOTAL.value(result="hit") - hits == 9
+    assert GENERATOR_CHAINS_TOTAL.value(result="build") - builds == 3
+    assert GENERATOR_CHAINS_TOTAL.value(result="evict") - evictions == 1
+
+
+def test_agent_uses_request_parameters_without_changing_its_defaults(monkeypatch):
+    built = _count_builds(monkeypatch)
+    monkeypatch.setattr(generator_module, "_generator_registry", GeneratorRegistry())
+    used = []
+    monkeypatch.setattr("backend.agents.generator.agent.generate_answer",
+                        lambda chain, context, query: used.append(chain) or "answer")
+    agent = GeneratorAgent()
+
+    async def ask(model_name):
+        request = GeneratorAgentRequest(query="q", context="", parameters={"model_name": model_name})
+        return await agent.process(request)
+
+    async def alternate():
+        return await asyncio.gather(*(ask(name) for name in ["gpt-4-turbo", "gpt-3.5-turbo"] * 4))
+
+    responses = asyncio.run(alternate())
+
+    assert [response.metadata["model"] for response in responses] == ["gpt-4-turbo", "gpt-3.5-turbo"] * 4
+    assert built == ["gpt-3.5-turbo", "gpt-4-turbo"]
+    assert len(set(map(id, used))) == 2
+    assert (agent.model_name, agent.generator) == ("gpt-3.5-turbo", used[1])
+
+
+def test_slow_build_does_not_block_other_keys(monkeypatch):
+    release = threading.Event()
+    built = []
+
+    def create_answer_generator(model_name, temperature, max_tokens):
+        built.append(model_name)
+        if model_name == "slow-model":
+            assert release.wait(5)
+        return object()
+
+    monkeypatch.setattr(generator_module, "create_answer_generator", create_answer_generator)
+    registry = GeneratorRegistry()
+    fast = registry.get("gpt-3.5-turbo")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        slow = [pool.submit(registry.get, "slow-model") for _ in range(2)]
+        while "slow-model" not in built:
+            time.sleep(0.01)
+        # Served while the slow chain is still being built
+        assert pool.submit(registry.get, "gpt-3.5-turbo").result(timeout=1) is fast
+        assert pool.submit(registry.get, "gpt-4o").result(timeout=1) is not fast
+        release.set()
+        assert slow[0].result(timeout=5) is slow[1].result(timeout=5)
+
+    assert built == ["gpt-3.5-turbo", "slow-model", "gpt-4o"]
@@ -0,0 +1,54 @@
+from langchain_core.embeddings import Embeddings
+
+from backend.core.docstore import MmapDocStore
+from backend.core.incremental_index import build_incremental_index
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds text by length and records every text it was asked to embed."""
+
+    model_name = "counting"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def _docs(*texts):
+    return [{"content": text, "metadata": {"source": "quran", "surah_num": 1, "verse_num": i + 1}}
+            for i, text in enumerate(texts)]
+
+
+def test_rebuild_embeds_only_the_diff(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    embeddings = CountingEmbeddings()
+    build_incremental_index(_docs("a", "bb", "ccc"), index_path, embeddings)
+
+    embeddings.embedded.clear()
+    store, stats = build_incremental_index(_docs("a", "ccc", "dddd"), index_path, embeddings)
+
+    assert embeddings.embedded == ["dddd"]
+    assert (stats["reused"], stats["embedded"], stats["removed"]) == (2, 1, 1)
+    assert store.index.ntotal == 3
+    assert store.index.reconstruct(2).tolist() == [4.0, 1.0]
+    assert MmapDocStore(index_path + "/docstore").text(1) == "ccc"
+
+
+def test_model_change_or_full_rebuild_re_embeds_everything(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    build_incremental_index(_docs("a", "bb"), index_path, CountingEmbeddings())
+
+    other = CountingEmbeddings()
+    other.model_name = "other"
+    build_incremental_index(_docs("a", "bb"), index_path, other)
+    assert other.embedded == ["a", "bb"]
+
+    other.embedded.clear()
+    build_incremental_index(_docs("a", "bb"), index_path, other, full_rebuild=True)
+    assert other.embedded == ["a", "bb"]
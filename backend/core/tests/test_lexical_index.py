@@ -0,0 +1,80 @@
+import faiss
+import numpy as np
+
+from backend.core.docstore import MmapDocStore, write_docstore
+from backend.core.lexical_index import (
+    LEXICAL_INDEX_FILENAME,
+    BM25Index,
+    load_lexical_index,
+    reciprocal_rank_fusion,
+    tokenize
+)
+from backend.core.vector_search import hybrid_search
+
+VERSES = [
+    "بِسْمِ اللَّهِ الرَّحْمَـٰنِ الرَّحِيمِ",
+    "الْحَمْدُ لِلَّهِ رَبِّ الْعَالَمِينَ",
+    "وَاسْتَعِينُوا بِالصَّبْرِ وَالصَّلَاةِ",
+    "إِنَّ اللَّهَ مَعَ الصَّابِرِينَ",
+    "وَأَقِيمُوا الصَّلَاةَ وَآتُوا الزَّكَاةَ",
+]
+
+
+def _docstore(tmp_path):
+    documents = [
+        {"content": text, "metadata": {"source": "quran", "surah_num": 2 if i >= 2 else 1, "verse_num": i + 1}}
+        for i, text in enumerate(VERSES)
+    ]
+    return MmapDocStore(write_docstore(documents, str(tmp_path / "docstore")))
+
+
+def test_tokenize_normalizes_arabic_spelling_and_article():
+    assert tokenize("الرَّحْمَـٰنِ") == tokenize("رحمن") == ["رحمن"]
+    assert tokenize("وَالصَّلَاةِ") == tokenize("صلاه")
+    assert tokenize("اللَّهِ") == ["الله"]
+    assert tokenize("Patience, PATIENCE") == ["patience", "patience"]
+
+
+def test_bm25_ranks_matching_rows_and_applies_row_filter():
+    index = BM25Index.build(VERSES)
+
+    rows, scores = index.search("الصلاة", k=5)
+    assert sorted(rows.tolist()) == [2, 4]
+    assert np.all(np.diff(scores) <= 0)
+
+    rows, _ = index.search("الصلاة", k=5, row_ids=np.array([4]))
+    assert rows.tolist() == [4]
+    assert index.search("unknown words", k=5)[0].size == 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    rows, scores = reciprocal_rank_fusion([np.array([7, 3, 1]), np.array([3, 9])], k=60)
+
+    assert rows.tolist() == [3, 7, 9, 1]
+    assert scores[0] == 1 / 62 + 1 / 61
+
+
+def test_lexical_index_is_cached_and_rebuilt_when_docstore_changes(tmp_path):
+    docstore = _docstore(tmp_path)
+    first = load_lexical_index(docstore)
+    assert (tmp_path / "docstore" / LEXICAL_INDEX_FILENAME).exists()
+
+    cached = load_lexical_index(docstore, build_if_missing=False)
+    assert cached.vocabulary == first.vocabulary
+    np.testing.assert_array_equal(cached.weights, first.weights)
+
+    write_docstore([{"content": "الصبر", "metadata": {"source": "quran"}}], docstore.path)
+    rebuilt = load_lexical_index(MmapDocStore(docstore.path))
+    assert len(rebuilt) == 1
+
+
+def test_hybrid_search_surfaces_keyword_matches_the_vectors_miss(tmp_path):
+    docstore = _docstore(tmp_path)
+    index = faiss.IndexFlatL2(len(VERSES))
+    index.add(np.eye(len(VERSES), dtype=np.float32))
+    # The query vector sits on row 0; the keywords match row 3
+    results = hybrid_search(index, docstore, BM25Index.build(VERSES), np.eye(len(VERSES), dtype=np.float32)[0],
+                            "الصابرين", k=2)
+
+    assert {doc["metadata"]["verse_num"] for doc in results} == {1, 4}
+    assert results[0]["score"] >= results[1]["score"]
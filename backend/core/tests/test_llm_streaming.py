@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.core.llm_client import UnifiedLLMChat
+
+
+def _chunk(content, finish_reason=None):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=finish_reason)])
+
+
+CHUNKS = [_chunk(""), _chunk("Al-"), _chunk("Fatiha"), _chunk(None, "stop")]
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return iter(CHUNKS)
+
+
+class FakeAsyncCompletions:
+    async def create(self, **kwargs):
+        async def stream():
+            for chunk in CHUNKS:
+                yield chunk
+        return stream()
+
+
+def _chat_model():
+    completions = FakeCompletions()
+    client = SimpleNamespace(
+        client=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+        async_client=SimpleNamespace(chat=SimpleNamespace(completions=FakeAsyncCompletions()))
+    )
+    return UnifiedLLMChat.construct(model_name="test-model", temperature=0, max_tokens=10, openai_client=client), completions
+
+
+def test_stream_yields_tokens_as_they_arrive():
+    model, completions = _chat_model()
+
+    chunks = list(model.stream("Which surah opens the Quran?"))
+
+    assert [chunk.content for chunk in chunks] == ["Al-", "Fatiha", ""]
+    assert completions.calls[0]["stream"] is True
+    assert completions.calls[0]["messages"] == [{"role": "user", "content": "Which surah opens the Quran?"}]
+
+
+def test_astream_yields_tokens_as_they_arrive():
+    model, _ = _chat_model()
+
+    async def collect():
+        return [chunk.content async for chunk in model.astream("Which surah opens the Quran?")]
+
+    assert asyncio.run(collect()) == ["Al-", "Fatiha", ""]
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from backend.core.concurrency import run_blocking
+from backend.core.metrics import MetricsRegistry, ServerTimingMiddleware, STAGE_SECONDS, stage_timer
+
+
+def test_histogram_and_counter_render_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo latency", ["stage"], buckets=(0.1, 1.0))
+    fallbacks = registry.counter("demo_total", "Demo fallbacks", ["path"])
+    latency.observe(0.05, stage="search")
+    latency.observe(0.5, stage="search")
+    latency.observe(5.0, stage="search")
+    fallbacks.inc(path='say "hi"')
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="search",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="search",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="search",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="search"} 3' in text
+    assert 'demo_total{path="say \\"hi\\""} 1' in text
+    assert registry.histogram("demo_seconds", "Demo latency", ["stage"]) is latency
+
+
+def test_server_timing_header_includes_stages_run_on_the_thread_pool():
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    def search():
+        with stage_timer("faiss_search"):
+            time.sleep(0.01)
+        return "done"
+
+    @app.get("/ask")
+    async def ask():
+        return {"result": await run_blocking(search)}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ask")
+
+    before = STAGE_SECONDS.count(stage="faiss_search")
+    response = asyncio.run(main())
+
+    timings = dict(entry.split(";dur=") for entry in response.headers["server-timing"].split(", "))
+    assert set(timings) == {"faiss_search", "total"}
+    assert float(timings["faiss_search"]) >= 10
+    assert float(timings["total"]) >= float(timings["faiss_search"])
+    assert STAGE_SECONDS.count(stage="faiss_search") == before + 1
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend.agents.orchestrator import A2AOrchestrator, QuranQueryRequest
+from backend.core.metrics import ORCHESTRATOR_STEP_FAILURES_TOTAL
+from backend.core.singleflight import SingleFlight
+
+
+class SlowAgent:
+    def __init__(self, delay, response):
+        self.delay = delay
+        self.response = response
+
+    async def process(self, request):
+        await asyncio.sleep(self.delay)
+        return self.response
+
+
+class SlowRetrieverAgent(SlowAgent):
+    def select_context(self, query, documents, model_name):
+        return documents
+
+
+class ContextEchoGenerator:
+    async def process(self, request):
+        return SimpleNamespace(answer=request.context)
+
+
+class FakeReferenceIndex:
+    def lookup(self, surah, verse):
+        return [{"content": "verse text", "metadata": {"source": "quran", "reference": f"{surah}:{verse}"}}]
+
+
+def _orchestrator(tafsir_delay, retrieval_delay, **step_timeouts):
+    orchestrator = A2AOrchestrator.__new__(A2AOrchestrator)
+    orchestrator.step_timeouts = {"direct_tafsir": 0, "reference_lookup": 0, "retrieval": 0, **step_timeouts}
+    orchestrator.tafsir_tool_agent = SlowAgent(tafsir_delay, SimpleNamespace(
+        tafsir_name="Muyassar", surah=2, verse=153, tafsir_text="tafsir text"))
+    orchestrator.retriever_agent = SlowRetrieverAgent(retrieval_delay, SimpleNamespace(
+        formatted_context="[Quran 2:45]: retrieved",
+        documents=[{"content": "retrieved", "metadata": {"source": "quran", "reference": "2:45"}}]))
+    orchestrator.generator_agent = ContextEchoGenerator()
+    orchestrator.reference_index = FakeReferenceIndex()
+    orchestrator.single_flight = SingleFlight("orchestrator")
+    return orchestrator
+
+
+REQUEST = QuranQueryRequest(query="patience", surah_filter=2, verse_filter=153,
+                            use_direct_tafsir=True, include_supplementary=True)
+
+
+def test_independent_steps_run_concurrently():
+    orchestrator = _orchestrator(tafsir_delay=0.3, retrieval_delay=0.3)
+
+    start = time.perf_counter()
+    response = asyncio.run(orchestrator.process_query(REQUEST))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert [source["reference"] for source in response.sources] == ["2:153", "2:153", "2:45"]
+    assert response.direct_tafsir["text"] == "tafsir text"
+    assert response.answer == "[Quran 2:153]: verse text\n\n[Quran 2:45]: retrieved"
+
+
+def test_slow_step_times_out_without_delaying_the_rest():
+    timeouts = ORCHESTRATOR_STEP_FAILURES_TOTAL.value(step="direct_tafsir", reason="timeout")
+    orchestrator = _orchestrator(tafsir_delay=5, retrieval_delay=0.05, direct_tafsir=0.2)
+
+    start = time.perf_counter()
+    response = asyncio.run(orchestrator.process_query(REQUEST))
+
+    assert time.perf_counter() - start < 1
+    assert response.direct_tafsir is None
+    assert [source["reference"] for source in response.sources] == ["2:153", "2:45"]
+    assert ORCHESTRATOR_STEP_FAILURES_TOTAL.value(step="direct_tafsir", reason="timeout") == timeouts + 1
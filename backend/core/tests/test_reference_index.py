@@ -0,0 +1,55 @@
+import json
+
+from backend.core.data_processing import load_tafsir_data
+from backend.core.reference_index import build_reference_index
+
+
+def _write_data(tmp_path):
+    quran = {"surahs": [
+        {"number": 1, "name": "الفاتحة", "verses": [{"number": 1, "text": "v1:1"}, {"number": 2, "text": "v1:2"}]},
+        {"number": 2, "name": "البقرة", "verses": [{"number": 1, "text": "v2:1"}]},
+    ]}
+    tafsir = [
+        {"reference": "1:None", "explanation": "t1:1"},
+        {"reference": "1:None", "explanation": "t1:2"},
+        {"reference": "2:None", "explanation": "t2:1"},
+    ]
+    (tmp_path / "quran.json").write_text(json.dumps(quran), encoding="utf-8")
+    tafsir_dir = tmp_path / "tafsirs"
+    tafsir_dir.mkdir()
+    (tafsir_dir / "ar-test.json").write_text(json.dumps(tafsir), encoding="utf-8")
+    return str(tmp_path / "quran.json"), str(tafsir_dir)
+
+
+def test_tafsir_records_without_verse_numbers_are_numbered_in_order(tmp_path):
+    _, tafsir_dir = _write_data(tmp_path)
+
+    documents = load_tafsir_data(tafsir_dir)
+
+    assert [doc["metadata"]["reference"] for doc in documents] == ["1:1", "1:2", "2:1"]
+    assert documents[1]["content"] == "t1:2"
+
+
+def test_lookup_returns_quran_then_tafsir(tmp_path):
+    reference_index = build_reference_index(*_write_data(tmp_path))
+
+    results = reference_index.lookup(1, 2)
+
+    assert [doc["content"] for doc in results] == ["v1:2", "t1:2"]
+    assert results[0]["metadata"]["source"] == "quran"
+    assert reference_index.lookup(1, 2, sources=["tafsir_ar-test"])[0]["content"] == "t1:2"
+    assert reference_index.lookup(9, 9) == []
+    assert (2, 1) in reference_index
+    assert len(reference_index) == 3
+
+
+def test_unnumbered_tafsir_records_follow_string_sorted_verse_order(tmp_path):
+    # Editions list verses of a surah as "1", "10", "11", "12", "2", ..., "9"
+    order = sorted(range(1, 13), key=str)
+    tafsir = [{"reference": "3:None", "explanation": f"t3:{verse}"} for verse in order]
+    (tmp_path / "ar-test.json").write_text(json.dumps(tafsir), encoding="utf-8")
+
+    documents = load_tafsir_data(str(tmp_path))
+
+    assert all(doc["content"] == f"t{doc['metadata']['reference']}" for doc in documents)
+    assert {doc["metadata"]["verse_num"] for doc in documents} == set(range(1, 13))
@@ -0,0 +1,70 @@
+import numpy as np
+import torch
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+from backend.core import retriever as retriever_module
+from backend.core.reranker import CrossEncoderCompressor, CrossEncoderReranker
+
+WORDS = ["patience", "prayer", "charity", "fasting", "mercy", "musa", "pharaoh", "sea"]
+
+
+def _tiny_reranker(tmp_path):
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    torch.manual_seed(0)
+    model = BertForSequenceClassification(BertConfig(
+        vocab_size=len(WORDS) + 5, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, num_labels=1
+    ))
+    return CrossEncoderReranker(tokenizer=BertTokenizerFast(str(vocab)), model=model, onnx_path=None)
+
+
+def test_batched_scores_match_single_pair_scores(tmp_path):
+    reranker = _tiny_reranker(tmp_path)
+    passages = ["patience", "musa pharaoh sea sea sea", "prayer charity fasting"]
+
+    batched = reranker.score("patience prayer", passages)
+    single = np.concatenate([reranker.score("patience prayer", [passage]) for passage in passages])
+
+    assert batched.shape == (3,)
+    np.testing.assert_allclose(batched, single, atol=1e-5)
+
+
+def test_compressor_keeps_top_n_by_score(tmp_path):
+    reranker = _tiny_reranker(tmp_path)
+    documents = [Document(page_content=" ".join(WORDS[i:i + 3]), metadata={"row": i}) for i in range(6)]
+
+    kept = CrossEncoderCompressor(reranker=reranker, top_n=2).compress_documents(documents, "mercy sea")
+
+    scores = reranker.score("mercy sea", [doc.page_content for doc in documents])
+    assert [doc.metadata["row"] for doc in kept] == np.argsort(-scores, kind="stable")[:2].tolist()
+    assert kept[0].metadata["rerank_score"] >= kept[1].metadata["rerank_score"]
+    assert "rerank_score" not in documents[0].metadata
+
+
+class FakeVectorStore:
+    def __init__(self, num_docs=9):
+        self.documents = [Document(page_content=WORDS[i % len(WORDS)], metadata={"row": i}) for i in range(num_docs)]
+
+    def as_retriever(self, search_type, search_kwargs):
+        documents = self.documents[:search_kwargs["k"]]
+
+        class ListRetriever(BaseRetriever):
+            def _get_relevant_documents(self, query, *, run_manager=None):
+                return list(documents)
+
+        return ListRetriever()
+
+
+def test_enhanced_retriever_reranks_candidates_or_falls_back(tmp_path, monkeypatch):
+    reranker = _tiny_reranker(tmp_path)
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: reranker)
+    reranked = retriever_module.create_enhanced_retriever(FakeVectorStore(), k=2).get_relevant_documents("sea")
+    assert len(reranked) == 2
+    assert all("rerank_score" in doc.metadata for doc in reranked)
+
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: None)
+    fallback = retriever_module.create_enhanced_retriever(FakeVectorStore(), k=2).get_relevant_documents("sea")
+    assert [doc.metadata["row"] for doc in fallback] == [0, 1]
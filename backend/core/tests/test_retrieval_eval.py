@@ -0,0 +1,60 @@
+import numpy as np
+
+from backend.benchmarks.retrieval_eval import compare_reports, load_golden_questions, recall_at_k, reciprocal_rank
+from backend.benchmarks.retrieval_eval.metrics import ranked_references, summarize_stage
+from backend.benchmarks.retrieval_eval.offline import EchoExtractorChatModel, NgramHashEmbeddings
+
+
+def _doc(surah, verse, source="quran"):
+    return {"content": "", "metadata": {"source": source, "surah_num": surah, "verse_num": verse}}
+
+
+def test_ranked_references_merge_verse_and_tafsir():
+    documents = [_doc(2, 255), _doc(2, 255, "tafsir_ar-tafsir-muyassar"), _doc(3, 2)]
+
+    assert ranked_references(documents) == ["2:255", "3:2"]
+
+
+def test_recall_and_reciprocal_rank():
+    ranked = ["1:1", "2:255", "3:2"]
+
+    assert recall_at_k(ranked, ["2:255", "9:9"], 1) == 0.0
+    assert recall_at_k(ranked, ["2:255", "9:9"], 2) == 0.5
+    assert reciprocal_rank(ranked, ["3:2", "2:255"]) == 0.5
+    assert reciprocal_rank(ranked, ["9:9"]) == 0.0
+
+
+def test_summary_and_regression_check():
+    results = [
+        {"language": "en", "expected": ["1:1"], "ranked": ["1:1"], "seconds": 0.001},
+        {"language": "ar", "expected": ["2:2"], "ranked": ["1:1", "2:2"], "seconds": 0.003},
+    ]
+    summary = summarize_stage(results, ks=(1, 5))
+
+    assert summary["recall@1"] == 0.5 and summary["mrr"] == 0.75
+    assert summary["by_language"]["ar"]["recall@5"] == 1.0
+    assert summary["latency"]["p50_ms"] == 2.0
+
+    worse = {**summary, "recall@1": 0.25, "latency": {**summary["latency"], "p50_ms": 4.0}}
+    regressions = compare_reports({"stages": {"api": summary}}, {"stages": {"api": worse}})
+    assert len(regressions) == 2
+    assert compare_reports({"stages": {"api": summary}}, {"stages": {"api": summary}}) == []
+
+
+def test_golden_questions_are_well_formed():
+    questions = load_golden_questions()
+
+    assert len({item["id"] for item in questions}) == len(questions)
+    for item in questions:
+        assert item["language"] in {"en", "ar"} and item["question"]
+        assert all(len(reference.split(":")) == 2 for reference in item["expected"])
+
+
+def test_offline_embeddings_and_stub_llm():
+    embeddings = NgramHashEmbeddings(dim=64)
+    verse = embeddings.embed_query_array("لَا إِكْرَاهَ فِي الدِّينِ")
+    question = embeddings.embed_query_array("لا إكراه في الدين")
+
+    assert np.allclose(verse, question)  # Diacritics and letter variants are normalized away
+    assert abs(np.linalg.norm(verse) - 1.0) < 1e-5
+    assert EchoExtractorChatModel().invoke("> Context:\n>>>\nthe verse\n>>>\nExtracted").content == "the verse"
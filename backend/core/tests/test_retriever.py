@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.core import retriever as retriever_module
+from backend.core.retriever import RetrieverPool, retrieve_relevant_context
+from backend.core.vector_search import PrefilteredFAISS
+
+
+class OneHotEmbeddings(Embeddings):
+    """Embeds "doc i" as the i-th unit vector and every query as their mean."""
+
+    def __init__(self, num_docs):
+        self.num_docs = num_docs
+
+    def embed_documents(self, texts):
+        return [np.eye(self.num_docs)[int(text.split()[1])].tolist() for text in texts]
+
+    def embed_query(self, text):
+        return [1.0 / self.num_docs] * self.num_docs
+
+
+class KeepOrderReranker:
+    def rerank(self, query, documents, top_n):
+        return [(doc, 0.0) for doc in documents[:top_n]]
+
+
+def _store(num_docs=12):
+    texts = [f"doc {i}" for i in range(num_docs)]
+    metadatas = [{"source": "quran", "surah_num": 1 + i % 2, "verse_num": i + 1} for i in range(num_docs)]
+    return PrefilteredFAISS.from_texts(texts, OneHotEmbeddings(num_docs), metadatas=metadatas)
+
+
+def test_shared_pipeline_serves_concurrent_filtered_requests(monkeypatch):
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: KeepOrderReranker())
+    store = _store()
+    pipeline = RetrieverPool(store).get(k=2)
+
+    def retrieve(surah):
+        return surah, retrieve_relevant_context(pipeline, "query", {"surah": surah})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(retrieve, [1, 2] * 20))
+
+    for surah, documents in results:
+        assert len(documents) == 2
+        assert {doc.metadata["surah_num"] for doc in documents} == {surah}
+    assert pipeline.base_retriever.search_kwargs == {"k": 6}
+    assert all("query" not in doc.metadata for doc in store.docstore._dict.values())
+
+
+def test_pool_builds_each_key_once_and_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: KeepOrderReranker())
+    built = []
+    create = retriever_module.create_enhanced_retriever
+    monkeypatch.setattr(retriever_module, "create_enhanced_retriever",
+                        lambda *args, **kwargs: built.append(kwargs["k"]) or create(*args, **kwargs))
+    pool = RetrieverPool(_store(), max_size=2)
+
+    default = pool.get()
+    assert pool.get(5, True) is default
+    pool.get(3)
+    pool.get()
+    pool.get(7)
+
+    assert built == [5, 3, 7]
+    assert len(pool) == 2
+    assert pool.get() is default
+    assert pool.get(3) is not None and built == [5, 3, 7, 3]
+
+
+def test_slow_build_does_not_block_other_keys(monkeypatch):
+    monkeypatch.setattr(retriever_module, "get_reranker", lambda: KeepOrderReranker())
+    release = threading.Event()
+    built = []
+    create = retriever_module.create_enhanced_retriever
+
+    def slow_create(*args, **kwargs):
+        built.append(kwargs["k"])
+        if kwargs["k"] == 9:
+            assert release.wait(5)
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(retriever_module, "create_enhanced_retriever", slow_create)
+    pool = RetrieverPool(_store())
+    default = pool.get()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        slow = [executor.submit(pool.get, 9) for _ in range(2)]
+        while 9 not in built:
+            time.sleep(0.01)
+        # Served while the k=9 pipeline is still being built
+        assert executor.submit(pool.get).result(timeout=1) is default
+        assert executor.submit(pool.get, 3).result(timeout=1) is not default
+        release.set()
+        assert slow[0].result(timeout=5) is slow[1].result(timeout=5)
+
+    assert built == [5, 9, 3]
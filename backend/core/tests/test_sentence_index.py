@@ -0,0 +1,80 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.core.sentence_index import GAP_MARKER, build_sentence_index, load_sentence_index, split_sentences
+
+WORDS = ["patience", "prayer", "charity", "musa", "sea"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Embeds text as keyword counts and records every text it was asked to embed."""
+
+    model_name = "keywords"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.count(word)) for word in WORDS] + [0.1]
+
+
+def test_split_sentences_on_arabic_and_latin_punctuation():
+    text = "بسم الله الرحمن الرحيم؛ الحمد لله رب العالمين. Short. Musa crossed the sea with his people"
+    spans = split_sentences(text, min_chars=10)
+
+    assert [text[start:end] for start, end in spans] == [
+        "بسم الله الرحمن الرحيم؛",
+        "الحمد لله رب العالمين. Short.",
+        "Musa crossed the sea with his people"
+    ]
+
+
+PASSAGES = [
+    "Be steadfast in prayer. Give charity to the poor. Musa parted the sea.",
+    "Patience is rewarded. Musa went to the sea. Charity purifies wealth.",
+    "A single sentence about prayer"
+]
+
+
+def test_compress_keeps_closest_sentences_in_order(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    embeddings = KeywordEmbeddings()
+    build_sentence_index(PASSAGES, index_path, embeddings, min_chars=5)
+    index = load_sentence_index(index_path)
+    assert (len(index), index.num_sentences, index.model_id) == (3, 7, "keywords")
+
+    documents = [{"content": text, "metadata": {"reference": str(row)}, "row": row} for row, text in enumerate(PASSAGES)]
+    documents.append({"content": "Verse looked up by reference.", "metadata": {"reference": "2:255"}})
+    compressed = index.compress(embeddings.embed_query("musa sea"), documents, max_sentences=1)
+
+    assert [doc["content"] for doc in compressed] == [
+        f"{GAP_MARKER} Musa parted the sea.",
+        f"{GAP_MARKER} Musa went to the sea. {GAP_MARKER}",
+        PASSAGES[2],
+        "Verse looked up by reference."
+    ]
+    assert [doc["metadata"] for doc in compressed] == [doc["metadata"] for doc in documents]
+    assert documents[0]["content"] == PASSAGES[0]
+
+
+def test_rebuild_embeds_only_new_sentences(tmp_path):
+    index_path = str(tmp_path / "faiss_index")
+    build_sentence_index(PASSAGES[:2], index_path, KeywordEmbeddings(), min_chars=5)
+    serving = load_sentence_index(index_path)
+    serving_vectors = np.array(serving.vectors)
+
+    embeddings = KeywordEmbeddings()
+    stats = build_sentence_index(PASSAGES[1:], index_path, embeddings, min_chars=5,
+                                 chunk_vectors=[None, embeddings.embed_query(PASSAGES[2])])
+
+    # The index opened before the rebuild still reads its own files
+    np.testing.assert_array_equal(serving.vectors, serving_vectors)
+    assert embeddings.embedded == []
+    assert (stats["reused"], stats["from_chunks"], stats["embedded"]) == (3, 1, 0)
+    # A stale index (different chunk text at the same row) leaves the passage whole
+    stale = {"content": "Patience is rewarded.", "metadata": {}, "row": 0}
+    assert load_sentence_index(index_path).compress(embeddings.embed_query("sea"), [stale]) == [stale]
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.core.metrics import SINGLEFLIGHT_TOTAL
+from backend.core.singleflight import SingleFlight, normalize_question
+
+
+def test_identical_calls_share_one_computation():
+    flight = SingleFlight("test_shared")
+    calls = []
+
+    async def answer(question):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return object()
+
+    async def main():
+        keys = [normalize_question(q) for q in ["What is patience?", "what is  PATIENCE?", "Who was Musa?"] * 4]
+        results = await asyncio.gather(*(flight.do(key, lambda key=key: answer(key)) for key in keys))
+        assert len(flight) == 0
+        again, shared = await flight.do(keys[0], lambda: answer(keys[0]))
+        return results, again, shared
+
+    results, again, shared = asyncio.run(main())
+
+    assert calls == ["what is patience?", "who was musa?", "what is patience?"]
+    assert len({id(result) for result, _ in results}) == 2
+    assert [shared for _, shared in results].count(False) == 2
+    assert again is not results[0][0] and not shared
+    assert SINGLEFLIGHT_TOTAL.value(name="test_shared", result="leader") == 3
+    assert SINGLEFLIGHT_TOTAL.value(name="test_shared", result="coalesced") == 10
+
+
+def test_errors_reach_every_waiter_and_free_the_key():
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+
+    assert [type(error) for error in errors] == [ValueError] * 3
+    assert len(flight) == 0
+
+
+def test_cancelled_caller_does_not_cancel_work_others_wait_for():
+    flight = SingleFlight("test_cancel")
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "answer"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("q", work))
+        follower = asyncio.ensure_future(flight.do("q", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == ("answer", True)
+
+        alone = asyncio.ensure_future(flight.do("r", work))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(main())
+    assert finished == [True]
+
+
+def test_calls_on_different_event_loops_do_not_share_tasks():
+    flight = SingleFlight("test_loops")
+    started = threading.Barrier(2)
+
+    async def answer():
+        await asyncio.sleep(0.05)
+        return threading.get_ident()
+
+    async def ask():
+        started.wait(5)
+        return await flight.do("q", answer)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = [future.result(timeout=5) for future in [pool.submit(asyncio.run, ask()) for _ in range(2)]]
+
+    assert [shared for _, shared in results] == [False, False]
+    assert results[0][0] != results[1][0]
+    assert len(flight) == 0
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from backend.agents.tools import TafsirLookupRequest, TafsirToolAgent
+from backend.core.tafsir_store import get_tafsir_store, load_tafsir_store, readable_tafsir_name
+
+
+def _write_tafsirs(tmp_path):
+    tafsir = [
+        {"reference": "1:None", "explanation": "t1:1"},
+        {"reference": "1:None", "explanation": "t1:2"},
+        {"reference": "1:None", "explanation": "t1:3"},
+        {"reference": "2:None", "explanation": "t2:1"},
+    ]
+    (tmp_path / "ar-tafsir-test.json").write_text(json.dumps(tafsir), encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_store_lookups(tmp_path):
+    store = load_tafsir_store(_write_tafsirs(tmp_path))
+
+    assert store.tafsir_ids == ["ar-tafsir-test"]
+    assert store.get("ar-tafsir-test", 1, 2) == "t1:2"
+    assert store.get("ar-tafsir-test", 1, 9) is None
+    assert store.get("missing", 1, 1) is None
+    assert store.get_range("ar-tafsir-test", 1, 2, 5) == [(2, "t1:2"), (3, "t1:3")]
+    assert len(store) == 4
+    assert readable_tafsir_name("ar-tafsir-test") == "Tafsir Test"
+
+
+def test_store_is_shared_per_directory(tmp_path):
+    tafsir_dir = _write_tafsirs(tmp_path)
+
+    assert get_tafsir_store(tafsir_dir) is get_tafsir_store(tafsir_dir + "/")
+
+
+def test_agent_reads_from_store(tmp_path):
+    agent = TafsirToolAgent(tafsirs_dir=_write_tafsirs(tmp_path))
+
+    single = asyncio.run(agent.process(TafsirLookupRequest(surah=1, verse=3)))
+    ranged = asyncio.run(agent.process(TafsirLookupRequest(surah=1, verse=1, end_verse=2)))
+
+    assert single.tafsir_text == "t1:3"
+    assert single.tafsir_name == "Tafsir Test"
+    assert ranged.tafsir_text == "[1:1] t1:1\n\n[1:2] t1:2"
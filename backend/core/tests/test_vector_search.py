@@ -0,0 +1,171 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from backend.core.ann_index import apply_search_params
+from backend.core.docstore import MmapDocStore, write_docstore
+from backend.core.vector_search import (
+    MetadataIndex,
+    PrefilteredFAISS,
+    batch_retrieve,
+    embed_documents_array,
+    embed_query_array,
+    parse_filter,
+    search_subset,
+    search_vectors
+)
+
+
+class FixedEmbeddings(Embeddings):
+    """Maps each known text onto a fixed vector."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def _build(tmp_path, num_docs=6):
+    vectors = np.eye(num_docs, dtype=np.float32)
+    index = faiss.IndexFlatL2(num_docs)
+    index.add(vectors)
+    documents = [
+        {"content": f"doc {i}", "metadata": {"source": "quran", "surah_num": 1, "verse_num": i + 1}}
+        for i in range(num_docs)
+    ]
+    return index, MmapDocStore(write_docstore(documents, str(tmp_path / "docstore"))), vectors
+
+
+def test_search_vectors_maps_rows_per_query(tmp_path):
+    index, docstore, vectors = _build(tmp_path)
+
+    results = search_vectors(index, docstore, vectors[[4, 1]], k=2)
+
+    assert [doc["content"] for doc in results[0]][0] == "doc 4"
+    assert [doc["content"] for doc in results[1]][0] == "doc 1"
+    assert results[0][0]["score"] == 0.0
+    assert results[0][0]["metadata"]["reference"] == "1:5"
+
+
+def test_search_vectors_drops_missing_neighbours(tmp_path):
+    index, docstore, vectors = _build(tmp_path, num_docs=3)
+
+    results = search_vectors(index, docstore, vectors[0], k=10)
+
+    assert len(results) == 1
+    assert len(results[0]) == 3
+
+
+def test_batch_retrieve_uses_one_embedding_call(tmp_path):
+    index, docstore, vectors = _build(tmp_path)
+    embeddings = FixedEmbeddings({"a": vectors[2].tolist(), "b": vectors[5].tolist()})
+
+    results = batch_retrieve(embeddings, index, docstore, ["a", "b"], k=1)
+
+    assert [[doc["content"] for doc in docs] for docs in results] == [["doc 2"], ["doc 5"]]
+    assert batch_retrieve(embeddings, index, docstore, [], k=1) == []
+
+
+def test_metadata_index_rows_for():
+    metadata_index = MetadataIndex(np.array([2, 1, 2, 3, 1, 2]), np.array([1, 1, 2, 1, 2, 1]))
+
+    assert metadata_index.rows_for() is None
+    assert metadata_index.rows_for(surah=2).tolist() == [0, 2, 5]
+    assert metadata_index.rows_for(surah=2, verse=1).tolist() == [0, 5]
+    assert metadata_index.rows_for(surah=9).tolist() == []
+    assert metadata_index.rows_for(verse=2).tolist() == [2, 4]
+
+
+def test_parse_filter_accepts_all_key_spellings():
+    assert parse_filter({"surah": 2, "verse": 255}) == (2, 255, {})
+    assert parse_filter({"surah_num": "2", "source": "quran"}) == (2, None, {"source": "quran"})
+    assert parse_filter(None) == (None, None, {})
+
+
+@pytest.mark.parametrize("factory", ["Flat", "HNSW8", "IVF4,Flat"])
+def test_search_subset_returns_k_filtered_rows(factory):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((400, 8)).astype(np.float32)
+    index = faiss.index_factory(8, factory)
+    index.train(vectors)
+    index.add(vectors)
+    row_ids = np.arange(3, 400, 7)
+    if factory.startswith("IVF"):
+        with pytest.raises(RuntimeError):
+            search_subset(index, vectors[[10]], row_ids, k=5)  # Searches never build the direct map
+    apply_search_params(index)
+
+    distances, labels = search_subset(index, vectors[[10]], row_ids, k=5)
+
+    assert set(labels[0]) <= set(row_ids)
+    assert len(set(labels[0])) == 5
+    assert np.all(np.diff(distances[0]) >= 0)
+
+    _, labels = search_subset(index, vectors[[10]], row_ids[:2], k=5)
+    assert labels[0].tolist()[2:] == [-1, -1, -1]
+
+
+def test_prefiltered_faiss_guarantees_k_matches():
+    texts = [f"verse {i}" for i in range(60)]
+    metadatas = [{"source": "quran", "surah_num": 1 + (i % 10 == 0), "verse_num": i} for i in range(60)]
+    embeddings = FixedEmbeddings({text: np.eye(60, dtype=np.float32)[i].tolist() for i, text in enumerate(texts)})
+
+    store = PrefilteredFAISS.from_texts(texts, embeddings, metadatas=metadatas)
+    docs = store.similarity_search("verse 3", k=4, filter={"surah": 2})
+
+    assert len(docs) == 4
+    assert all(doc.metadata["surah_num"] == 2 for doc in docs)
+    assert all(texts[doc.metadata["row"]] == doc.page_content for doc in docs)
+    best = store.similarity_search("verse 3", k=4)[0]
+    assert (best.page_content, best.metadata["row"]) == ("verse 3", 3)
+    # Rows are added to copies, the stored documents stay as they were
+    assert "row" not in store.docstore.search(store.index_to_docstore_id[3]).metadata
+
+
+class ArrayEmbeddings(Embeddings):
+    """Array-native embeddings whose list methods must not be used."""
+
+    def embed_documents_array(self, texts):
+        return np.eye(4, dtype=np.float32)[[int(text) for text in texts]]
+
+    def embed_query_array(self, text):
+        return np.eye(4, dtype=np.float32)[int(text)]
+
+    def embed_documents(self, texts):
+        raise AssertionError("list path used")
+
+    def embed_query(self, text):
+        raise AssertionError("list path used")
+
+
+def test_prefiltered_faiss_uses_array_embeddings():
+    store = PrefilteredFAISS.from_texts(["0", "1"], ArrayEmbeddings(), metadatas=[{"surah_num": 1}, {"surah_num": 2}])
+    store.add_texts(["2", "3"], metadatas=[{"surah_num": 1}, {"surah_num": 2}])
+
+    assert store.index.ntotal == 4
+    assert store.similarity_search("3", k=1)[0].page_content == "3"
+    assert store.similarity_search("3", k=1, filter={"surah": 1})[0].page_content in {"0", "2"}
+
+
+def test_embed_array_helpers_accept_list_embeddings():
+    embeddings = FixedEmbeddings({"a": [1.0, 0.0], "b": [0.0, 1.0]})
+
+    matrix = embed_documents_array(embeddings, ["a", "b"])
+    vector = embed_query_array(embeddings, "b")
+
+    assert matrix.dtype == np.float32 and matrix.flags.c_contiguous and matrix.shape == (2, 2)
+    assert vector.tolist() == [0.0, 1.0]
+
+
+def test_load_local_accepts_the_deserialization_flag(tmp_path):
+    store = PrefilteredFAISS.from_texts(["0", "1"], ArrayEmbeddings(), metadatas=[{"surah_num": 1}, {"surah_num": 2}])
+    store.save_local(str(tmp_path))
+
+    loaded = PrefilteredFAISS.load_local(str(tmp_path), ArrayEmbeddings(), allow_dangerous_deserialization=True)
+
+    assert loaded.similarity_search("1", k=1)[0].page_content == "1"
@@ -0,0 +1,480 @@
+# backend/core/vector_search.py
+"""
+Vectorized FAISS search over the memory-mapped docstore.
+
+These helpers work directly on a raw ``faiss`` index and an
+:class:`~backend.core.docstore.MmapDocStore` so that many queries can be
+embedded, searched and materialized in a handful of array operations.
+Surah / verse filters are resolved to candidate row ids up front and only
+those rows are searched; :class:`PrefilteredFAISS` brings the same behaviour
+to the LangChain vector store used by the retriever agents.
+"""
+import inspect
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from backend.core.ann_index import apply_search_params, create_index, is_flat_factory
+from backend.core.config import RRF_K
+from backend.core.docstore import SURAH_KEYS, VERSE_KEYS, MmapDocStore, metadata_int
+from backend.core.lexical_index import BM25Index, reciprocal_rank_fusion
+from backend.core.metrics import stage_timer
+
+
+class MetadataIndex:
+    """
+    Maps surah / verse filters onto FAISS row ids.
+
+    Rows are grouped by surah once at load time (one stable argsort), so a
+    surah filter resolves to a contiguous slice of the sorted row ids and a
+    verse filter is a mask over that slice.
+    """
+
+    def __init__(self, surah: np.ndarray, verse: np.ndarray):
+        self.surah = np.asarray(surah, dtype=np.int64)
+        self.verse = np.asarray(verse, dtype=np.int64)
+        self._order = np.argsort(self.surah, kind="stable")
+        self._sorted_surah = self.surah[self._order]
+
+    @classmethod
+    def from_docstore(cls, docstore: MmapDocStore) -> "MetadataIndex":
+        return cls(docstore.surah, docstore.verse)
+
+    @classmethod
+    def from_metadatas(cls, metadatas: Sequence[Dict[str, Any]]) -> "MetadataIndex":
+        surah = np.fromiter((metadata_int(m, SURAH_KEYS) for m in metadatas), dtype=np.int64, count=len(metadatas))
+        verse = np.fromiter((metadata_int(m, VERSE_KEYS) for m in metadatas), dtype=np.int64, count=len(metadatas))
+        return cls(surah, verse)
+
+    def __len__(self) -> int:
+        return len(self.surah)
+
+    def rows_for(self, surah: Optional[int] = None, verse: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Return the sorted row ids matching the filter, or None when there is
+        nothing to filter on.
+        """
+        if surah is None and verse is None:
+            return None
+        if surah is None:
+            return np.flatnonzero(self.verse == verse)
+
+        start, end = np.searchsorted(self._sorted_surah, [surah, surah + 1])
+        rows = self._order[start:end]
+        if verse is not None:
+            rows = rows[self.verse[rows] == verse]
+        return rows
+
+
+def parse_filter(filter_criteria: Optional[Dict[str, Any]]) -> Tuple[Optional[int], Optional[int], Dict[str, Any]]:
+    """
+    Split a metadata filter into its surah, verse and remaining parts.
+
+    Accepts the key spellings used across the code base (``surah``,
+    ``surah_num``, ``surah_number`` and the verse equivalents).
+    """
+    if not filter_criteria:
+        return None, None, {}
+
+    remaining = dict(filter_criteria)
+    surah = verse = None
+    for key in SURAH_KEYS:
+        value = remaining.pop(key, None)
+        if value is not None and surah is None:
+            surah = int(value)
+    for key in VERSE_KEYS:
+        value = remaining.pop(key, None)
+        if value is not None and verse is None:
+            verse = int(value)
+    return surah, verse, remaining
+
+
+def _subset_vectors(index, row_ids: np.ndarray) -> np.ndarray:
+    """Fetch the stored vectors for ``row_ids`` without touching other rows."""
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexFlat):
+        # Zero-copy view over the flat index storage
+        stored = faiss.rev_swig_ptr(base.get_xb(), base.ntotal * base.d).reshape(base.ntotal, base.d)
+        return stored[row_ids]
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None  # Not an IVF index
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        # Searches never modify the shared index, the map is built when it is loaded
+        raise RuntimeError("IVF index has no direct map; load it through apply_search_params or build_direct_map")
+    return index.reconstruct_batch(row_ids)
+
+
+def search_subset(index, query_vectors: np.ndarray, row_ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact k-NN restricted to ``row_ids``.
+
+    Only the candidate vectors are scanned, so the cost is proportional to the
+    subset size and k results are returned whenever the subset has k rows.
+    Returned ids are global FAISS row ids, padded with -1.
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    row_ids = np.asarray(row_ids, dtype=np.int64)
+    num_queries = query_vectors.shape[0]
+    fill = -np.inf if index.metric_type == faiss.METRIC_INNER_PRODUCT else np.inf
+    if len(row_ids) == 0:
+        return (np.full((num_queries, k), fill, dtype=np.float32),
+                np.full((num_queries, k), -1, dtype=np.int64))
+
+    candidates = np.ascontiguousarray(_subset_vectors(index, row_ids), dtype=np.float32)
+    distances, local_ids = faiss.knn(query_vectors, candidates, min(k, len(row_ids)), metric=index.metric_type)
+
+    # Map subset positions back to row ids and pad to k columns
+    labels = np.where(local_ids >= 0, row_ids[np.maximum(local_ids, 0)], -1)
+    if labels.shape[1] < k:
+        pad = k - labels.shape[1]
+        labels = np.hstack([labels, np.full((num_queries, pad), -1, dtype=np.int64)])
+        distances = np.hstack([distances, np.full((num_queries, pad), fill, dtype=np.float32)])
+    return distances, labels
+
+
+def as_float32_matrix(vectors) -> np.ndarray:
+    """View ``vectors`` as a C-contiguous float32 (N, d) matrix, copying only if needed."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return vectors.reshape(1, -1) if vectors.ndim == 1 else vectors
+
+
+def embed_documents_array(embeddings, texts: Sequence[str]) -> np.ndarray:
+    """
+    Embed texts as a float32 (N, d) matrix.
+
+    Embeddings that implement ``embed_documents_array`` (the models in
+    ``backend.core.embeddings``) hand back their native array without a round
+    trip through Python float lists; any other LangChain embeddings fall back
+    to ``embed_documents``.
+    """
+    texts = list(texts)
+    if hasattr(embeddings, "embed_documents_array"):
+        vectors = embeddings.embed_documents_array(texts)
+    else:
+        vectors = embeddings.embed_documents(texts)
+    vectors = as_float32_matrix(vectors)
+    if len(texts) == 0:
+        return vectors.reshape(0, vectors.shape[-1] if vectors.ndim == 2 else 0)
+    return vectors
+
+
+def embed_query_array(embeddings, text: str) -> np.ndarray:
+    """Embed one query as a float32 vector of shape (d,)."""
+    if hasattr(embeddings, "embed_query_array"):
+        vector = embeddings.embed_query_array(text)
+    else:
+        vector = embeddings.embed_query(text)
+    return np.ascontiguousarray(vector, dtype=np.float32).reshape(-1)
+
+
+def embed_queries(embeddings, queries: Sequence[str]) -> np.ndarray:
+    """
+    Embed many queries with a single batched embedding call.
+
+    Returns:
+        A C-contiguous float32 matrix of shape (len(queries), d)
+    """
+    return embed_documents_array(embeddings, queries)
+
+
+def _search_index(index, query_vectors: np.ndarray, k: int,
+                  row_ids: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    with stage_timer("faiss_search"):
+        if row_ids is None:
+            return index.search(query_vectors, k)
+        return search_subset(index, query_vectors, row_ids, k)
+
+
+def search_vectors(index, docstore: MmapDocStore, query_vectors: np.ndarray,
+                   k: int = 15, row_ids: Optional[np.ndarray] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Run one ``index.search`` over an (N, d) query matrix and map the hits back
+    to documents.
+
+    Args:
+        index: A FAISS index whose row ids match the docstore rows
+        docstore: The document store holding the page contents and metadata
+        query_vectors: Query embeddings, one per row
+        k: Number of neighbours per query
+        row_ids: Optional candidate rows (see :meth:`MetadataIndex.rows_for`);
+            when given only those rows are searched
+
+    Returns:
+        One list of ``{'content', 'metadata', 'score', 'row'}`` dictionaries per
+        query, ordered by increasing distance (``row`` is the docstore row)
+    """
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    if query_vectors.ndim == 1:
+        query_vectors = query_vectors.reshape(1, -1)
+    if query_vectors.shape[0] == 0:
+        return []
+
+    distances, indices = _search_index(index, query_vectors, k, row_ids)
+
+    # FAISS pads missing neighbours with -1; drop those and any id the
+    # docstore does not know about before gathering
+    valid = (indices >= 0) & (indices < len(docstore))
+    query_rows, ranks = np.nonzero(valid)
+    with stage_timer("docstore"):
+        documents = docstore.get_batch(indices[query_rows, ranks])
+    scores = distances[query_rows, ranks]
+
+    results: List[List[Dict[str, Any]]] = [[] for _ in range(query_vectors.shape[0])]
+    for query_row, doc, score, row in zip(query_rows, documents, scores, indices[query_rows, ranks]):
+        doc["score"] = float(score)
+        doc["row"] = int(row)
+        results[query_row].append(doc)
+    return results
+
+
+def hybrid_search(index, docstore: MmapDocStore, lexical_index: BM25Index, query_vector: np.ndarray,
+                  query: str, k: int = 15, row_ids: Optional[np.ndarray] = None,
+                  rrf_k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Retrieve documents for one query by fusing FAISS and BM25 rankings.
+
+    The top ``k`` rows of each ranking are merged by reciprocal rank fusion,
+    so a verse that only matches on its Arabic words still surfaces when the
+    embedding model misses it.
+
+    Args:
+        index: A FAISS index whose row ids match the docstore rows
+        docstore: The document store holding the page contents and metadata
+        lexical_index: BM25 index over the same docstore rows
+        query_vector: Query embedding, shape (d,) or (1, d)
+        query: Query text for the keyword ranking
+        k: Number of documents to return
+        row_ids: Optional candidate rows applied to both rankings
+        rrf_k: Rank offset of the fusion
+
+    Returns:
+        ``{'content', 'metadata', 'score', 'row'}`` dictionaries ordered by
+        decreasing fused score (higher is better, unlike the L2 distances
+        returned by :func:`search_vectors`)
+    """
+    query_vector = np.ascontiguousarray(query_vector, dtype=np.float32).reshape(1, -1)
+    _, indices = _search_index(index, query_vector, k, row_ids)
+    vector_rows = indices[0][(indices[0] >= 0) & (indices[0] < len(docstore))]
+    with stage_timer("bm25_search"):
+        keyword_rows, _ = lexical_index.search(query, k, row_ids)
+
+    rows, scores = reciprocal_rank_fusion([vector_rows, keyword_rows], rrf_k, limit=k)
+    with stage_timer("docstore"):
+        documents = docstore.get_batch(rows)
+    for doc, score, row in zip(documents, scores, rows):
+        doc["score"] = float(score)
+        doc["row"] = int(row)
+    return documents
+
+
+def batch_retrieve(embeddings, index, docstore: MmapDocStore, queries: Sequence[str],
+                   k: int = 15, row_ids: Optional[np.ndarray] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Retrieve documents for many queries at once.
+
+    All queries are embedded in one call and searched in one call, which is
+    far cheaper than looping over single-query retrieval.
+    """
+    if not queries:
+        return []
+    return search_vectors(index, docstore, embed_queries(embeddings, queries), k, row_ids)
+
+
+_LOAD_LOCAL_PARAMETERS = inspect.signature(FAISS.load_local).parameters
+
+
+class PrefilteredFAISS(FAISS):
+    """
+    LangChain FAISS store that applies surah / verse filters before searching.
+
+    The stock implementation fetches ``fetch_k`` neighbours and filters them
+    afterwards, which often leaves fewer than k matches. Here the filter is
+    resolved to candidate row ids through a :class:`MetadataIndex` and only
+    those rows are searched. Filters on other metadata keys are applied to the
+    pre-filtered candidates; callable filters use the stock behaviour.
+
+    Returned documents are copies whose metadata carries their FAISS row id
+    under ``"row"`` (the docstore row, see :mod:`backend.core.docstore`), so
+    callers can look up per-row data such as token counts.
+    """
+
+    _metadata_index: Optional[MetadataIndex] = None
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: Iterable[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "PrefilteredFAISS":
+        texts = list(texts)
+        return cls.from_arrays(texts, embed_documents_array(embedding, texts), embedding, metadatas, ids, **kwargs)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        texts: List[str],
+        vectors: np.ndarray,
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        normalize_L2: bool = False,
+        distance_strategy: DistanceStrategy = DistanceStrategy.EUCLIDEAN_DISTANCE,
+        index_factory: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "PrefilteredFAISS":
+        """
+        Build an index straight from a float32 (N, d) matrix.
+
+        ``index_factory`` selects the FAISS index type (see
+        :mod:`backend.core.ann_index`); the default is an exact flat index.
+        """
+        vectors = as_float32_matrix(vectors)
+        inner_product = distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+        if not is_flat_factory(index_factory):
+            training = vectors
+            if normalize_L2:
+                training = vectors.copy()
+                faiss.normalize_L2(training)
+            metric = faiss.METRIC_INNER_PRODUCT if inner_product else faiss.METRIC_L2
+            index = create_index(training, index_factory, metric)
+        elif inner_product:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+        else:
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        store = cls(
+            embedding,
+            index,
+            InMemoryDocstore(),
+            {},
+            normalize_L2=normalize_L2,
+            distance_strategy=distance_strategy,
+            **kwargs,
+        )
+        store.add_arrays(texts, vectors, metadatas=metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def load_local(
+        cls,
+        folder_path: str,
+        embeddings: Embeddings,
+        index_name: str = "index",
+        **kwargs: Any,
+    ) -> "PrefilteredFAISS":
+        """Load a saved store and apply the configured nprobe / efSearch."""
+        if "allow_dangerous_deserialization" not in _LOAD_LOCAL_PARAMETERS:
+            # Older LangChain releases load pickles unconditionally and reject the flag
+            kwargs.pop("allow_dangerous_deserialization", None)
+        store = super().load_local(folder_path, embeddings, index_name=index_name, **kwargs)
+        apply_search_params(store.index)
+        return store
+
+    def add_arrays(
+        self,
+        texts: List[str],
+        vectors: np.ndarray,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Add texts with precomputed float32 vectors, without list conversions."""
+        vectors = as_float32_matrix(vectors)
+        if len(texts) != len(vectors):
+            raise ValueError(f"Got {len(texts)} texts but {len(vectors)} vectors")
+        if self._normalize_L2:
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        self.index.add(vectors)
+
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        self.docstore.add({
+            id_: Document(page_content=text, metadata=metadata)
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        })
+        starting_len = len(self.index_to_docstore_id)
+        self.index_to_docstore_id.update({starting_len + j: id_ for j, id_ in enumerate(ids)})
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        if not isinstance(self.embedding_function, Embeddings):
+            return super().add_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+        texts = list(texts)
+        return self.add_arrays(texts, embed_documents_array(self.embedding_function, texts), metadatas, ids)
+
+    def _embed_query(self, text: str) -> np.ndarray:
+        if isinstance(self.embedding_function, Embeddings):
+            return embed_query_array(self.embedding_function, text)
+        return super()._embed_query(text)
+
+    def get_metadata_index(self) -> MetadataIndex:
+        """Build (or rebuild after additions) the surah / verse row index."""
+        if self._metadata_index is None or len(self._metadata_index) != self.index.ntotal:
+            metadatas = [
+                self.docstore.search(self.index_to_docstore_id[row]).metadata
+                for row in range(self.index.ntotal)
+            ]
+            self._metadata_index = MetadataIndex.from_metadatas(metadatas)
+        return self._metadata_index
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Any] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        if filter is not None and not isinstance(filter, dict):
+            return super().similarity_search_with_score_by_vector(
+                embedding, k, filter=filter, fetch_k=fetch_k, **kwargs
+            )
+
+        surah, verse, remaining = parse_filter(filter)
+        vector = as_float32_matrix(embedding)
+        if self._normalize_L2:
+            vector = vector.copy()  # normalize_L2 works in place
+            faiss.normalize_L2(vector)
+
+        row_ids = self.get_metadata_index().rows_for(surah, verse)
+        search_k = k if not remaining else max(k, fetch_k)
+        if row_ids is None:
+            scores, indices = self.index.search(vector, search_k)
+        else:
+            scores, indices = search_subset(self.index, vector, row_ids, search_k)
+
+        docs = []
+        for score, row in zip(scores[0], indices[0]):
+            if row == -1:
+                continue
+            doc = self.docstore.search(self.index_to_docstore_id[row])
+            if all(doc.metadata.get(key) == value for key, value in remaining.items()):
+                # A copy: the stored document is shared by every search
+                docs.append((Document(page_content=doc.page_content, metadata={**doc.metadata, "row": int(row)}),
+                             float(score)))
+
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                docs = [(doc, score) for doc, score in docs if score >= score_threshold]
+            else:
+                docs = [(doc, score) for doc, score in docs if score <= score_threshold]
+        return docs[:k]
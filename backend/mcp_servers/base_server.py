@@ -6,6 +6,7 @@ This module provides the foundation for all MCP server implementations in the sy
 import asyncio
 import json
 import logging
+import time
 from typing import Any, Dict, List, Optional, Union, Callable
 
 from modelcontextprotocol import (
@@ -16,6 +17,8 @@ from modelcontextprotocol import (
     ToolExecutionResult
 )
 
+from backend.core.metrics import MCP_TOOL_SECONDS
+
 
 class BaseMCPServer(Server):
     """Base MCP server implementation for RAG Quran."""
@@ -90,6 +93,8 @@ class BaseMCPServer(Server):
         Returns:
             The result of the tool execution
         """
+        start_time = time.perf_counter()
+        tool_label, status = "unknown", "error"
         try:
             self.logger.info(f"Executing tool: {tool_call.name}")
             
@@ -97,9 +102,11 @@ class BaseMCPServer(Server):
             tool = self.get_registered_tool(tool_call.name)
             if not tool:
                 self.logger.error(f"Tool not found: {tool_call.name}")
+                status = "not_found"
                 return ToolExecutionResult(
                     error=f"Tool not found: {tool_call.name}"
                 )
+            tool_label = tool_call.name
                 
             # Execute the tool handler
             handler = tool.handler
@@ -108,6 +115,7 @@ class BaseMCPServer(Server):
             else:
                 result = handler(tool_call.parameters)
                 
+            status = "error" if getattr(result, "error", None) else "ok"
             return result
             
         except Exception as e:
@@ -115,6 +123,10 @@ class BaseMCPServer(Server):
             return ToolExecutionResult(
                 error=f"Error executing tool {tool_call.name}: {str(e)}"
             )
+        finally:
+            # Unknown tool names share one series to keep the label set bounded
+            MCP_TOOL_SECONDS.observe(time.perf_counter() - start_time,
+                                     server=self.name, tool=tool_label, status=status)
             
     def get_registered_tools(self) -> List[ToolDefinition]:
         """Get all registered tools."""
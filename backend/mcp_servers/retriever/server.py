@@ -20,7 +20,8 @@ class RetrieverMCPServer(BaseMCPServer):
         self,
         vector_store_path: str = "vector_db/faiss_index",
         name: str = "quran-retriever",
-        description: str = "Retrieves relevant passages from the Quran and Tafsir based on natural language queries"
+        description: str = "Retrieves relevant passages from the Quran and Tafsir based on natural language queries",
+        agent: Optional[RetrieverAgent] = None
     ):
         """
         Initialize the retriever MCP server.
@@ -29,6 +30,7 @@ class RetrieverMCPServer(BaseMCPServer):
             vector_store_path: Path to the FAISS vector store
             name: The name of the server
             description: A description of the server's capabilities
+            agent: Retriever agent to serve (created from vector_store_path if not provided)
         """
         # Define the resource schema for Quranic content
         quran_resource_schema = ResourceSchema(
@@ -57,7 +59,7 @@ class RetrieverMCPServer(BaseMCPServer):
                     },
                     "use_compression": {
                         "type": "boolean",
-                        "description": "Whether to use contextual compression",
+                        "description": "Whether to rerank the candidates and keep the best k (local cross-encoder by default)",
                         "default": True
                     }
                 },
@@ -92,7 +94,7 @@ class RetrieverMCPServer(BaseMCPServer):
                         },
                         "use_compression": {
                             "type": "boolean",
-                            "description": "Whether to use contextual compression",
+                            "description": "Whether to rerank the candidates and keep the best k (local cross-encoder by default)",
                             "default": True
                         }
                     },
@@ -111,7 +113,7 @@ class RetrieverMCPServer(BaseMCPServer):
         )
         
         # Initialize the retriever agent
-        self.agent = RetrieverAgent(vector_store_path=vector_store_path)
+        self.agent = agent or RetrieverAgent(vector_store_path=vector_store_path)
         self.logger.info(f"Initialized Retriever MCP Server with agent {self.agent.name}")
     
     async def _handle_retrieve(self, params: Dict[str, Any]) -> ToolExecutionResult:
@@ -75,6 +75,10 @@ class TafsirMCPServer(BaseMCPServer):
                         "tafsir_name": {
                             "type": ["string", "null"],
                             "description": "Optional tafsir name (e.g., 'ibn-kathir')"
+                        },
+                        "end_verse": {
+                            "type": ["integer", "null"],
+                            "description": "Optional last verse to look up a range of verses"
                         }
                     },
                     "required": ["surah", "verse"]
@@ -101,7 +105,7 @@ class TafsirMCPServer(BaseMCPServer):
             tools=tools
         )
         
-        # Initialize the tafsir tool agent
+        # Initialize the tafsir tool agent (backed by the shared tafsir store)
         self.tafsirs_dir = tafsirs_dir
         self.agent = TafsirToolAgent(tafsirs_dir=tafsirs_dir)
         self.logger.info(f"Initialized Tafsir MCP Server with agent {self.agent.name}")
@@ -112,6 +116,7 @@ class TafsirMCPServer(BaseMCPServer):
             surah = params.get("surah")
             verse = params.get("verse")
             tafsir_name = params.get("tafsir_name")
+            end_verse = params.get("end_verse")
             
             if not surah:
                 return ToolExecutionResult(error="Surah is required")
@@ -123,7 +128,8 @@ class TafsirMCPServer(BaseMCPServer):
                 query=f"Lookup tafsir for Surah {surah}, Verse {verse}",
                 surah=surah,
                 verse=verse,
-                tafsir_name=tafsir_name
+                tafsir_name=tafsir_name,
+                end_verse=end_verse
             )
             
             # Process the request
@@ -134,7 +140,8 @@ class TafsirMCPServer(BaseMCPServer):
                 "tafsir_text": response.tafsir_text,
                 "tafsir_name": response.tafsir_name,
                 "surah": response.surah,
-                "verse": response.verse
+                "verse": response.verse,
+                "end_verse": end_verse
             }
             
             return ToolExecutionResult(result=result)